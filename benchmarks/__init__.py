@@ -0,0 +1 @@
+"""Benchmarks for the Xetra ETL components"""
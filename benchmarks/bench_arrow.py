@@ -0,0 +1,82 @@
+"""Benchmark the memory of the extracted source data in the pandas and the
+Arrow representation and the time of report 1 on both
+
+Run with: python -m benchmarks.bench_arrow --days 6
+
+Sizes are reported per million source rows: pandas with inferred (object)
+dtypes, pandas with the dtypes of XetraETL.extract() (ISIN categorical) and
+the pyarrow Table of XetraETL.extract_arrow() (ISIN dictionary encoded, date
+and time as date32 and time32)
+"""
+import argparse
+import time
+
+from moto import mock_s3
+
+from benchmarks.bench_s3 import _create_connector
+from benchmarks.bench_transformer import SOURCE_CONFIG, TARGET_CONFIG
+from benchmarks.data_generator import XetraBinsGenerator
+from xetra.transformers.xetra_transformer import XetraETL
+
+
+def _report_columns():
+    """Source columns of report 1"""
+    return [SOURCE_CONFIG.src_col_isin, SOURCE_CONFIG.src_col_date, SOURCE_CONFIG.src_col_time,
+            SOURCE_CONFIG.src_col_start_price, SOURCE_CONFIG.src_col_min_price,
+            SOURCE_CONFIG.src_col_max_price, SOURCE_CONFIG.src_col_traded_vol]
+
+
+def bench_memory(days: int, isins: int, activity: float, repeat: int):
+    """Print the in-memory size per million rows of the extracted source data
+    and the best time of extract and transform of both paths"""
+    source_config = SOURCE_CONFIG._replace(src_columns=_report_columns())
+    generator = XetraBinsGenerator(isins=isins, activity=activity)
+    dates = generator.dates(days)
+    with mock_s3():
+        s3_bucket_src = _create_connector()
+        s3_bucket_trg = _create_connector('xetra-bench-trg')
+        files, rows, size = generator.seed_bucket(s3_bucket_src._bucket, days)
+        xetra_etl = XetraETL(s3_bucket_src, s3_bucket_trg, 'meta.csv', source_config,
+                             TARGET_CONFIG)
+        xetra_etl.extract_date, xetra_etl.extract_date_list = dates[0], dates
+        xetra_etl.meta_update_list = dates
+        keys = [key for date in dates for key in s3_bucket_src.list_files_in_prefix(date)]
+        sizes = {
+            'pandas, inferred dtypes': s3_bucket_src.read_many_csv_as_df(
+                keys, usecols=_report_columns()).memory_usage(deep=True).sum(),
+            'pandas, ISIN categorical': xetra_etl.extract().memory_usage(deep=True).sum(),
+            'arrow, ISIN dictionary': xetra_etl.extract_arrow().nbytes
+        }
+        timings = {}
+        for name, extract, transform in (
+                ('pandas', xetra_etl.extract, xetra_etl.transform_report1),
+                ('arrow', xetra_etl.extract_arrow, xetra_etl.transform_report1_arrow)):
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                transform(extract())
+                durations.append(time.perf_counter() - start)
+            timings[name] = min(durations)
+    print(f'{files} source files, {rows:,d} rows, {size / 2**20:.1f} MB CSV')
+    for name, nbytes in sizes.items():
+        print(f'  {name + ":":<27}{nbytes / 2**20:9.1f} MB '
+              f'{nbytes / 2**20 / rows * 10**6:8.1f} MB per million rows')
+    for name, duration in timings.items():
+        print(f'  extract and transform, {name + ":":<8}{duration:8.3f} s '
+              f'{rows / duration:12,.0f} rows/s')
+
+
+def main():
+    """Entry point for the Arrow memory benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=6)
+    parser.add_argument('--isins', type=int, default=3000)
+    parser.add_argument('--activity', type=float, default=0.1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    bench_memory(args.days, args.isins, args.activity, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
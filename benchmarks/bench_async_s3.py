@@ -0,0 +1,90 @@
+"""Benchmark listing and fetching 250 trading days with the serial
+S3BucketConnector and the AsyncS3BucketConnector
+
+Run with: python -m benchmarks.bench_async_s3
+Against a local moto server (moto_server -p 5000) instead of the in-process
+mock, with real HTTP round trips: python -m benchmarks.bench_async_s3
+--endpoint-url http://localhost:5000
+"""
+import argparse
+import asyncio
+import os
+import time
+from contextlib import nullcontext
+
+import boto3
+import pandas as pd
+from moto import mock_s3
+
+from benchmarks.bench_s3 import ACCESS_KEY, SECRET_KEY, ENDPOINT_URL, _add_latency, _timed
+from xetra.common.async_s3 import AsyncS3BucketConnector
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
+
+BUCKET = 'xetra-bench-async'
+
+
+def _put_trading_days(endpoint_url: str, days: int, files_per_day: int, rows: int):
+    """Create the bucket with files_per_day source files for each trading day
+    and return the date prefixes"""
+    s3_resource = boto3.resource('s3', endpoint_url=endpoint_url)
+    bucket = s3_resource.create_bucket(
+        Bucket=BUCKET, CreateBucketConfiguration={'LocationConstraint': 'eu-central-1'})
+    dates = [str(date.date()) for date in pd.bdate_range('2021-01-04', periods=days)]
+    for date in dates:
+        body = 'ISIN,Date,Time,StartPrice\n' + ''.join(
+            f'DE000{row:07d},{date},{row % 24:02d}:00,{row * 0.01:.2f}\n' for row in range(rows))
+        for hour in range(files_per_day):
+            bucket.put_object(Body=body, Key=f'{date}/{date}_BINS_XETR{hour:02d}.csv')
+    return dates
+
+
+def bench_list_and_fetch(endpoint_url: str, days: int, files_per_day: int, rows: int,
+                         latency: float, max_concurrency: int):
+    """Compare the serial listing and reads with the concurrent async ones"""
+    os.environ[ACCESS_KEY] = 'KEY1'
+    os.environ[SECRET_KEY] = 'KEY2'
+    S3ClientRegistry.clear()
+    with mock_s3() if endpoint_url == ENDPOINT_URL else nullcontext():
+        dates = _put_trading_days(endpoint_url, days, files_per_day, rows)
+        s3_bucket_conn = S3BucketConnector(ACCESS_KEY, SECRET_KEY, endpoint_url, BUCKET)
+        async_conn = AsyncS3BucketConnector(ACCESS_KEY, SECRET_KEY, endpoint_url, BUCKET,
+                                            max_concurrency=max_concurrency)
+        if latency:
+            # both connectors share one client
+            _add_latency(s3_bucket_conn, latency)
+            s3_bucket_conn._client.meta.events.register(
+                'before-sign.s3.ListObjects', lambda **kwargs: time.sleep(latency))
+
+        keys = []
+        list_serial = _timed(lambda: keys.extend(
+            key for date in dates for key in s3_bucket_conn.list_files_in_prefix(date)))
+        fetch_serial = _timed(lambda: [s3_bucket_conn.read_csv_as_df(key) for key in keys])
+        list_async = _timed(asyncio.run, async_conn.list_files_in_prefixes(dates))
+        fetch_async = _timed(asyncio.run, async_conn.read_many_csv_as_df(keys))
+        async_conn.close()
+    print(f'list {days} trading days and fetch {len(keys)} files x {rows} rows, '
+          f'{latency * 1000:.0f} ms added latency')
+    for name, duration, count in (
+            ('serial listing', list_serial, days),
+            (f'async listing ({max_concurrency} in flight)', list_async, days),
+            ('serial fetch', fetch_serial, len(keys)),
+            (f'async fetch ({max_concurrency} in flight)', fetch_async, len(keys))):
+        print(f'  {name + ":":<37}{duration:8.3f} s {count / duration:8.1f} requests/s')
+
+
+def main():
+    """Entry point for the async S3 benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoint-url', default=ENDPOINT_URL)
+    parser.add_argument('--days', type=int, default=250)
+    parser.add_argument('--files-per-day', type=int, default=2)
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--max-concurrency', type=int, default=32)
+    args = parser.parse_args()
+    bench_list_and_fetch(args.endpoint_url, args.days, args.files_per_day, args.rows,
+                         args.latency_ms / 1000, args.max_concurrency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Benchmarks for MetaProcess methods against a mocked S3 bucket
+
+Run with: python -m benchmarks.bench_meta_process
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from moto import mock_s3
+
+from xetra.common.constants import MetaProcessFormat
+from xetra.common.meta_process import MetaProcess
+from benchmarks.bench_s3 import _create_connector
+
+META_KEY = 'meta/report1/xetra_report1_meta_file.csv'
+
+
+def _meta_history(years: int):
+    """Meta file dataframe with one row per day of the given number of years"""
+    dates = pd.date_range(end=datetime.today(), periods=years * 365, freq='D')
+    return pd.DataFrame({
+        MetaProcessFormat.META_SOURCE_DATE_COL.value:
+            dates.strftime(MetaProcessFormat.META_DATE_FORMAT.value),
+        MetaProcessFormat.META_PROCESS_COL.value:
+            dates.strftime(MetaProcessFormat.META_PROCESS_DATE_FORMAT.value)
+    })
+
+
+def bench_update_meta_file(years: int, runs: int):
+    """Compare rewriting the whole meta file per run with the batch files"""
+    with mock_s3():
+        s3_bucket_meta = _create_connector()
+        df_history = _meta_history(years)
+        s3_bucket_meta.write_df_to_s3(df_history, META_KEY, 'csv')
+        new_dates = [['2099-01-01'] for _ in range(runs)]
+
+        start = time.perf_counter()
+        for date_list in new_dates:
+            df_old = s3_bucket_meta.read_csv_as_df(META_KEY)
+            df_new = pd.DataFrame({MetaProcessFormat.META_SOURCE_DATE_COL.value: date_list,
+                                   MetaProcessFormat.META_PROCESS_COL.value: '2099-01-01'})
+            s3_bucket_meta.write_df_to_s3(pd.concat([df_old, df_new]), META_KEY, 'csv')
+        rewrite = (time.perf_counter() - start) / runs
+
+        s3_bucket_meta.write_df_to_s3(df_history, META_KEY, 'csv')
+        start = time.perf_counter()
+        for date_list in new_dates:
+            MetaProcess.update_meta_file(date_list, META_KEY, s3_bucket_meta)
+        incremental = (time.perf_counter() - start) / runs
+    print(f'update meta file with {years} years of history, mean of {runs} runs')
+    print(f'  read, concat and rewrite:              {rewrite * 1000:8.2f} ms')
+    print(f'  update_meta_file batch file:           {incremental * 1000:8.2f} ms')
+
+
+def bench_is_processed(years: int, days: int, runs: int):
+    """Compare rescanning the meta history with the processed dates index"""
+    with mock_s3():
+        s3_bucket_meta = _create_connector()
+        s3_bucket_meta.write_df_to_s3(_meta_history(years), META_KEY, 'csv')
+        dates = np.arange(np.datetime64('today') - days, np.datetime64('today'))
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            df_meta = s3_bucket_meta.read_csv_as_df(META_KEY)
+            processed = set(pd.to_datetime(
+                df_meta[MetaProcessFormat.META_SOURCE_DATE_COL.value]).dt.date)
+            _ = [date in processed for date in dates.astype(object)]
+        rescan = (time.perf_counter() - start) / runs
+
+        MetaProcess.processed_dates(META_KEY, s3_bucket_meta)
+        start = time.perf_counter()
+        for _ in range(runs):
+            MetaProcess.is_processed(dates, META_KEY, s3_bucket_meta)
+        indexed = (time.perf_counter() - start) / runs
+    print(f'check {days} days against {years} years of history, mean of {runs} runs')
+    print(f'  rescan meta file:                      {rescan * 1000:8.3f} ms')
+    print(f'  is_processed index:                    {indexed * 1000:8.3f} ms')
+
+
+def main():
+    """Entry point for the MetaProcess benchmarks"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--years', type=int, default=12)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+    bench_update_meta_file(args.years, args.runs)
+    bench_is_processed(args.years, args.days, args.runs)
+
+
+if __name__ == '__main__':
+    main()
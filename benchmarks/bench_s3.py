@@ -0,0 +1,240 @@
+"""Benchmarks for S3BucketConnector methods against a mocked S3 bucket
+
+Run with: python -m benchmarks.bench_s3
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from io import BytesIO, StringIO
+
+import boto3
+import numpy as np
+import pandas as pd
+from moto import mock_s3
+
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
+
+ACCESS_KEY = 'AWS_ACCESS_KEY_ID'
+SECRET_KEY = 'AWS_SECRET_ACCESS_KEY'
+ENDPOINT_URL = 'https://s3.eu-central-1.amazonaws.com'
+BUCKET = 'xetra-bench'
+
+
+def _add_latency(s3_bucket_conn: S3BucketConnector, latency: float):
+    """Emulate the network round trip moto does not have on every GetObject"""
+    s3_bucket_conn._client.meta.events.register(
+        'before-sign.s3.GetObject', lambda **kwargs: time.sleep(latency))
+
+
+def _timed(func, *args, **kwargs):
+    """Return the wall time of one function call in seconds"""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def _create_connector(bucket: str = BUCKET):
+    """Create the mocked bucket and a S3BucketConnector on it, call inside mock_s3"""
+    os.environ[ACCESS_KEY] = 'KEY1'
+    os.environ[SECRET_KEY] = 'KEY2'
+    # a new mocked S3 needs new clients, without the event handlers of other benchmarks
+    S3ClientRegistry.clear()
+    boto3.resource('s3', endpoint_url=ENDPOINT_URL).create_bucket(
+        Bucket=bucket, CreateBucketConfiguration={'LocationConstraint': 'eu-central-1'})
+    return S3BucketConnector(ACCESS_KEY, SECRET_KEY, ENDPOINT_URL, bucket)
+
+
+def _traced_peak(func, *args, **kwargs):
+    """Return the traced memory peak of one function call in MB"""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_read_csv_as_df_memory(size_mb: int, chunksize: int):
+    """Compare the memory peak of decoding the whole body with the streamed reads"""
+    with mock_s3():
+        s3_bucket_conn = _create_connector()
+        row = 'DE0001234567,XYZ,2022-01-03,09:00,EUR,12.34,12.40,12.30,12.38,1500,7\n'
+        header = ('ISIN,Mnemonic,Date,Time,Currency,StartPrice,EndPrice,'
+                  'MinPrice,MaxPrice,TradedVolume,NumberOfTrades\n')
+        body = (header + row * (size_mb * 2**20 // len(row))).encode('utf-8')
+        s3_bucket_conn._bucket.put_object(Body=body, Key='large.csv')
+        del body
+
+        def decode_to_string_io():
+            body = s3_bucket_conn._client.get_object(Bucket=BUCKET, Key='large.csv')['Body']
+            return pd.read_csv(StringIO(body.read().decode('utf-8')))
+
+        def read_chunks():
+            for _ in s3_bucket_conn.read_csv_as_df('large.csv', chunksize=chunksize):
+                pass
+
+        peak_decoded = _traced_peak(decode_to_string_io)
+        peak_streamed = _traced_peak(s3_bucket_conn.read_csv_as_df, 'large.csv')
+        peak_chunked = _traced_peak(read_chunks)
+    print(f'read one {size_mb} MB object, traced memory peak '
+          '(the mocked response body is included)')
+    print(f'  decoded to StringIO:                   {peak_decoded:8.1f} MB')
+    print(f'  streamed read_csv_as_df:               {peak_streamed:8.1f} MB')
+    print(f'  {f"streamed with chunksize={chunksize}:":<39}{peak_chunked:8.1f} MB')
+
+
+def _bins_csv(rows: int, isins: int = 3000, seed: int = 42):
+    """Synthetic Xetra BINS file content with all source columns"""
+    rng = np.random.default_rng(seed)
+    isin = rng.integers(0, isins, rows)
+    minute = np.sort(rng.integers(8 * 60, 17 * 60 + 30, rows))
+    price = rng.uniform(1, 500, rows).round(2)
+    frame = pd.DataFrame({
+        'ISIN': np.char.add('DE000', np.char.zfill(isin.astype(str), 7)),
+        'Mnemonic': np.char.add('M', isin.astype(str)),
+        'SecurityDesc': np.char.add('SECURITY DESCRIPTION ', isin.astype(str)),
+        'SecurityType': 'Common stock',
+        'Currency': 'EUR',
+        'SecurityID': isin + 2504000,
+        'Date': '2022-01-03',
+        'Time': [f'{m // 60:02d}:{m % 60:02d}' for m in minute],
+        'StartPrice': price,
+        'MaxPrice': (price * 1.01).round(2),
+        'MinPrice': (price * 0.99).round(2),
+        'EndPrice': price,
+        'TradedVolume': rng.integers(1, 10000, rows),
+        'NumberOfTrades': rng.integers(1, 50, rows)
+    })
+    return frame.to_csv(index=False)
+
+
+def bench_read_csv_as_df_projection(rows: int):
+    """Compare parsing all columns with inferred dtypes with the projected,
+    dtype pinned reads XetraETL.extract uses"""
+    usecols = ['ISIN', 'Date', 'Time', 'StartPrice', 'MinPrice', 'MaxPrice', 'TradedVolume']
+    dtype = {'ISIN': 'category', 'StartPrice': 'float32',
+             'MinPrice': 'float32', 'MaxPrice': 'float32'}
+    variants = {
+        'all columns, inferred dtypes': {},
+        'usecols': {'usecols': usecols},
+        'usecols + dtype': {'usecols': usecols, 'dtype': dtype},
+        'usecols + dtype, pyarrow engine': {'usecols': usecols, 'dtype': dtype,
+                                            'engine': 'pyarrow'}
+    }
+    with mock_s3():
+        s3_bucket_conn = _create_connector()
+        s3_bucket_conn._bucket.put_object(Body=_bins_csv(rows).encode('utf-8'),
+                                          Key='2022-01-03/2022-01-03_BINS_XETR.csv')
+        print(f'read one full-day BINS file with {rows} rows')
+        for name, kwargs in variants.items():
+            start = time.perf_counter()
+            dataframe = s3_bucket_conn.read_csv_as_df('2022-01-03/2022-01-03_BINS_XETR.csv',
+                                                      **kwargs)
+            duration = time.perf_counter() - start
+            memory = dataframe.memory_usage(deep=True).sum() / 2**20
+            print(f'  {name + ":":<37}{duration:8.3f} s {memory:8.1f} MB')
+
+
+def bench_read_many_csv_as_df(files: int, rows: int, latency: float, max_workers: int):
+    """Compare the serial read_csv_as_df loop with read_many_csv_as_df"""
+    with mock_s3():
+        s3_bucket_conn = _create_connector()
+        body = 'ISIN,Time,StartPrice\n' + ''.join(
+            f'DE000{row:07d},{row % 24:02d}:00,{row * 0.01:.2f}\n' for row in range(rows))
+        keys = [f'2022-01-03/2022-01-03_BINS_XETR{num:02d}.csv' for num in range(files)]
+        for key in keys:
+            s3_bucket_conn._bucket.put_object(Body=body, Key=key)
+        _add_latency(s3_bucket_conn, latency)
+
+        serial = _timed(lambda: [s3_bucket_conn.read_csv_as_df(key) for key in keys])
+        concurrent = _timed(s3_bucket_conn.read_many_csv_as_df, keys, max_workers=max_workers)
+    print(f'read {files} files x {rows} rows, {latency * 1000:.0f} ms latency')
+    print(f'  serial read_csv_as_df loop:            {serial:8.3f} s')
+    print(f'  read_many_csv_as_df ({max_workers:2d} workers):    {concurrent:8.3f} s')
+    print(f'  speedup:                               {serial / concurrent:8.2f} x')
+
+
+def bench_write_df_to_s3(size_mb: int, part_size_mb: int, workers: int):
+    """Compare the single PUT of the copied buffer with the multipart upload
+    of memoryview slices"""
+    with mock_s3():
+        s3_bucket_conn = _create_connector()
+        s3_bucket_conn.multipart_chunksize = part_size_mb * 2**20
+        s3_bucket_conn.multipart_workers = workers
+        out_buffer = BytesIO(b'x' * size_mb * 2**20)
+
+        def put_copy():
+            s3_bucket_conn._bucket.put_object(Body=out_buffer.getvalue(), Key='copy.csv')
+
+        def put_multipart():
+            s3_bucket_conn._put_object(out_buffer, 'multipart.csv')
+
+        time_copy = _timed(put_copy)
+        time_multipart = _timed(put_multipart)
+        peak_copy = _traced_peak(put_copy)
+        peak_multipart = _traced_peak(put_multipart)
+    print(f'write one {size_mb} MB object, {part_size_mb} MB parts, {workers} workers '
+          '(in-process moto stores the parts and joins them on completion, '
+          'so the peaks include the server side copies)')
+    print(f'  put_object(getvalue()):                {time_copy:8.3f} s {peak_copy:8.1f} MB')
+    print(f'  multipart from memoryviews:            {time_multipart:8.3f} s '
+          f'{peak_multipart:8.1f} MB')
+
+
+def bench_connector_construction(connectors: int):
+    """Compare a new session and resource per connector with the shared ones of
+    S3ClientRegistry, construction time and the latency of the first request"""
+    with mock_s3():
+        _create_connector()
+
+        def new_session_connector():
+            s3_bucket_conn = S3BucketConnector(ACCESS_KEY, SECRET_KEY, ENDPOINT_URL, BUCKET)
+            session = boto3.Session(aws_access_key_id=os.environ[ACCESS_KEY],
+                                    aws_secret_access_key=os.environ[SECRET_KEY])
+            s3_bucket_conn.session = session
+            s3_bucket_conn._s3 = session.resource(service_name='s3', endpoint_url=ENDPOINT_URL)
+            s3_bucket_conn._client = s3_bucket_conn._s3.meta.client
+            s3_bucket_conn._bucket = s3_bucket_conn._s3.Bucket(BUCKET)
+            return s3_bucket_conn
+
+        results = {}
+        for name, create in (('new session per connector', new_session_connector),
+                             ('S3ClientRegistry', lambda: S3BucketConnector(
+                                 ACCESS_KEY, SECRET_KEY, ENDPOINT_URL, BUCKET))):
+            construction, first_request = 0.0, 0.0
+            for _ in range(connectors):
+                start = time.perf_counter()
+                s3_bucket_conn = create()
+                construction += time.perf_counter() - start
+                first_request += _timed(s3_bucket_conn.list_files_in_prefix, 'prefix/')
+            results[name] = (construction / connectors, first_request / connectors)
+    print(f'create {connectors} connectors to one endpoint, mean per connector')
+    for name, (construction, first_request) in results.items():
+        print(f'  {name + ":":<27}construction {construction * 1000:7.2f} ms, '
+              f'first request {first_request * 1000:7.2f} ms')
+
+
+def main():
+    """Entry point for the S3 benchmarks"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=48)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--max-workers', type=int, default=8)
+    parser.add_argument('--size-mb', type=int, default=256)
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--day-rows', type=int, default=500000)
+    parser.add_argument('--part-size-mb', type=int, default=8)
+    parser.add_argument('--upload-workers', type=int, default=4)
+    parser.add_argument('--connectors', type=int, default=20)
+    args = parser.parse_args()
+    bench_read_many_csv_as_df(args.files, args.rows, args.latency_ms / 1000, args.max_workers)
+    bench_read_csv_as_df_memory(args.size_mb, args.chunksize)
+    bench_read_csv_as_df_projection(args.day_rows)
+    bench_write_df_to_s3(args.size_mb, args.part_size_mb, args.upload_workers)
+    bench_connector_construction(args.connectors)
+
+
+if __name__ == '__main__':
+    main()
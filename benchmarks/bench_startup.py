@@ -0,0 +1,75 @@
+"""Benchmark the startup time of the CLI with python -X importtime, each
+command in a fresh interpreter
+
+Run with: python -m benchmarks.bench_startup --budget-ms 150
+Exits with 1 if importing the CLI takes longer than the budget or pulls in
+one of the heavy modules, which only the commands touching S3 may import
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'boto3', 'botocore')
+STARTUPS = {
+    'import xetra.cli': 'import xetra.cli',
+    'cli status --help': 'import sys, xetra.cli; sys.argv[1:] = ["status", "--help"]; '
+                         'xetra.cli.main()',
+    'import xetra_transformer': 'import xetra.transformers.xetra_transformer'
+}
+
+
+def import_profile(code: str, baseline: frozenset = frozenset()):
+    """Wall time of running code in a fresh interpreter, the cumulative import
+    time of its top level imports not in baseline in microseconds and the
+    imported modules"""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                             capture_output=True, text=True, check=False)
+    wall = time.perf_counter() - start
+    import_us, modules = 0, set()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        # nested imports are indented below their parent
+        if not name[1:].startswith(' ') and name.strip() not in baseline:
+            import_us += int(cumulative)
+    return wall, import_us, modules
+
+
+def bench_startup(repeat: int):
+    """Best wall and import time of each startup and the heavy modules it imports"""
+    # modules imported by the interpreter itself, as by site
+    baseline = frozenset(import_profile('pass')[2])
+    results = {}
+    for name, code in STARTUPS.items():
+        profiles = [import_profile(code, baseline) for _ in range(repeat)]
+        modules = profiles[0][2]
+        results[name] = (min(profile[0] for profile in profiles),
+                         min(profile[1] for profile in profiles),
+                         sorted(module for module in HEAVY_MODULES if module in modules))
+    return results
+
+
+def main():
+    """Entry point for the startup benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=150.0,
+                        help='budget of the import time of the CLI')
+    args = parser.parse_args()
+    results = bench_startup(args.repeat)
+    for name, (wall, import_us, heavy) in results.items():
+        print(f'{name + ":":<26}{wall * 1000:9.1f} ms wall {import_us / 1000:9.1f} ms imports'
+              f'  heavy: {", ".join(heavy) or "-"}')
+    _, cli_import_us, cli_heavy = results['import xetra.cli']
+    if cli_heavy or cli_import_us / 1000 > args.budget_ms:
+        print(f'CLI startup over budget of {args.budget_ms} ms or imports {cli_heavy}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark of a report 1 replay from a local directory against the S3 path
+
+The synthetic source files are written once to a mocked S3 bucket and once to
+a local directory, then report 1 is run over the same dates on each backend
+
+Run with: python -m benchmarks.bench_storage
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from moto import mock_s3
+
+from benchmarks.bench_s3 import _add_latency, _create_connector
+from benchmarks.bench_transformer import SOURCE_CONFIG, TARGET_CONFIG
+from benchmarks.data_generator import XetraBinsGenerator
+from xetra.common.local_storage import LocalStorageConnector
+from xetra.transformers.xetra_transformer import XetraETL
+
+META_KEY = 'meta/report1/xetra_report1_meta_file.csv'
+
+
+def _replay(s3_bucket_src, s3_bucket_trg, dates: list, repeat: int):
+    """Best wall time of repeat report 1 runs over dates"""
+    durations = []
+    for _ in range(repeat):
+        etl = XetraETL(s3_bucket_src, s3_bucket_trg, META_KEY, SOURCE_CONFIG, TARGET_CONFIG)
+        etl.extract_date, etl.extract_date_list = dates[1], dates
+        etl.meta_update_list = dates[1:]
+        start = time.perf_counter()
+        etl.etl_report1()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def bench_replay(isins: int, activity: float, days: int, latency: float, repeat: int):
+    """Compare report 1 from the local backend with the mocked S3 path"""
+    generator = XetraBinsGenerator(isins=isins, activity=activity)
+    dates = generator.dates(days)
+    results = {}
+    with tempfile.TemporaryDirectory() as local_dir:
+        rows, size = 0, 0
+        for key, file_rows, body in generator.iter_files(days):
+            path = os.path.join(local_dir, 'xetra-bench', *key.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(body)
+            rows, size = rows + file_rows, size + len(body)
+        results['local'] = _replay(LocalStorageConnector(local_dir, 'xetra-bench'),
+                                   LocalStorageConnector(local_dir, 'xetra-bench-trg'),
+                                   dates, repeat)
+    with mock_s3():
+        s3_bucket_src = _create_connector()
+        s3_bucket_trg = _create_connector('xetra-bench-trg')
+        generator.seed_bucket(s3_bucket_src._bucket, days)
+        results['S3 (moto)'] = _replay(s3_bucket_src, s3_bucket_trg, dates, repeat)
+        if latency:
+            _add_latency(s3_bucket_src, latency)
+            results[f'S3 (moto, {latency * 1000:.0f} ms)'] = _replay(
+                s3_bucket_src, s3_bucket_trg, dates, repeat)
+    print(f'etl_report1 over {days} days, {isins} ISINs, {rows:,d} rows, '
+          f'{size / 2**20:.1f} MB, best of {repeat}')
+    for name, duration in results.items():
+        print(f'  {name + ":":<26}{duration:8.3f} s {rows / duration:14,.0f} rows/s '
+              f'{size / 2**20 / duration:8.1f} MB/s')
+    print(f'  local speedup:            {results["S3 (moto)"] / results["local"]:8.2f} x')
+
+
+def main():
+    """Entry point for the storage benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--isins', type=int, default=3000)
+    parser.add_argument('--activity', type=float, default=0.1)
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    bench_replay(args.isins, args.activity, args.days, args.latency_ms / 1000, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Benchmarks for the XetraETL transformations
+
+Run with: python -m benchmarks.bench_transformer --rows 1000000 10000000 50000000
+
+The worker processes of etl_report1_parallel inherit the mocked bucket, so
+the scaling benchmark needs the fork start method (Linux default)
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from moto import mock_s3
+
+from xetra.transformers.xetra_transformer import XetraETL, XetraSourceConfig, XetraTargetConfig
+from benchmarks.bench_s3 import _add_latency, _create_connector, _traced_peak
+
+SOURCE_CONFIG = XetraSourceConfig(
+    src_first_extract_date='2022-01-03',
+    src_columns=['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice', 'EndPrice',
+                 'MinPrice', 'MaxPrice', 'TradedVolume'],
+    src_col_date='Date', src_col_isin='ISIN', src_col_time='Time',
+    src_col_start_price='StartPrice', src_col_min_price='MinPrice',
+    src_col_max_price='MaxPrice', src_col_traded_vol='TradedVolume')
+TARGET_CONFIG = XetraTargetConfig(
+    trg_col_isin='isin', trg_col_date='date', trg_col_open_price='opening_price_eur',
+    trg_col_close_price='closing_price_eur', trg_col_min_price='minimum_price_eur',
+    trg_col_max_price='maximum_price_eur', trg_col_daily_traded_vol='daily_traded_volume',
+    trg_col_ch_prev_close='change_prev_closing_%', trg_key='report1/xetra_daily_report1_',
+    trg_key_date_format='%Y%m%d_%H%M%S', trg_format='parquet')
+
+
+def _trades_frame(rows: int, isins: int = 3000, days: int = 20, seed: int = 42):
+    """Synthetic extracted source dataframe, ISIN, Date and Time are categorical
+    to keep tens of millions of rows in memory"""
+    rng = np.random.default_rng(seed)
+    isin_names = [f'DE000{num:07d}' for num in range(isins)]
+    date_names = pd.bdate_range('2022-01-03', periods=days).strftime('%Y-%m-%d')
+    time_names = [f'{minute // 60:02d}:{minute % 60:02d}' for minute in range(480, 1050)]
+    price = rng.uniform(1, 500, rows)
+    return pd.DataFrame({
+        'ISIN': pd.Categorical.from_codes(rng.integers(0, isins, rows), isin_names),
+        'Mnemonic': 'M',
+        'Date': pd.Categorical.from_codes(np.sort(rng.integers(0, days, rows)), date_names),
+        'Time': pd.Categorical.from_codes(rng.integers(0, len(time_names), rows), time_names),
+        'StartPrice': price,
+        'EndPrice': price,
+        'MinPrice': price * 0.99,
+        'MaxPrice': price * 1.01,
+        'TradedVolume': rng.integers(1, 10000, rows)
+    })
+
+
+def bench_transform_report1(rows_list: list, repeat: int):
+    """Report rows per second of transform_report1 at several table sizes"""
+    with mock_s3():
+        xetra_etl = XetraETL(_create_connector(), _create_connector('xetra-bench-trg'), 'meta.csv',
+                             SOURCE_CONFIG, TARGET_CONFIG)
+    for rows in rows_list:
+        data_frame = _trades_frame(rows)
+        xetra_etl.meta_update_list = list(data_frame['Date'].cat.categories)
+        best = min(_timed(xetra_etl.transform_report1, data_frame) for _ in range(repeat))
+        print(f'transform_report1 {rows:>11,d} rows: {best:8.3f} s '
+              f'{rows / best:14,.0f} rows/s')
+        del data_frame
+
+
+def _put_source_files(s3_bucket_src, days: int, rows_per_day: int):
+    """Put hourly source files of the synthetic trades and return the dates"""
+    data_frame = _trades_frame(rows_per_day * days, days=days)
+    for date, day_frame in data_frame.groupby('Date', observed=True):
+        for hour, hour_frame in day_frame.groupby(day_frame['Time'].str[:2]):
+            s3_bucket_src._bucket.put_object(
+                Body=hour_frame.to_csv(index=False).encode('utf-8'),
+                Key=f'{date}/{date}_BINS_XETR{hour}.csv')
+    return list(data_frame['Date'].cat.categories)
+
+
+def bench_etl_report1_parallel(days: int, rows_per_day: int, workers_list: list):
+    """Report the wall time of etl_report1 and etl_report1_parallel by worker count"""
+    with mock_s3():
+        s3_bucket_src = _create_connector()
+        s3_bucket_trg = _create_connector('xetra-bench-trg')
+        dates = _put_source_files(s3_bucket_src, days, rows_per_day)
+        xetra_etl = XetraETL(s3_bucket_src, s3_bucket_trg, 'meta.csv',
+                             SOURCE_CONFIG, TARGET_CONFIG)
+        xetra_etl.extract_date, xetra_etl.extract_date_list = dates[1], dates
+        print(f'etl_report1 over {days} days x {rows_per_day:,d} rows')
+        for workers in workers_list:
+            xetra_etl.meta_update_list = dates[1:]
+            if workers == 1:
+                duration = _timed(xetra_etl.etl_report1)
+            else:
+                duration = _timed(xetra_etl.etl_report1_parallel, workers)
+            print(f'  {workers:3d} workers: {duration:8.3f} s')
+
+
+def bench_etl_report1_pipelined(days: int, rows_per_day: int, latency: float,
+                                download_workers: int, queue_size: int):
+    """Compare the wall time and memory peak of etl_report1 with
+    etl_report1_pipelined and print the queue depths and stage timings"""
+    with mock_s3():
+        s3_bucket_src = _create_connector()
+        s3_bucket_trg = _create_connector('xetra-bench-trg')
+        dates = _put_source_files(s3_bucket_src, days, rows_per_day)
+        _add_latency(s3_bucket_src, latency)
+        xetra_etl = XetraETL(s3_bucket_src, s3_bucket_trg, 'meta.csv',
+                             SOURCE_CONFIG, TARGET_CONFIG)
+        xetra_etl.extract_date, xetra_etl.extract_date_list = dates[1], dates
+        print(f'etl_report1 over {days} days x {rows_per_day:,d} rows, '
+              f'{latency * 1000:.0f} ms latency')
+        for name, func, args in (
+                ('sequential', xetra_etl.etl_report1, ()),
+                (f'pipelined ({download_workers} downloaders, queues of {queue_size})',
+                 xetra_etl.etl_report1_pipelined, (download_workers, queue_size))):
+            # timed and traced in separate runs, tracing slows down pandas
+            xetra_etl.meta_update_list = dates[1:]
+            peak = _traced_peak(func, *args)
+            xetra_etl.meta_update_list = dates[1:]
+            duration = _timed(func, *args)
+            print(f'  {name + ":":<45}{duration:8.3f} s {peak:8.1f} MB')
+        for stage, stats in xetra_etl.pipeline_stats['stages'].items():
+            print(f'    stage {stage:<10} busy {stats["busy_s"]:8.3f} s, {stats["items"]} items')
+        for queue, stats in xetra_etl.pipeline_stats['queues'].items():
+            print(f'    queue {queue:<10} max depth {stats["max_depth"]:3d}, mean depth '
+                  f'{stats["mean_depth"]:6.2f}, producers waited {stats["put_wait_s"]:7.3f} s')
+
+
+def _timed(func, *args):
+    """Return the wall time of one function call in seconds"""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    """Entry point for the transformation benchmarks"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 10000000, 50000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--days', type=int, default=20)
+    parser.add_argument('--rows-per-day', type=int, default=200000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--download-workers', type=int, default=8)
+    parser.add_argument('--queue-size', type=int, default=16)
+    args = parser.parse_args()
+    bench_transform_report1(args.rows, args.repeat)
+    bench_etl_report1_parallel(args.days, args.rows_per_day, args.workers)
+    bench_etl_report1_pipelined(args.days, args.rows_per_day, args.latency_ms / 1000,
+                                args.download_workers, args.queue_size)
+
+
+if __name__ == '__main__':
+    main()
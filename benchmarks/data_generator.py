@@ -0,0 +1,101 @@
+"""Deterministic generator of synthetic Xetra BINS source files
+
+The same parameters always give the same files byte for byte, so benchmark
+results of different commits are comparable
+"""
+import numpy as np
+import pandas as pd
+
+BINS_COLUMNS = ['ISIN', 'Mnemonic', 'SecurityDesc', 'SecurityType', 'Currency', 'SecurityID',
+                'Date', 'Time', 'StartPrice', 'MaxPrice', 'MinPrice', 'EndPrice',
+                'TradedVolume', 'NumberOfTrades']
+
+
+class XetraBinsGenerator():
+    """Synthetic Xetra BINS data, one row per ISIN and minute with trades
+
+    The ISINs trade with a power law distributed activity, activity is the
+    mean share of the minutes an ISIN trades in. Prices follow a random walk
+    per ISIN across the minutes of a day. The rows of each trading hour are one
+    source file {date}/{date}_BINS_XETR{hour}.csv as in the Deutsche Boerse
+    public data set
+    """
+
+    def __init__(self, isins: int = 3000, activity: float = 0.1, seed: int = 42,
+                 start_date: str = '2022-01-03', hours: tuple = tuple(range(8, 17))):
+        """
+        Constructor for XetraBinsGenerator
+        """
+        self.isins = isins
+        self.activity = activity
+        self.seed = seed
+        self.start_date = start_date
+        self.hours = hours
+        rng = np.random.default_rng(seed)
+        self._isin_names = np.array([f'DE{num:09d}{num % 10}' for num in range(isins)])
+        self._mnemonics = np.array([f'X{num:04d}' for num in range(isins)])
+        self._descs = np.array([f'SYNTHETIC SECURITY {num} AG' for num in range(isins)])
+        self._security_ids = 2504000 + np.arange(isins)
+        weights = 1 / np.arange(1, isins + 1) ** 0.8
+        self._activity = np.clip(weights / weights.mean() * activity, 0, 1)[
+            rng.permutation(isins)]
+        self._open_prices = np.exp(rng.normal(3.5, 1.0, isins)).round(2)
+
+    def dates(self, days: int):
+        """The first days trading days from start_date"""
+        return [str(date.date()) for date in pd.bdate_range(self.start_date, periods=days)]
+
+    def day_frame(self, day_index: int):
+        """All source rows of the trading day day_index, sorted by time and ISIN"""
+        rng = np.random.default_rng([self.seed, day_index])
+        date = self.dates(day_index + 1)[day_index]
+        minutes = np.arange(self.hours[0] * 60, (self.hours[-1] + 1) * 60)
+        # days are generated independently of each other, the opening prices
+        # drift with the square root of the day index as in a random walk
+        open_prices = self._open_prices * np.exp(rng.normal(0, 0.02 * np.sqrt(day_index + 1),
+                                                            self.isins))
+        returns = rng.normal(0, 0.001, (len(minutes), self.isins))
+        prices = open_prices * np.exp(np.cumsum(returns, axis=0))
+        minute_idx, isin_idx = np.nonzero(rng.random((len(minutes), self.isins)) < self._activity)
+        start = prices[minute_idx, isin_idx]
+        end = start * np.exp(rng.normal(0, 0.0005, len(start)))
+        high = np.maximum(start, end) * (1 + rng.exponential(0.0005, len(start)))
+        low = np.minimum(start, end) * (1 - rng.exponential(0.0005, len(start)))
+        minute = minutes[minute_idx]
+        return pd.DataFrame({
+            'ISIN': self._isin_names[isin_idx],
+            'Mnemonic': self._mnemonics[isin_idx],
+            'SecurityDesc': self._descs[isin_idx],
+            'SecurityType': 'Common stock',
+            'Currency': 'EUR',
+            'SecurityID': self._security_ids[isin_idx],
+            'Date': date,
+            'Time': np.char.add(np.char.add(np.char.zfill((minute // 60).astype(str), 2), ':'),
+                                np.char.zfill((minute % 60).astype(str), 2)),
+            'StartPrice': start.round(2),
+            'MaxPrice': high.round(2),
+            'MinPrice': low.round(2),
+            'EndPrice': end.round(2),
+            'TradedVolume': rng.zipf(1.8, len(start)).clip(max=10**6) * 10,
+            'NumberOfTrades': rng.zipf(2.0, len(start)).clip(max=500)
+        }, columns=BINS_COLUMNS)
+
+    def iter_files(self, days: int):
+        """Yield the key, number of rows and CSV content of the hourly source
+        files of the first days trading days"""
+        for day_index, date in enumerate(self.dates(days)):
+            day_frame = self.day_frame(day_index)
+            hours = day_frame['Time'].str[:2]
+            for hour in self.hours:
+                hour_frame = day_frame[hours == f'{hour:02d}']
+                yield (f'{date}/{date}_BINS_XETR{hour:02d}.csv', len(hour_frame),
+                       hour_frame.to_csv(index=False).encode('utf-8'))
+
+    def seed_bucket(self, bucket, days: int):
+        """Put the source files of the first days trading days to the boto3
+        Bucket and return the number of files, rows and bytes"""
+        files, rows, size = 0, 0, 0
+        for key, file_rows, body in self.iter_files(days):
+            bucket.put_object(Body=body, Key=key)
+            files, rows, size = files + 1, rows + file_rows, size + len(body)
+        return files, rows, size
@@ -0,0 +1,189 @@
+"""Benchmark suite of the S3 connector, the meta process and report 1 on
+synthetic Xetra BINS data at several scales, against a mocked S3 bucket
+
+Run with: python -m benchmarks.run_suite --scales small medium --output results.json
+Compare the results of two commits, exits with 1 on a regression:
+python -m benchmarks.run_suite --compare baseline.json results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import boto3
+import botocore
+import moto
+import pandas as pd
+import pyarrow
+from moto import mock_s3
+
+from benchmarks.bench_s3 import _create_connector
+from benchmarks.bench_transformer import SOURCE_CONFIG, TARGET_CONFIG
+from benchmarks.data_generator import XetraBinsGenerator
+from xetra.common.meta_process import MetaProcess
+from xetra.common.metrics import METRICS
+from xetra.transformers.xetra_transformer import XetraETL
+
+SCALES = {
+    'small': {'isins': 500, 'activity': 0.05, 'days': 2},
+    'medium': {'isins': 3000, 'activity': 0.1, 'days': 5},
+    'large': {'isins': 3000, 'activity': 0.25, 'days': 20}
+}
+META_KEY = 'meta/report1/xetra_report1_meta_file.csv'
+
+
+def _measure(func, repeat: int, rows: int = 0, size: int = 0):
+    """Best and median wall time of repeat calls and the throughput of the best"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    best = min(durations)
+    return {'seconds_min': round(best, 6),
+            'seconds_median': round(statistics.median(durations), 6),
+            'runs': repeat, 'rows': rows, 'bytes': size,
+            'rows_per_s': round(rows / best, 1), 'mb_per_s': round(size / 2**20 / best, 3)}
+
+
+def bench_scale(name: str, isins: int, activity: float, days: int, repeat: int):
+    """Seed a mocked bucket with the synthetic data of one scale and time the
+    connector methods, the meta process and the full report 1 run"""
+    results = {}
+    generator = XetraBinsGenerator(isins=isins, activity=activity)
+    dates = generator.dates(days)
+    with mock_s3():
+        s3_bucket_src = _create_connector()
+        s3_bucket_trg = _create_connector('xetra-bench-trg')
+        files, rows, size = generator.seed_bucket(s3_bucket_src._bucket, days)
+        print(f'[{name}] {isins} ISINs, {days} days, {files} files, {rows:,d} rows, '
+              f'{size / 2**20:.1f} MB')
+        keys = [key for date in dates for key in s3_bucket_src.list_files_in_prefix(date)]
+        day_keys = s3_bucket_src.list_files_in_prefix(dates[0])
+        largest = max(s3_bucket_src._bucket.objects.filter(Prefix=dates[0]),
+                      key=lambda obj: obj.size)
+        day_frame = s3_bucket_src.read_many_csv_as_df(day_keys)
+        etl = XetraETL(s3_bucket_src, s3_bucket_trg, META_KEY, SOURCE_CONFIG, TARGET_CONFIG)
+        read_kwargs = etl.reader.read_kwargs()
+        isins_read = list(day_frame['ISIN'].unique()[:10])
+        partitioned_rows = int(day_frame['ISIN'].isin(isins_read).sum())
+
+        results['list_files_in_prefix'] = _measure(
+            lambda: [s3_bucket_src.list_files_in_prefix(date) for date in dates], repeat,
+            rows=len(keys))
+        results['read_csv_as_df'] = _measure(
+            lambda: s3_bucket_src.read_csv_as_df(largest.key, **read_kwargs), repeat,
+            rows=len(s3_bucket_src.read_csv_as_df(largest.key)), size=largest.size)
+        results['read_many_csv_as_df'] = _measure(
+            lambda: s3_bucket_src.read_many_csv_as_df(day_keys, **read_kwargs), repeat,
+            rows=len(day_frame), size=sum(obj.size for obj in
+                                          s3_bucket_src._bucket.objects.filter(Prefix=dates[0])))
+        for file_format in ('csv', 'parquet'):
+            results[f'write_df_to_s3_{file_format}'] = _measure(
+                lambda: s3_bucket_trg.write_df_to_s3(day_frame, f'bench.{file_format}',
+                                                     file_format), repeat, rows=len(day_frame))
+        results['write_df_to_s3_partitioned'] = _measure(
+            lambda: s3_bucket_trg.write_df_to_s3_partitioned(
+                day_frame, 'partitioned/', 'Date', 'ISIN', isin_buckets=16), repeat,
+            rows=len(day_frame))
+        results['read_parquet_partitioned'] = _measure(
+            lambda: s3_bucket_trg.read_parquet_partitioned(
+                'partitioned/', dates[0], dates[0], 'ISIN', isins_read, isin_buckets=16), repeat,
+            rows=partitioned_rows)
+
+        results['update_meta_file'] = _measure(
+            lambda: MetaProcess.update_meta_file(dates, META_KEY, s3_bucket_trg), repeat,
+            rows=len(dates))
+        results['return_date_list'] = _measure(
+            lambda: MetaProcess.return_date_list(dates[0], META_KEY, s3_bucket_trg), repeat)
+
+        for method in ('etl_report1', 'etl_report1_pipelined'):
+            def run_etl(method=method):
+                etl.extract_date, etl.extract_date_list = dates[1], dates
+                etl.meta_update_list = dates[1:]
+                getattr(etl, method)()
+            METRICS.reset()
+            results[method] = _measure(run_etl, repeat, rows=rows, size=size)
+            results[method]['stages'] = METRICS.summary()['stages']
+    for bench, result in results.items():
+        print(f'  {bench:<30}{result["seconds_min"]:10.4f} s '
+              f'{result["rows_per_s"]:14,.0f} rows/s')
+    return {'params': {'isins': isins, 'activity': activity, 'days': days, 'files': files,
+                       'rows': rows, 'bytes': size}, 'benchmarks': results}
+
+
+def _git_commit():
+    """The current commit and whether the working tree has changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def run_suite(scales: list, repeat: int, output: str):
+    """Run the benchmarks of the scales and write the results to output"""
+    commit, dirty = _git_commit()
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit, 'dirty': dirty, 'repeat': repeat,
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'versions': {'pandas': pd.__version__, 'pyarrow': pyarrow.__version__,
+                     'boto3': boto3.__version__, 'botocore': botocore.__version__,
+                     'moto': moto.__version__},
+        'results': {name: bench_scale(name, repeat=repeat, **SCALES[name]) for name in scales}
+    }
+    with open(output, 'w', encoding='utf-8') as json_file:
+        json.dump(results, json_file, indent=2)
+    print(f'results written to {output}')
+
+
+def compare(baseline_path: str, results_path: str, threshold: float):
+    """Print the ratio of the best times of two result files, returns True if
+    a benchmark is slower than threshold times the baseline"""
+    with open(baseline_path, encoding='utf-8') as json_file:
+        baseline = json.load(json_file)
+    with open(results_path, encoding='utf-8') as json_file:
+        results = json.load(json_file)
+    print(f'{baseline["commit"]} -> {results["commit"]}')
+    regression = False
+    for scale, scale_results in results['results'].items():
+        if scale not in baseline['results']:
+            continue
+        for bench, result in scale_results['benchmarks'].items():
+            base = baseline['results'][scale]['benchmarks'].get(bench)
+            if base is None:
+                continue
+            ratio = result['seconds_min'] / base['seconds_min']
+            flag = 'REGRESSION' if ratio > threshold else ''
+            regression = regression or ratio > threshold
+            print(f'  {scale:<8}{bench:<30}{base["seconds_min"]:10.4f} s '
+                  f'{result["seconds_min"]:10.4f} s {ratio:6.2f} x {flag}')
+    return regression
+
+
+def main():
+    """Entry point for the benchmark suite"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small', 'medium'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'RESULTS'))
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    run_suite(args.scales, args.repeat, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+""" Test AsyncS3BucketConnector Methods"""
+
+import asyncio
+import os
+import time
+import unittest
+
+import boto3
+import pandas as pd
+from moto import mock_s3
+
+from xetra.common.async_s3 import AsyncS3BucketConnector
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
+
+
+class TestAsyncS3BucketConnector(unittest.TestCase):
+    """ Testing AsyncS3BucketConnector class methods"""
+
+    def setUp(self):
+        """ Environment set up"""
+        # mocking S3 connection start
+        self.mock_s3 = mock_s3()
+        self.mock_s3.start()
+        # connectors share clients, start each test with new ones
+        S3ClientRegistry.clear()
+        # Defining the class arguments
+        self.s3_access_key = 'AWS_ACCESS_KEY_ID'
+        self.s3_secret_key = 'AWS_SECRET_KEY_ID'
+        self.s3_endpoint_url = 'https://s3.us-west-2.amazonaws.com'
+        self.s3_bucket_name = 'test_bucket'
+        os.environ[self.s3_access_key] = 'KEY1'
+        os.environ[self.s3_secret_key] = 'KEY2'
+        # creating Bucket instance on mocked S3
+        self.s3 = boto3.resource(service_name='s3', endpoint_url=self.s3_endpoint_url)
+        self.s3.create_bucket(Bucket=self.s3_bucket_name,
+                              CreateBucketConfiguration={'LocationConstraint': 'us-west-2'})
+        self.s3_bucket = self.s3.Bucket(self.s3_bucket_name)
+
+    def tearDown(self):
+        """ Run after the tests"""
+        # mocking S3 connection stop
+        self.mock_s3.stop()
+
+    def _put_trading_days(self):
+        """Put two source files for each of 250 trading days on the mocked bucket"""
+        self.dates = [str(date.date()) for date in
+                      pd.bdate_range('2021-01-04', periods=250)]
+        self.keys = []
+        for date in self.dates:
+            for hour in ('08', '09'):
+                key = f'{date}/{date}_BINS_XETR{hour}.csv'
+                self.s3_bucket.put_object(Body=f'ISIN,Date,Time\nDE0001,{date},{hour}:00\n',
+                                          Key=key)
+                self.keys.append(key)
+
+    def _async_conn(self, **kwargs):
+        """Create a testing instance"""
+        return AsyncS3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                      self.s3_endpoint_url, self.s3_bucket_name, **kwargs)
+
+    def test_list_files_in_prefixes(self):
+        """Test list_files_in_prefixes lists 250 trading days in the order of the
+        prefixes and faster than the serial listing"""
+        #Test init
+        self._put_trading_days()
+        s3_bucket_conn = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                           self.s3_endpoint_url, self.s3_bucket_name)
+        async_conn = self._async_conn(max_concurrency=32)
+        # a round trip that moto does not have, both connectors share one client
+        s3_bucket_conn._client.meta.events.register('before-sign.s3.ListObjects',
+                                                    lambda **kwargs: time.sleep(0.01))
+        #Method Execution
+        start = time.perf_counter()
+        keys_serial = [key for date in self.dates
+                       for key in s3_bucket_conn.list_files_in_prefix(date)]
+        duration_serial = time.perf_counter() - start
+        start = time.perf_counter()
+        keys_result = asyncio.run(async_conn.list_files_in_prefixes(self.dates))
+        duration_async = time.perf_counter() - start
+        async_conn.close()
+        #Test after method execution
+        self.assertEqual(self.keys, keys_result)
+        self.assertEqual(keys_serial, keys_result)
+        self.assertLess(duration_async, duration_serial / 2)
+
+    def test_read_many_csv_as_df(self):
+        """Test read_many_csv_as_df fetches the files of 250 trading days in the
+        order of the keys"""
+        #Test init
+        self._put_trading_days()
+        #Expected Results
+        rows_exp = len(self.keys)
+        #Method Execution
+        async def list_and_fetch():
+            async with self._async_conn(max_concurrency=8) as async_conn:
+                keys = await async_conn.list_files_in_prefixes(self.dates)
+                return await async_conn.read_many_csv_as_df(keys, dtype={'ISIN': 'category'})
+        df_result = asyncio.run(list_and_fetch())
+        #Test after method execution
+        self.assertEqual(rows_exp, len(df_result))
+        self.assertEqual([date for date in self.dates for _ in range(2)],
+                         df_result['Date'].tolist())
+        self.assertEqual('category', df_result['ISIN'].dtype)
+
+    def test_read_many_csv_as_df_no_keys(self):
+        """Test read_many_csv_as_df returns an empty dataframe without keys"""
+        #Method Execution
+        async def fetch():
+            async with self._async_conn() as async_conn:
+                return await async_conn.read_many_csv_as_df([])
+        #Test after method execution
+        self.assertTrue(asyncio.run(fetch()).empty)
+
+    def test_iter_csv_as_df_closed_early(self):
+        """Test iter_csv_as_df cancels the reads in flight when the consumer
+        stops before all keys are submitted"""
+        #Test init
+        self._put_trading_days()
+        #Method Execution
+        async def fetch_first():
+            async with self._async_conn(max_concurrency=2) as async_conn:
+                frames = async_conn.iter_csv_as_df(self.keys)
+                first = await frames.__anext__()
+                await frames.aclose()
+                await asyncio.sleep(0)
+                return first, [task for task in asyncio.all_tasks()
+                               if task is not asyncio.current_task() and not task.done()]
+        df_first, tasks_left = asyncio.run(fetch_first())
+        #Test after method execution
+        self.assertEqual([self.dates[0]], df_first['Date'].tolist())
+        self.assertEqual([], tasks_left)
+
+    def test_write_df_to_s3(self):
+        """Test write_df_to_s3 writes through the wrapped connector"""
+        #Expected Results
+        key_exp = 'report.csv'
+        df_exp = pd.DataFrame({'col1': ['A', 'B'], 'col2': [1, 2]})
+        #Method Execution
+        async def write():
+            async with self._async_conn() as async_conn:
+                return await async_conn.write_df_to_s3(df_exp, key_exp, 'csv')
+        result = asyncio.run(write())
+        #Test after method execution
+        df_result = pd.read_csv(self.s3_bucket.Object(key=key_exp).get().get('Body'))
+        self.assertTrue(result)
+        self.assertTrue(df_exp.equals(df_result))
+
+
+if __name__ == '__main__':
+    unittest.main()
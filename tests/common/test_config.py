@@ -0,0 +1,91 @@
+"""Test Config Methods"""
+
+import os
+import unittest
+
+import yaml
+
+from xetra.common.config import (MetricsConfig, ReportConfig, RunConfig, S3Config,
+                                 XetraSourceConfig, XetraTargetConfig, load_config,
+                                 parse_config)
+from xetra.common.custom_exceptions import WrongConfigException
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'configs',
+                           'xetra_report1_config.yml')
+
+
+class TestConfigMethods(unittest.TestCase):
+    """Tests for the configuration functions"""
+
+    def setUp(self):
+        """ Environment set up"""
+        with open(CONFIG_PATH, encoding='utf-8') as config_file:
+            self.config = yaml.safe_load(config_file)
+
+    def test_load_config(self):
+        """Tests load_config validates the job configuration into the typed sections"""
+        # Method execution
+        config = load_config(CONFIG_PATH)
+        # Test after method execution
+        self.assertIsInstance(config.s3, S3Config)
+        self.assertIsInstance(config.source, XetraSourceConfig)
+        self.assertIsInstance(config.target, XetraTargetConfig)
+        self.assertEqual(XetraSourceConfig(**self.config['source']), config.source)
+        self.assertEqual(self.config['meta']['meta_key'], config.meta.meta_key)
+        # the YAML integer is taken as a float
+        self.assertIsInstance(config.s3.retry_max_delay_s, float)
+
+    def test_parse_config_defaults(self):
+        """Tests parse_config takes the defaults of missing optional keys and sections"""
+        # Test init
+        del self.config['run'], self.config['metrics'], self.config['s3']['file_retries']
+        # Method execution
+        config = parse_config(self.config)
+        # Test after method execution
+        self.assertEqual(RunConfig(), config.run)
+        self.assertEqual(MetricsConfig(), config.metrics)
+        self.assertEqual(S3Config._field_defaults['file_retries'], config.s3.file_retries)
+
+    def test_parse_config_reports(self):
+        """Tests parse_config overrides the target section with the target keys
+        of each report"""
+        # Test init
+        self.config['reports'] = [
+            {'name': 'report1', 'meta_key': 'meta/report1.csv'},
+            {'name': 'vwap', 'meta_key': 'meta/vwap.csv', 'target': {'trg_key': 'vwap/'}}]
+        # Method execution
+        config = parse_config(self.config)
+        target_exp = config.target
+        # Test after method execution
+        self.assertEqual((ReportConfig('report1', 'meta/report1.csv', target_exp),
+                          ReportConfig('vwap', 'meta/vwap.csv',
+                                       target_exp._replace(trg_key='vwap/'))), config.reports)
+        self.config['reports'][1]['target'] = {'trg_unknown': 'x'}
+        with self.assertRaises(WrongConfigException):
+            parse_config(self.config)
+
+    def test_parse_config_wrong(self):
+        """Tests parse_config raises WrongConfigException on unknown and missing
+        keys and sections and on values of the wrong type"""
+        # Test init
+        wrong_configs = []
+        for section, key, value in (('source', 'src_unknown', 'x'), ('target', 'trg_key', None),
+                                    ('run', 'workers', True), ('run', 'workers', '4'),
+                                    ('s3', 'retry_base_delay_s', 'fast')):
+            config = yaml.safe_load(yaml.safe_dump(self.config))
+            config[section][key] = value
+            wrong_configs.append(config)
+        config = yaml.safe_load(yaml.safe_dump(self.config))
+        del config['source']['src_col_isin']
+        wrong_configs.append(config)
+        wrong_configs.append({**self.config, 'unknown': {}})
+        wrong_configs.append({section: values for section, values in self.config.items()
+                              if section != 'meta'})
+        # Method execution
+        for config in wrong_configs:
+            with self.assertRaises(WrongConfigException):
+                parse_config(config)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+"""Test LocalStorageConnector Methods"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+
+from xetra.common.local_storage import LocalStorageConnector
+from xetra.common.meta_process import MetaProcess
+from xetra.common.storage import StorageConnector
+from xetra.transformers.xetra_transformer import XetraETL, XetraSourceConfig, XetraTargetConfig
+
+
+class TestLocalStorageConnectorMethods(unittest.TestCase):
+    """Tests for the LocalStorageConnector class"""
+
+    def setUp(self):
+        """ Environment set up"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.local_src = LocalStorageConnector(self.tmp_dir.name, 'src-bucket')
+        self.local_trg = LocalStorageConnector(self.tmp_dir.name, 'trg-bucket')
+        self.src_dir = os.path.join(self.tmp_dir.name, 'src-bucket')
+
+        # Source data
+        self.src_header = ('ISIN,Mnemonic,SecurityDesc,SecurityType,Currency,SecurityID,'
+                           'Date,Time,StartPrice,MaxPrice,MinPrice,EndPrice,'
+                           'TradedVolume,NumberOfTrades\n')
+        self.src_rows = [
+            'AT0000A0E9W5,SANT,S+T AG O.N.,Common stock,EUR,2504159,'
+            '2021-04-15,08:00,20.04,20.04,20.02,20.02,1002,3\n',
+            'DE000A0DJ6J9,S92,SMA SOLAR TECHNOL.AG,Common stock,EUR,2504287,'
+            '2021-04-15,15:00,37.80,37.90,37.70,37.90,1130,4\n',
+            'DE000A0DJ6J9,S92,SMA SOLAR TECHNOL.AG,Common stock,EUR,2504287,'
+            '2021-04-16,09:00,38.10,38.20,38.00,38.20,800,2\n'
+        ]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _put_file(self, key: str, body: str):
+        """Write body to the file of key in the source bucket"""
+        path = os.path.join(self.src_dir, *key.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(body)
+
+    def test_list_objects_in_prefix(self):
+        """Tests the list_objects_in_prefix method lists the keys with the
+        prefix in key order, without temporary files"""
+        # Expected results
+        keys_exp = ['2021-04-15/2021-04-15_BINS_XETR08.csv',
+                    '2021-04-15/2021-04-15_BINS_XETR15.csv']
+        # Test init
+        for key in reversed(keys_exp):
+            self._put_file(key, self.src_header)
+        self._put_file('2021-04-15/2021-04-15_BINS_XETR16.csv.0a1b.tmp', self.src_header)
+        self._put_file('2021-04-16/2021-04-16_BINS_XETR09.csv', self.src_header)
+        # Method execution
+        objects = self.local_src.list_objects_in_prefix('2021-04-15/2021-04-15_BINS')
+        # Test after method execution
+        self.assertIsInstance(self.local_src, StorageConnector)
+        self.assertEqual(keys_exp, [key for key, _, _ in objects])
+        self.assertEqual([len(self.src_header)] * 2, [size for _, size, _ in objects])
+        self.assertEqual(keys_exp, self.local_src.list_files_in_prefix('2021-04-15'))
+        self.assertEqual(3, len(self.local_src.list_files_in_prefix('')))
+        self.assertEqual([], self.local_src.list_files_in_prefix('2021-04-17/'))
+
+    def test_list_objects_in_prefix_walked(self):
+        """Tests the list_objects_in_prefix method walks only the entries of
+        the directory of the prefix that start with the rest of the prefix"""
+        # Test init
+        for key in ('2021-04-15/2021-04-15_BINS_XETR08.csv',
+                    '2021-04-16/2021-04-16_BINS_XETR09.csv', 'meta.csv', 'meta.csv_batches/20210415_batch.csv'):
+            self._put_file(key, self.src_header)
+        # Method execution
+        with patch('xetra.common.local_storage.os.walk', wraps=os.walk) as walk_mock:
+            keys_day = self.local_src.list_files_in_prefix('2021-04-15')
+            keys_meta = self.local_src.list_files_in_prefix('meta.csv')
+        # Test after method execution
+        self.assertEqual(['2021-04-15/2021-04-15_BINS_XETR08.csv'], keys_day)
+        self.assertEqual(['meta.csv', 'meta.csv_batches/20210415_batch.csv'], keys_meta)
+        self.assertEqual([os.path.join(self.src_dir, '2021-04-15'),
+                          os.path.join(self.src_dir, 'meta.csv_batches')],
+                         [call.args[0] for call in walk_mock.call_args_list])
+        self.assertEqual([], self.local_src.list_files_in_prefix('meta.csv/'))
+
+    def test_read_csv_as_df(self):
+        """Tests the read_csv_as_df method with the pandas and the pyarrow
+        parsers and chunks, and the exception of a missing key"""
+        # Test init
+        key = '2021-04-15/2021-04-15_BINS_XETR08.csv'
+        self._put_file(key, self.src_header + ''.join(self.src_rows))
+        # Method execution
+        df_result = self.local_src.read_csv_as_df(key, usecols=['ISIN', 'StartPrice'])
+        df_arrow = self.local_src.read_csv_as_df(key, usecols=['ISIN', 'StartPrice'],
+                                                 dtype={'StartPrice': 'float32'},
+                                                 engine='pyarrow')
+        chunks = list(self.local_src.read_csv_as_df(key, chunksize=2))
+        table = self.local_src.read_csv_as_table(key, columns=['ISIN'])
+        # Test after method execution
+        self.assertEqual([20.04, 37.80, 38.10], list(df_result['StartPrice']))
+        self.assertEqual('float32', df_arrow['StartPrice'].dtype)
+        self.assertEqual([2, 1], [len(chunk) for chunk in chunks])
+        self.assertEqual(['ISIN'], table.column_names)
+        with self.assertRaises(self.local_src.exceptions.NoSuchKey):
+            self.local_src.read_csv_as_df('2021-04-15/missing.csv')
+
+    def test_read_csv_as_df_pyarrow_closes_map(self):
+        """Tests the read_csv_as_df method with the pyarrow parser closes the
+        memory map of the file after the read"""
+        # Test init
+        key = '2021-04-15/2021-04-15_BINS_XETR08.csv'
+        self._put_file(key, self.src_header + ''.join(self.src_rows))
+        memory_map = pa.memory_map
+        sources = []
+
+        def open_map(*args, **kwargs):
+            sources.append(memory_map(*args, **kwargs))
+            return sources[-1]
+
+        # Method execution
+        with patch('xetra.common.local_storage.pa.memory_map', side_effect=open_map):
+            df_arrow = self.local_src.read_csv_as_df(key, usecols=['ISIN', 'StartPrice'],
+                                                     engine='pyarrow')
+        # Test after method execution
+        self.assertEqual([20.04, 37.80, 38.10], list(df_arrow['StartPrice']))
+        self.assertEqual(1, len(sources))
+        self.assertTrue(sources[0].closed)
+
+    def test_write_df_to_s3_parquet(self):
+        """Tests the write_df_to_s3 method writes a Parquet object read back
+        memory mapped and by range, and delete_objects removes it"""
+        # Test init
+        key = 'report1/report.parquet'
+        df_report = pd.DataFrame({'isin': ['AT0000A0E9W5', 'DE000A0DJ6J9'],
+                                  'closing_price_eur': [20.02, 37.90]})
+        # Method execution
+        result = self.local_trg.write_df_to_s3(df_report, key, 'parquet')
+        df_result = self.local_trg.read_parquet_as_df(key, columns=['isin'])
+        tail, size = self.local_trg.read_range(key, -4)
+        head, _ = self.local_trg.read_range(key, 0, 3)
+        self.local_trg.delete_objects([key, 'report1/missing.parquet'])
+        # Test after method execution
+        self.assertTrue(result)
+        self.assertEqual(list(df_report['isin']), list(df_result['isin']))
+        self.assertEqual((b'PAR1', b'PAR1'), (head, tail))
+        self.assertGreater(size, 8)
+        self.assertEqual([], self.local_trg.list_files_in_prefix('report1/'))
+
+    def test_etl_report1(self):
+        """Tests MetaProcess and XetraETL run unchanged against the local backend"""
+        # Test init
+        self._put_file('2021-04-15/2021-04-15_BINS_XETR08.csv',
+                       self.src_header + ''.join(self.src_rows[:2]))
+        self._put_file('2021-04-16/2021-04-16_BINS_XETR09.csv',
+                       self.src_header + self.src_rows[2])
+        meta_key = 'meta/report1_meta.csv'
+        source_config = XetraSourceConfig(
+            src_first_extract_date='2021-04-16',
+            src_columns=['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice', 'EndPrice',
+                         'MinPrice', 'MaxPrice', 'TradedVolume'],
+            src_col_date='Date', src_col_isin='ISIN', src_col_time='Time',
+            src_col_start_price='StartPrice', src_col_min_price='MinPrice',
+            src_col_max_price='MaxPrice', src_col_traded_vol='TradedVolume')
+        target_config = XetraTargetConfig(
+            trg_col_isin='isin', trg_col_date='date', trg_col_open_price='opening_price_eur',
+            trg_col_close_price='closing_price_eur', trg_col_min_price='minimum_price_eur',
+            trg_col_max_price='maximum_price_eur', trg_col_daily_traded_vol='daily_traded_volume',
+            trg_col_ch_prev_close='change_prev_closing_%', trg_key='report1/xetra_daily_report1_',
+            trg_key_date_format='%Y%m%d_%H%M%S', trg_format='parquet')
+        MetaProcess.update_meta_file(
+            list(pd.date_range('2021-04-17', datetime.today()).strftime('%Y-%m-%d')),
+            meta_key, self.local_trg)
+        xetra_etl = XetraETL(self.local_src, self.local_trg, meta_key,
+                             source_config, target_config)
+        # Method execution
+        xetra_etl.etl_report1()
+        # Test after method execution
+        trg_keys = self.local_trg.list_files_in_prefix(target_config.trg_key)
+        df_result = self.local_trg.read_parquet_as_df(trg_keys[0])
+        self.assertEqual(['DE000A0DJ6J9'], list(df_result['isin']))
+        self.assertEqual([0.79], list(df_result['change_prev_closing_%']))
+        self.assertEqual([], MetaProcess.return_date_list('2021-04-16', meta_key,
+                                                          self.local_trg)[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
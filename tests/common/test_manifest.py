@@ -0,0 +1,112 @@
+"""Test SourceManifest Methods"""
+
+import os
+import unittest
+from datetime import datetime, timedelta
+
+import boto3
+from moto import mock_s3
+
+from xetra.common.manifest import SourceManifest
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
+from xetra.common.constants import ManifestFormat
+
+
+class TestSourceManifestMethods(unittest.TestCase):
+    """Tests for the SourceManifest class"""
+
+    def setUp(self):
+        """ Environment set up"""
+        # mocking S3 connection start
+        self.mock_s3 = mock_s3()
+        self.mock_s3.start()
+        # connectors share clients, start each test with new ones
+        S3ClientRegistry.clear()
+
+        # Defining the class arguments for the S3Bucket COnnector
+        self.s3_access_key = 'AWS_ACCESS_KEY_ID'
+        self.s3_secret_key = 'AWS_SECRET_KEY_ID'
+        self.s3_endpoint_url = 'https://s3.us-west-2.amazonaws.com'
+        self.s3_bucket_name_src = 'src-bucket'
+        self.s3_bucket_name_meta = 'meta-bucket'
+        self.manifest_key = 'meta/source_manifest.parquet'
+
+        # Creating S3 access keys as environment variables
+        os.environ[self.s3_access_key] = 'KEY1'
+        os.environ[self.s3_secret_key] = 'KEY2'
+
+        #creating  Bucket instances on mocked S3
+        self.s3 = boto3.resource(service_name='s3', endpoint_url=self.s3_endpoint_url)
+        for bucket in (self.s3_bucket_name_src, self.s3_bucket_name_meta):
+            self.s3.create_bucket(Bucket=bucket,
+                                  CreateBucketConfiguration={
+                                      'LocationConstraint' : 'us-west-2'
+                                  })
+        self.src_bucket = self.s3.Bucket(self.s3_bucket_name_src)
+
+        #Creating S3BucketConnector testing instances
+        self.s3_bucket_src = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                               self.s3_endpoint_url, self.s3_bucket_name_src)
+        self.s3_bucket_meta = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                                self.s3_endpoint_url, self.s3_bucket_name_meta)
+
+        # source files of the last six days, none on the day before yesterday
+        self.dates = [(datetime.today() - timedelta(days=day)).strftime(
+            ManifestFormat.MANIFEST_DATE_FORMAT.value) for day in range(5, -1, -1)]
+        self.keys = {date: [f'{date}/{date}_BINS_XETR{hour:02d}.csv' for hour in (8, 9)]
+                     for date in self.dates}
+        self.keys[self.dates[3]] = []
+        for keys in self.keys.values():
+            for key in keys:
+                self.src_bucket.put_object(Body='ISIN\nDE0001\n', Key=key)
+
+        # LIST requests of the source bucket
+        self.listed = []
+        self.s3_bucket_src._client.meta.events.register(
+            'before-parameter-build.s3.ListObjects',
+            lambda params, **kwargs: self.listed.append(params['Prefix']))
+
+    def tearDown(self):
+        # mocking S3 connection stop
+        self.mock_s3.stop()
+
+    def test_files_lists_once(self):
+        """Tests the files method lists each date once, later runs read the
+        complete dates from the persisted manifest"""
+        # Test init
+        manifest = SourceManifest(self.s3_bucket_src, self.s3_bucket_meta, self.manifest_key)
+        # Method execution
+        files_first = manifest.files(self.dates[:-1])
+        listed_first = list(self.listed)
+        self.listed.clear()
+        files_again = manifest.files(self.dates[:-1])
+        files_next_run = SourceManifest(self.s3_bucket_src, self.s3_bucket_meta,
+                                        self.manifest_key).files(self.dates[:-1])
+        # Test after method execution
+        self.assertEqual(self.dates[:-1], sorted(listed_first))
+        self.assertEqual([], self.listed)
+        for files in (files_first, files_again, files_next_run):
+            self.assertEqual({date: self.keys[date] for date in self.dates[:-1]}, files)
+        self.assertEqual(self.src_bucket.Object(self.keys[self.dates[0]][0]).e_tag,
+                         self.s3_bucket_src._etags[self.keys[self.dates[0]][0]])
+
+    def test_files_relists_today(self):
+        """Tests the files method lists today and dates not in the manifest
+        again, as their files may still be published"""
+        # Test init
+        SourceManifest(self.s3_bucket_src, self.s3_bucket_meta,
+                       self.manifest_key).files(self.dates[2:])
+        self.listed.clear()
+        late_key = f'{self.dates[-1]}/{self.dates[-1]}_BINS_XETR10.csv'
+        self.src_bucket.put_object(Body='ISIN\nDE0001\n', Key=late_key)
+        # Method execution
+        files = SourceManifest(self.s3_bucket_src, self.s3_bucket_meta,
+                               self.manifest_key).files(self.dates)
+        # Test after method execution
+        self.assertEqual(self.dates[:2] + self.dates[-1:], sorted(self.listed))
+        self.assertEqual(self.keys[self.dates[-1]] + [late_key], files[self.dates[-1]])
+        self.assertEqual([], files[self.dates[3]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,14 +2,17 @@
 
 from io import StringIO
 import os
+import time
 import unittest
+from unittest.mock import patch
 from datetime import  datetime, timedelta
+import numpy as np
 import pandas as pd
 import boto3
 from moto import mock_s3
 
 from xetra.common.meta_process import MetaProcess
-from xetra.common.s3 import S3BucketConnector
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
 from xetra.common.constants import MetaProcessFormat
 from xetra.common.custom_exceptions import WrongMetaFIleException
 
@@ -21,6 +24,8 @@ class TestMetaProcessMethods(unittest.TestCase):
         # mocking S3 connection start
         self.mock_s3 = mock_s3()
         self.mock_s3.start()
+        # connectors share clients, start each test with new ones
+        S3ClientRegistry.clear()
 
         # Defining the class arguments for the S3Bucket COnnector
         self.s3_access_key = 'AWS_ACCESS_KEY_ID'
@@ -66,8 +71,9 @@ class TestMetaProcessMethods(unittest.TestCase):
 
         #Method Execution
         MetaProcess.update_meta_file(date_list_exp,meta_key,self.s3_bucket_meta)
-        #Read Meta File
-        data=self.s3_bucket.Object(key=meta_key).get().getBody().read.decode('utf-8')
+        #Read the batch file
+        batch_keys = [obj.key for obj in self.s3_bucket.objects.filter(Prefix=meta_key)]
+        data=self.s3_bucket.Object(key=batch_keys[0]).get().get('Body').read().decode('utf-8')
         out_buffer = StringIO(data)
         df_meta_result = pd.read_csv(out_buffer)
         date_list_result = list(df_meta_result[MetaProcessFormat.META_SOURCE_DATE_COL.value])
@@ -75,23 +81,21 @@ class TestMetaProcessMethods(unittest.TestCase):
                             .dt.date)
 
         #Tests after execution
+        self.assertEqual(1, len(batch_keys))
+        self.assertTrue(batch_keys[0].startswith(f'{meta_key}_batches/'))
         self.assertEqual(date_list_exp,date_list_result)
         self.assertEqual(proc_date_list_exp,proc_date_list_result)
         #Cleanup
         self.s3_bucket.delete_objects(
             Delete={
-                'Objects': [
-                    {
-                        'Key': meta_key
-                    }
-                ]
+                'Objects': [{'Key': key} for key in batch_keys]
             }
         )
 
     def test_update_meta_file_empty_date_list(self):
         """Test update_meta_file method when date_list argument is empty"""
         #Expected Results
-        return_exp = 'True'
+        return_exp = True
         log_exp = 'The dataframe is empty. No file will be written to S3'
         #Test Init
         date_list_exp = []
@@ -100,9 +104,10 @@ class TestMetaProcessMethods(unittest.TestCase):
         with self.assertLogs() as logm:
             result = MetaProcess.update_meta_file(date_list_exp,meta_key,self.s3_bucket_meta)
             #Test log message after execution
-            self.assertIn(log_exp,logm.output[1])
+            self.assertIn(log_exp,logm.output[0])
         #Test after method execution
         self.assertEqual(return_exp,result)
+        self.assertEqual([], list(self.s3_bucket.objects.all()))
 
     def test_update_meta_file_ok(self):
         """Test update_meta_file method when there is a meta file already in the S3"""
@@ -128,9 +133,7 @@ class TestMetaProcessMethods(unittest.TestCase):
         MetaProcess.update_meta_file(date_list_new,meta_key,self.s3_bucket_meta)
 
         #Read Meta File
-        data=self.s3_bucket.Object(key=meta_key).get().getBody().read.decode('utf-8')
-        out_buffer = StringIO(data)
-        df_meta_result = pd.read_csv(out_buffer)
+        df_meta_result = MetaProcess.read_meta_file(meta_key, self.s3_bucket_meta)
         date_list_result = list(df_meta_result[MetaProcessFormat.META_SOURCE_DATE_COL.value])
         proc_date_list_result = list(pd.to_datetime(df_meta_result[MetaProcessFormat.META_PROCESS_COL.value]) \
                             .dt.date)
@@ -138,18 +141,10 @@ class TestMetaProcessMethods(unittest.TestCase):
         self.assertEqual(date_list_exp,date_list_result)
         self.assertEqual(proc_date_list_exp,proc_date_list_result)
         #Cleanup
-        self.s3_bucket.delete_objects(
-            Delete={
-                'Objects': [
-                    {
-                        'Key': meta_key
-                    }
-                ]
-            }
-        )
+        self.s3_bucket.objects.all().delete()
 
-    def test_update_meta_file_wrong_format(self):
-        """Test update_meta_file method when meta file is in wrong format"""
+    def test_read_meta_file_wrong_format(self):
+        """Test read_meta_file method when meta file is in wrong format"""
         #Expected results
         date_list_old = ['2023-11-05','2023-11-06']
         date_list_new = ['2023-11-07','2023-11-08']
@@ -166,22 +161,227 @@ class TestMetaProcessMethods(unittest.TestCase):
         self.s3_bucket.put_object(Body = meta_content, Key=meta_key)
 
         #Method Execution
+        MetaProcess.update_meta_file(date_list_new, meta_key, self.s3_bucket_meta)
         with self.assertRaises(WrongMetaFIleException):
-            MetaProcess.update_meta_file(date_list_new, meta_key, self.s3_bucket_meta)
+            MetaProcess.read_meta_file(meta_key, self.s3_bucket_meta)
         # Cleanup after test
-        self.s3_bucket.delete_objects(
-            Delete={
-                'Objects': [
-                    {
-                        'Key': meta_key
-                    }
-                ]
-            }
+        self.s3_bucket.objects.all().delete()
+
+    def test_update_meta_file_compaction(self):
+        """Test update_meta_file method compacts the batch files into one batch file"""
+        #Expected results
+        batches = MetaProcessFormat.META_COMPACTION_BATCHES.value
+        date_list_exp = [f'2023-01-{day:02d}' for day in range(1, batches + 1)]
+
+        #Test Init
+        meta_key = 'meta.csv'
+
+        #Method Execution
+        for date in date_list_exp:
+            MetaProcess.update_meta_file([date], meta_key, self.s3_bucket_meta)
+
+        #Tests after execution
+        keys_result = [obj.key for obj in self.s3_bucket.objects.all()]
+        df_meta_result = MetaProcess.read_meta_file(meta_key, self.s3_bucket_meta)
+        self.assertEqual(1, len(keys_result))
+        self.assertTrue(keys_result[0].startswith(f'{meta_key}_batches/'))
+        self.assertEqual(date_list_exp,
+                         list(df_meta_result[MetaProcessFormat.META_SOURCE_DATE_COL.value]))
+        # Cleanup after test
+        self.s3_bucket.objects.all().delete()
+
+    def test_compact_meta_file_concurrent(self):
+        """Test compact_meta_file method keeps the dates of a run compacting
+        between the reads and the writes of another compaction"""
+        #Expected results
+        date_list_exp = ['2023-01-01', '2023-01-02', '2023-01-03', '2023-02-01']
+
+        #Test Init
+        meta_key = 'meta.csv'
+        for date in date_list_exp[:3]:
+            MetaProcess.update_meta_file([date], meta_key, self.s3_bucket_meta)
+        write_df_to_s3 = self.s3_bucket_meta.write_df_to_s3
+        concurrent_runs = []
+
+        def write_after_concurrent_run(*args, **kwargs):
+            if not concurrent_runs:
+                concurrent_runs.append(True)
+                MetaProcess.update_meta_file(date_list_exp[3:], meta_key, self.s3_bucket_meta)
+                MetaProcess.compact_meta_file(meta_key, self.s3_bucket_meta)
+            return write_df_to_s3(*args, **kwargs)
+
+        #Method Execution
+        with patch.object(self.s3_bucket_meta, 'write_df_to_s3',
+                          side_effect=write_after_concurrent_run):
+            MetaProcess.compact_meta_file(meta_key, self.s3_bucket_meta)
+        MetaProcess.compact_meta_file(meta_key, self.s3_bucket_meta)
+
+        #Tests after execution
+        df_meta_result = MetaProcess.read_meta_file(meta_key, self.s3_bucket_meta)
+        self.assertEqual(date_list_exp, sorted(
+            df_meta_result[MetaProcessFormat.META_SOURCE_DATE_COL.value]))
+        self.assertEqual(1, len(self.s3_bucket_meta.list_files_in_prefix(meta_key)))
+        # Cleanup after test
+        self.s3_bucket.objects.all().delete()
+
+    def test_compact_meta_file_batches_deleted(self):
+        """Test update_meta_file method writes its batch and compacts when a
+        concurrent compaction deletes the listed batch files before the reads"""
+        #Expected results
+        batches = MetaProcessFormat.META_COMPACTION_BATCHES.value
+        date_list_exp = [f'2023-01-{day:02d}' for day in range(1, batches + 1)]
+
+        #Test Init
+        meta_key = 'meta.csv'
+        for date in date_list_exp[:-1]:
+            MetaProcess.update_meta_file([date], meta_key, self.s3_bucket_meta)
+        iter_csv_as_df = self.s3_bucket_meta.iter_csv_as_df
+        concurrent_runs = []
+
+        def read_after_concurrent_run(keys, *args, **kwargs):
+            if not concurrent_runs:
+                concurrent_runs.append(True)
+                MetaProcess.compact_meta_file(meta_key, self.s3_bucket_meta)
+            return iter_csv_as_df(keys, *args, **kwargs)
+
+        #Method Execution
+        with patch.object(self.s3_bucket_meta, 'iter_csv_as_df',
+                          side_effect=read_after_concurrent_run):
+            result = MetaProcess.update_meta_file(date_list_exp[-1:], meta_key,
+                                                  self.s3_bucket_meta)
+
+        #Tests after execution
+        df_meta_result = MetaProcess.read_meta_file(meta_key, self.s3_bucket_meta)
+        self.assertTrue(result)
+        self.assertEqual(date_list_exp, sorted(
+            df_meta_result[MetaProcessFormat.META_SOURCE_DATE_COL.value]))
+        self.assertEqual(1, len(self.s3_bucket_meta.list_files_in_prefix(meta_key)))
+        # Cleanup after test
+        self.s3_bucket.objects.all().delete()
+
+    def test_is_processed(self):
+        """Test is_processed method with meta file, batch files and dates of the current run"""
+        #Expected results
+        mask_exp = [True, False, True, True, False]
+
+        #Test Init
+        meta_key = 'meta.csv'
+        meta_content = (
+          f'{MetaProcessFormat.META_SOURCE_DATE_COL.value},'
+          f'{MetaProcessFormat.META_PROCESS_COL.value}\n'
+          f'2023-11-05,{datetime.today().strftime(MetaProcessFormat.META_PROCESS_DATE_FORMAT.value)}'
         )
+        self.s3_bucket.put_object(Body=meta_content, Key=meta_key)
+        MetaProcess.update_meta_file(['2023-11-07'], meta_key, self.s3_bucket_meta)
+        dates = np.array(['2023-11-05', '2023-11-06', '2023-11-07', '2023-11-08', '2023-11-09'],
+                         dtype='datetime64[D]')
+        MetaProcess.processed_dates(meta_key, self.s3_bucket_meta, reload=True)
+
+        #Method Execution
+        MetaProcess.update_meta_file(['2023-11-08'], meta_key, self.s3_bucket_meta)
+        mask_result = MetaProcess.is_processed(dates, meta_key, self.s3_bucket_meta)
+
+        #Tests after execution
+        self.assertEqual(mask_exp, list(mask_result))
+        # Cleanup after test
+        self.s3_bucket.objects.all().delete()
+
 
+    def test_return_date_list_no_meta_file(self):
+        """Test return_date_list method when there is no meta file"""
+        #Expected results
+        first_date = self.dates[3]
+        date_list_exp = list(reversed(self.dates[:5]))
+        min_date_exp = first_date
 
-    
+        #Test Init
+        meta_key = 'meta.csv'
 
+        #Method Execution
+        min_date_return, date_list_return = MetaProcess.return_date_list(
+            first_date, meta_key, self.s3_bucket_meta)
+
+        #Tests after execution
+        self.assertEqual(min_date_exp, min_date_return)
+        self.assertEqual(date_list_exp, date_list_return)
+
+    def test_return_date_list_all_processed(self):
+        """Test return_date_list method when all dates are processed"""
+        #Expected results
+        min_date_exp = '2200-01-01'
+        date_list_exp = []
+
+        #Test Init
+        meta_key = 'meta.csv'
+        MetaProcess.update_meta_file(self.dates[:4], meta_key, self.s3_bucket_meta)
+
+        #Method Execution
+        min_date_return, date_list_return = MetaProcess.return_date_list(
+            self.dates[3], meta_key, self.s3_bucket_meta)
+
+        #Tests after execution
+        self.assertEqual(min_date_exp, min_date_return)
+        self.assertEqual(date_list_exp, date_list_return)
+        # Cleanup after test
+        self.s3_bucket.objects.all().delete()
+
+    def test_return_date_list_gaps(self):
+        """Test return_date_list method with unprocessed dates in the middle of the meta data"""
+        #Expected results, self.dates[0] is today
+        min_date_exp = self.dates[6]
+        date_list_exp = [self.dates[day] for day in (7, 6, 4, 3, 2)]
+
+        #Test Init
+        meta_key = 'meta.csv'
+        MetaProcess.update_meta_file([self.dates[day] for day in (5, 4, 1, 0)],
+                                     meta_key, self.s3_bucket_meta)
+
+        #Method Execution
+        min_date_return, date_list_return = MetaProcess.return_date_list(
+            self.dates[6], meta_key, self.s3_bucket_meta)
+
+        #Tests after execution
+        self.assertEqual(min_date_exp, min_date_return)
+        self.assertEqual(date_list_exp, date_list_return)
+        # Cleanup after test
+        self.s3_bucket.objects.all().delete()
+
+    def test_return_date_list_multi_year(self):
+        """Test return_date_list method over 30 years of daily meta data, the
+        gap computation on the loaded dates within a time budget"""
+        #Expected results
+        today = datetime.today().date()
+        first_date = (today - timedelta(days=30 * 365)).strftime(
+            MetaProcessFormat.META_DATE_FORMAT.value)
+        missing_exp = [(today - timedelta(days=day)).strftime(
+            MetaProcessFormat.META_DATE_FORMAT.value) for day in (4000, 10)]
+        date_list_exp = [(today - timedelta(days=day)).strftime(
+            MetaProcessFormat.META_DATE_FORMAT.value) for day in (4001, 4000, 11, 10)]
+
+        #Test Init
+        meta_key = 'meta.csv'
+        processed = pd.date_range(first_date, today).strftime(
+            MetaProcessFormat.META_DATE_FORMAT.value)
+        MetaProcess.update_meta_file([date for date in processed if date not in missing_exp],
+                                     meta_key, self.s3_bucket_meta)
+        dates = np.array(pd.date_range(first_date, today), dtype='datetime64[D]')
+
+        #Method Execution
+        min_date_return, date_list_return = MetaProcess.return_date_list(
+            first_date, meta_key, self.s3_bucket_meta)
+        # only the gaps of the dates loaded by return_date_list are timed,
+        # not the read of the meta file from S3
+        start = time.perf_counter()
+        mask_result = MetaProcess.is_processed(dates, meta_key, self.s3_bucket_meta)
+        duration = time.perf_counter() - start
+
+        #Tests after execution
+        self.assertEqual(missing_exp[0], min_date_return)
+        self.assertEqual(date_list_exp, date_list_return)
+        self.assertEqual(missing_exp, np.datetime_as_string(dates[~mask_result]).tolist())
+        self.assertLess(duration, 0.05)
+        # Cleanup after test
+        self.s3_bucket.objects.all().delete()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+""" Test Metrics Methods"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+import boto3
+import pandas as pd
+from moto import mock_s3
+
+from xetra.common.metrics import METRICS, Metrics
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
+
+
+class TestMetrics(unittest.TestCase):
+    """ Testing Metrics class methods"""
+
+    def setUp(self):
+        """ Environment set up"""
+        self.metrics = Metrics()
+
+    def test_stage(self):
+        """Test the stage context manager sums the calls of a stage"""
+        # Method execution
+        for rows in (10, 20):
+            with self.metrics.stage('read') as record:
+                record.bytes, record.rows = 100, rows
+        # Test after method execution
+        totals = self.metrics.summary()['stages']['read']
+        self.assertEqual(2, totals['calls'])
+        self.assertEqual(200, totals['bytes'])
+        self.assertEqual(30, totals['rows'])
+        self.assertGreaterEqual(totals['wall_s'], 0)
+
+    def test_stage_threads(self):
+        """Test the stage totals of concurrent calls"""
+        # Test init
+        def record_rows():
+            for _ in range(1000):
+                with self.metrics.stage('read') as record:
+                    record.rows = 1
+        threads = [threading.Thread(target=record_rows) for _ in range(4)]
+        # Method execution
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Test after method execution
+        totals = self.metrics.summary()['stages']['read']
+        self.assertEqual(4000, totals['calls'])
+        self.assertEqual(4000, totals['rows'])
+
+    def test_stage_totals_merge(self):
+        """Test merge adds the stage totals recorded since an earlier call of
+        stage_totals to another Metrics"""
+        # Test init
+        metrics_parent = Metrics()
+        with self.metrics.stage('read') as record:
+            record.rows = 10
+        stages_before = self.metrics.stage_totals()
+        for _ in range(2):
+            with self.metrics.stage('read') as record:
+                record.rows = 5
+        with self.metrics.stage('validate'):
+            pass
+        # Method execution
+        metrics_parent.merge(self.metrics.stage_totals(since=stages_before))
+        metrics_parent.merge(self.metrics.stage_totals(since=self.metrics.stage_totals()))
+        # Test after method execution
+        stages = metrics_parent.summary()['stages']
+        self.assertEqual(['read', 'validate'], list(stages))
+        self.assertEqual((2, 10), (stages['read']['calls'], stages['read']['rows']))
+        self.assertEqual(1, stages['validate']['calls'])
+
+    def test_timed(self):
+        """Test the timed decorator counts the rows of a returned dataframe and
+        records failed calls"""
+        # Test init
+        @self.metrics.timed('transform')
+        def transform(rows):
+            if rows < 0:
+                raise ValueError
+            return pd.DataFrame({'col1': range(rows)})
+        # Method execution
+        transform(5)
+        with self.assertRaises(ValueError):
+            transform(-1)
+        # Test after method execution
+        totals = self.metrics.summary()['stages']['transform']
+        self.assertEqual(2, totals['calls'])
+        self.assertEqual(5, totals['rows'])
+        self.assertEqual('transform', transform.__name__)
+
+    def test_write_json(self):
+        """Test write_json appends one summary line per run"""
+        # Method execution
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            path = os.path.join(metrics_dir, 'runs', 'metrics.jsonl')
+            for _ in range(2):
+                self.metrics.reset()
+                with self.metrics.stage('load') as record:
+                    record.rows = 3
+                self.metrics.write_json(path)
+            with open(path, encoding='utf-8') as json_file:
+                summaries = [json.loads(line) for line in json_file]
+        # Test after method execution
+        self.assertEqual(2, len(summaries))
+        self.assertEqual([3, 3], [summary['stages']['load']['rows'] for summary in summaries])
+
+    def test_write_prometheus(self):
+        """Test write_prometheus writes the stage totals in the text format"""
+        # Test init
+        with self.metrics.stage('s3.read_csv_as_df') as record:
+            record.bytes = 2048
+        # Method execution
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            path = os.path.join(metrics_dir, 'xetra.prom')
+            self.metrics.write_prometheus(path, 'xetra_report1')
+            with open(path, encoding='utf-8') as prom_file:
+                lines = prom_file.read().splitlines()
+            files = os.listdir(metrics_dir)
+        # Test after method execution
+        self.assertIn('xetra_stage_bytes{job="xetra_report1",stage="s3.read_csv_as_df"} 2048',
+                      lines)
+        self.assertIn('# TYPE xetra_run_wall_seconds gauge', lines)
+        self.assertEqual(['xetra.prom'], files)
+
+    def test_connector_metrics(self):
+        """Test the S3BucketConnector reads and writes record bytes and rows"""
+        # Test init
+        with mock_s3():
+            S3ClientRegistry.clear()
+            os.environ['AWS_ACCESS_KEY_ID'] = 'KEY1'
+            os.environ['AWS_SECRET_KEY_ID'] = 'KEY2'
+            boto3.resource('s3', endpoint_url='https://s3.us-west-2.amazonaws.com').create_bucket(
+                Bucket='test_bucket',
+                CreateBucketConfiguration={'LocationConstraint': 'us-west-2'})
+            s3_bucket_conn = S3BucketConnector('AWS_ACCESS_KEY_ID', 'AWS_SECRET_KEY_ID',
+                                               'https://s3.us-west-2.amazonaws.com',
+                                               'test_bucket')
+            METRICS.reset()
+            # Method execution
+            s3_bucket_conn.write_df_to_s3(pd.DataFrame({'col1': ['a', 'b']}), 'test.csv', 'csv')
+            s3_bucket_conn.read_csv_as_df('test.csv')
+        # Test after method execution
+        stages = METRICS.summary()['stages']
+        self.assertEqual({'calls': 1, 'bytes': 9, 'rows': 2},
+                         {field: stages['s3.write_df_to_s3'][field]
+                          for field in ('calls', 'bytes', 'rows')})
+        self.assertEqual({'calls': 1, 'bytes': 9, 'rows': 2},
+                         {field: stages['s3.read_csv_as_df'][field]
+                          for field in ('calls', 'bytes', 'rows')})
+
+
+if __name__ == '__main__':
+    unittest.main()
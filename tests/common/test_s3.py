@@ -1,8 +1,12 @@
 """ Test S3BucketConnector Methods"""
 
 import os
+import pickle
+import tempfile
+import tracemalloc
 
 import unittest
+from unittest.mock import patch
 from io import StringIO,BytesIO
 import pandas as pd
 
@@ -13,7 +17,12 @@ import boto3
 from moto import mock_s3
 
 
-from xetra.common.s3 import S3BucketConnector
+import pyarrow as pa
+import pyarrow.parquet as pq
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from xetra.common.custom_exceptions import WrongFormatException
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry, S3ObjectCache, isin_bucket
 
 class TestS3BucketConnector(unittest.TestCase):
     """ Testing S3BucketConnector class methods"""
@@ -23,6 +32,8 @@ class TestS3BucketConnector(unittest.TestCase):
         # mocking S3 connection start
         self.mock_s3 = mock_s3()
         self.mock_s3.start()
+        # connectors share clients, start each test with new ones
+        S3ClientRegistry.clear()
 
         # Defining the class arguments for the S3Bucket COnnector
         self.s3_access_key = 'AWS_ACCESS_KEY_ID'
@@ -138,6 +149,487 @@ class TestS3BucketConnector(unittest.TestCase):
             }
         )
 
+    def test_read_csv_as_df_chunksize(self):
+        """ Test read_csv_as_df method returns an iterator of dataframes with chunksize"""
+
+        #Expected Results
+        key_exp = 'test.csv'
+        vals_exp = [f'val{num}' for num in range(10)]
+
+        #Test init
+        csv_content = 'col1\n' + '\n'.join(vals_exp)
+        self.s3_bucket.put_object(Body=csv_content, Key=key_exp)
+
+        #Method Execution
+        chunks_result = list(self.s3_bucket_conn.read_csv_as_df(key_exp, chunksize=4))
+
+        #Test after method execution
+        self.assertEqual([4, 4, 2], [chunk.shape[0] for chunk in chunks_result])
+        self.assertEqual(vals_exp, list(pd.concat(chunks_result)['col1']))
+        #Cleanup
+        self.s3_bucket.delete_objects(
+            Delete = {
+                'Objects': [
+                    {
+                        'Key' : key_exp
+                    }
+                ]
+            }
+        )
+
+    def test_read_csv_as_df_chunksize_memory_peak(self):
+        """ Test read_csv_as_df method keeps the memory peak of a chunked read
+        below the size of a full read of a large object"""
+
+        #Test init
+        key_exp = 'large.csv'
+        row = 'DE0001234567,ABC,2022-01-03,09:00,12.34\n'
+        csv_content = ('ISIN,Mnemonic,Date,Time,StartPrice\n' + row * 200000).encode('utf-8')
+        object_size = len(csv_content)
+        self.s3_bucket.put_object(Body=csv_content, Key=key_exp)
+        del csv_content
+
+        #Method Execution
+        tracemalloc.start()
+        try:
+            df_result = self.s3_bucket_conn.read_csv_as_df(key_exp)
+            rows_full = df_result.shape[0]
+            peak_full = tracemalloc.get_traced_memory()[1]
+            del df_result
+            tracemalloc.reset_peak()
+            rows_chunked = sum(chunk.shape[0] for chunk in
+                               self.s3_bucket_conn.read_csv_as_df(key_exp, chunksize=10000))
+            peak_chunked = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        #Test after method execution
+        self.assertEqual(200000, rows_full)
+        self.assertEqual(200000, rows_chunked)
+        self.assertLess(peak_chunked, 0.75 * peak_full)
+        # the mocked response already holds the object body twice
+        self.assertLess(peak_chunked, 2.5 * object_size)
+        #Cleanup
+        self.s3_bucket.delete_objects(
+            Delete = {
+                'Objects': [
+                    {
+                        'Key' : key_exp
+                    }
+                ]
+            }
+        )
+
+    def test_read_many_csv_as_df_ok(self):
+        """ Test read_csv_as_df method to read several csv files concurrently in key order"""
+
+        #Expected Results
+        keys_exp = [f'prefix/test{num}.csv' for num in range(10)]
+        col_list_exp = [f'val{num}' for num in range(10)]
+
+        #Test init
+        for key, val in zip(keys_exp, col_list_exp):
+            self.s3_bucket.put_object(Body=f'col1,col2\n{val},{key}', Key=key)
+
+        #Method Execution
+        df_result = self.s3_bucket_conn.read_many_csv_as_df(keys_exp, max_workers=3)
+
+        #Test after method execution
+        self.assertEqual(df_result.shape[0], 10)
+        self.assertEqual(col_list_exp, list(df_result['col1']))
+        self.assertEqual(keys_exp, list(df_result['col2']))
+        self.assertEqual(list(range(10)), list(df_result.index))
+        #Cleanup
+        self.s3_bucket.delete_objects(
+            Delete = {
+                'Objects': [{'Key' : key} for key in keys_exp]
+            }
+        )
+
+    def test_read_many_csv_as_df_usecols_dtype(self):
+        """ Test read_many_csv_as_df method with column projection and pinned dtypes"""
+
+        #Expected Results
+        keys_exp = ['prefix/test1.csv', 'prefix/test2.csv']
+        isin_list_exp = ['DE0001', 'DE0002', 'DE0003']
+
+        #Test init
+        self.s3_bucket.put_object(Body='ISIN,Desc,Price\nDE0001,a,1.5\nDE0002,b,2',
+                                  Key=keys_exp[0])
+        self.s3_bucket.put_object(Body='ISIN,Desc,Price\nDE0003,c,3', Key=keys_exp[1])
+
+        #Method Execution
+        df_result = self.s3_bucket_conn.read_many_csv_as_df(
+            keys_exp, usecols=['ISIN', 'Price'], dtype={'ISIN': 'category', 'Price': 'float32'})
+
+        #Test after method execution
+        self.assertEqual(['ISIN', 'Price'], list(df_result.columns))
+        self.assertEqual('category', df_result['ISIN'].dtype.name)
+        self.assertEqual('float32', df_result['Price'].dtype.name)
+        self.assertEqual(isin_list_exp, list(df_result['ISIN']))
+        #Cleanup
+        self.s3_bucket.delete_objects(
+            Delete = {
+                'Objects': [{'Key' : key} for key in keys_exp]
+            }
+        )
+
+    def test_read_csv_as_df_cache(self):
+        """ Test read_csv_as_df method reads a listed object only once through the cache"""
+
+        #Expected Results
+        key_exp = 'prefix/test.csv'
+        get_calls_exp = 1
+        hits_exp = 1
+        misses_exp = 1
+
+        #Test init
+        self.s3_bucket.put_object(Body='ISIN,Price\nDE0001,1.5', Key=key_exp)
+        get_calls = []
+        self.s3_bucket_conn._client.meta.events.register(
+            'before-call.s3.GetObject', lambda **kwargs: get_calls.append(1))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.s3_bucket_conn.cache = S3ObjectCache(cache_dir)
+            #Method Execution
+            self.s3_bucket_conn.list_files_in_prefix('prefix/')
+            df_first = self.s3_bucket_conn.read_csv_as_df(key_exp, dtype={'ISIN': 'category'})
+            df_second = self.s3_bucket_conn.read_csv_as_df(key_exp, dtype={'ISIN': 'category'})
+            with self.assertLogs() as logm:
+                self.s3_bucket_conn.cache.log_stats()
+                self.assertIn('1 hits, 1 misses', logm.output[0])
+
+        #Test after method execution
+        self.assertEqual(get_calls_exp, len(get_calls))
+        self.assertEqual(hits_exp, self.s3_bucket_conn.cache.hits)
+        self.assertEqual(misses_exp, self.s3_bucket_conn.cache.misses)
+        self.assertTrue(df_first.equals(df_second))
+        self.assertEqual('category', df_second['ISIN'].dtype.name)
+        #Cleanup
+        self.s3_bucket.delete_objects(
+            Delete = {
+                'Objects': [
+                    {
+                        'Key' : key_exp
+                    }
+                ]
+            }
+        )
+
+    def test_read_csv_as_df_cache_changed_object(self):
+        """ Test read_csv_as_df method does not return the cached data of a replaced object"""
+
+        #Expected Results
+        key_exp = 'test.csv'
+        val_exp = 'new'
+
+        #Test init
+        self.s3_bucket.put_object(Body='col1\nold', Key=key_exp)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.s3_bucket_conn.cache = S3ObjectCache(cache_dir)
+            self.s3_bucket_conn.read_csv_as_df(key_exp)
+            self.s3_bucket.put_object(Body=f'col1\n{val_exp}', Key=key_exp)
+            #Method Execution
+            df_result = self.s3_bucket_conn.read_csv_as_df(key_exp)
+
+        #Test after method execution
+        self.assertEqual(val_exp, df_result['col1'][0])
+        self.assertEqual(0, self.s3_bucket_conn.cache.hits)
+        #Cleanup
+        self.s3_bucket.delete_objects(
+            Delete = {
+                'Objects': [
+                    {
+                        'Key' : key_exp
+                    }
+                ]
+            }
+        )
+
+    def test_s3_object_cache_eviction(self):
+        """ Test S3ObjectCache evicts the least recently used files above the size cap"""
+
+        #Test init
+        df_exp = pd.DataFrame({'col1': range(1000)})
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = S3ObjectCache(cache_dir)
+            cache.put('bucket', 'key1', '"etag1"', (), df_exp)
+            os.utime(cache._path('bucket', 'key1', '"etag1"', ()), (0, 0))
+            cache.put('bucket', 'key2', '"etag2"', (), df_exp)
+            file_size = os.path.getsize(cache._path('bucket', 'key2', '"etag2"', ()))
+            cache.max_size = file_size * 1.5
+            #Method Execution
+            cache.put('bucket', 'key3', '"etag3"', (), df_exp)
+            #Test after method execution
+            self.assertIsNone(cache.get('bucket', 'key1', '"etag1"', ()))
+            self.assertIsNone(cache.get('bucket', 'key2', '"etag2"', ()))
+            self.assertTrue(df_exp.equals(cache.get('bucket', 'key3', '"etag3"', ())))
+
+    def test_s3_object_cache_eviction_removed_file(self):
+        """ Test S3ObjectCache eviction skips files removed by another process
+        and walks the cache only above the size cap"""
+
+        #Test init
+        df_exp = pd.DataFrame({'col1': range(1000)})
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = S3ObjectCache(cache_dir)
+            cache.put('bucket', 'key1', '"etag1"', (), df_exp)
+            cache.put('bucket', 'key2', '"etag2"', (), df_exp)
+            file_size = os.path.getsize(cache._path('bucket', 'key2', '"etag2"', ()))
+            cache.max_size = file_size * 3.2
+            # evicted by another worker process sharing cache_dir
+            os.remove(cache._path('bucket', 'key1', '"etag1"', ()))
+            #Method Execution
+            with patch('xetra.common.s3.os.walk', wraps=os.walk) as walk_mock:
+                cache.put('bucket', 'key3', '"etag3"', (), df_exp)
+                walks_below_cap = walk_mock.call_count
+                with patch('xetra.common.s3.os.remove', side_effect=FileNotFoundError):
+                    cache.put('bucket', 'key4', '"etag4"', (), df_exp)
+            #Test after method execution
+            self.assertEqual(0, walks_below_cap)
+            self.assertEqual(1, walk_mock.call_count)
+            self.assertEqual(2 * file_size, cache._size)
+            self.assertTrue(df_exp.equals(cache.get('bucket', 'key4', '"etag4"', ())))
+
+    def test_read_many_csv_as_df_no_keys(self):
+        """ Test read_many_csv_as_df method with an empty key list"""
+        #Method Execution
+        df_result = self.s3_bucket_conn.read_many_csv_as_df([])
+        #Test after method execution
+        self.assertTrue(df_result.empty)
+
+    def test_iter_csv_as_df_ok(self):
+        """ Test iter_csv_as_df method yields one dataframe per key in key order"""
+
+        #Expected Results
+        keys_exp = [f'prefix/test{num}.csv' for num in range(5)]
+
+        #Test init
+        for key in keys_exp:
+            self.s3_bucket.put_object(Body=f'col1\n{key}', Key=key)
+
+        #Method Execution
+        frames_result = list(self.s3_bucket_conn.iter_csv_as_df(keys_exp, max_workers=2))
+
+        #Test after method execution
+        self.assertEqual(keys_exp, [frame['col1'][0] for frame in frames_result])
+        #Cleanup
+        self.s3_bucket.delete_objects(
+            Delete = {
+                'Objects': [{'Key' : key} for key in keys_exp]
+            }
+        )
+
+    def test_pickle_connector(self):
+        """ Test a pickled S3BucketConnector connects to the same bucket"""
+
+        #Expected Results
+        key_exp = 'test.csv'
+
+        #Test init
+        self.s3_bucket.put_object(Body='col1\nval1', Key=key_exp)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.s3_bucket_conn.cache = S3ObjectCache(cache_dir, max_size_mb=10)
+            #Method Execution
+            s3_bucket_conn = pickle.loads(pickle.dumps(self.s3_bucket_conn))
+            df_result = s3_bucket_conn.read_csv_as_df(key_exp)
+
+        #Test after method execution
+        self.assertEqual(self.s3_bucket_conn.endpoint_url, s3_bucket_conn.endpoint_url)
+        self.assertEqual(cache_dir, s3_bucket_conn.cache.cache_dir)
+        self.assertEqual(10 * 2**20, s3_bucket_conn.cache.max_size)
+        self.assertEqual(['val1'], list(df_result['col1']))
+        #Cleanup
+        self.s3_bucket.delete_objects(
+            Delete = {
+                'Objects': [
+                    {
+                        'Key' : key_exp
+                    }
+                ]
+            }
+        )
+
+    def test_connectors_share_client(self):
+        """ Test connectors of the same endpoint and credentials share one client"""
+
+        #Test init
+        other_endpoint_url = 'https://s3.eu-central-1.amazonaws.com'
+        #Method Execution
+        s3_bucket_conn_same = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                                self.s3_endpoint_url, 'other_bucket')
+        s3_bucket_conn_other = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                                 other_endpoint_url, self.s3_bucket_name)
+        #Test after method execution
+        self.assertIs(self.s3_bucket_conn._client, s3_bucket_conn_same._client)
+        self.assertIsNot(self.s3_bucket_conn._client, s3_bucket_conn_other._client)
+        self.assertEqual('other_bucket', s3_bucket_conn_same.bucket_name)
+
+    def test_client_registry_fork(self):
+        """ Test a connector unpickled in a forked child process gets its own
+        client instead of the one of the parent"""
+
+        #Test init
+        pickled = pickle.dumps(self.s3_bucket_conn)
+        #Method Execution
+        pid = os.fork()
+        if pid == 0:
+            # the child never returns into the test runner
+            exit_code = 2
+            try:
+                s3_bucket_conn = pickle.loads(pickled)
+                exit_code = int(s3_bucket_conn._client is self.s3_bucket_conn._client)
+            finally:
+                os._exit(exit_code)
+        _, status = os.waitpid(pid, 0)
+        #Test after method execution
+        self.assertEqual(0, os.waitstatus_to_exitcode(status))
+        self.assertIs(self.s3_bucket_conn._client, pickle.loads(pickled)._client)
+
+    def test_client_registry_configure(self):
+        """ Test the client configuration of S3ClientRegistry.configure"""
+
+        #Expected Results
+        max_pool_connections_exp = 16
+        retry_mode_exp = 'adaptive'
+        #Method Execution
+        S3ClientRegistry.configure(max_pool_connections=max_pool_connections_exp,
+                                   retry_mode=retry_mode_exp, max_attempts=3)
+        try:
+            s3_bucket_conn = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                               self.s3_endpoint_url, self.s3_bucket_name)
+        finally:
+            S3ClientRegistry.configure()
+        #Test after method execution
+        config = s3_bucket_conn._client.meta.config
+        self.assertIsNot(self.s3_bucket_conn._client, s3_bucket_conn._client)
+        self.assertEqual(max_pool_connections_exp, config.max_pool_connections)
+        self.assertTrue(config.tcp_keepalive)
+        self.assertEqual(retry_mode_exp, config.retries['mode'])
+
+    def test_write_df_to_s3_partitioned(self):
+        """Test write_df_to_s3_partitioned method writes sorted parquet per date and ISIN bucket"""
+        #Expected Results
+        df_exp = pd.DataFrame({
+            'isin': ['DE0003', 'DE0001', 'DE0002', 'DE0001'],
+            'date': ['2021-04-15', '2021-04-15', '2021-04-15', '2021-04-16'],
+            'price': [3.0, 1.0, 2.0, 1.5]
+        })
+        key_prefix = 'report1/'
+        buckets = isin_bucket(df_exp['isin'], 2)
+        keys_exp = sorted({f'{key_prefix}date={date}/isin_bucket={bucket:03d}/data.parquet'
+                           for date, bucket in zip(df_exp['date'], buckets)})
+        #Method Execution
+        result = self.s3_bucket_conn.write_df_to_s3_partitioned(
+            df_exp, key_prefix, 'date', 'isin', isin_buckets=2, row_group_size=1)
+        #Test after method execution
+        keys_result = sorted(obj.key for obj in self.s3_bucket.objects.all())
+        self.assertTrue(result)
+        self.assertEqual(keys_exp, keys_result)
+        for key in keys_result:
+            data = self.s3_bucket.Object(key=key).get().get('Body').read()
+            parquet_file = pq.ParquetFile(BytesIO(data))
+            df_result = parquet_file.read().to_pandas()
+            self.assertEqual(sorted(df_result['isin']), list(df_result['isin']))
+            self.assertEqual(df_result.shape[0], parquet_file.metadata.num_row_groups)
+            self.assertTrue(parquet_file.metadata.row_group(0).column(0).is_stats_set)
+        #Cleanup
+        self.s3_bucket.objects.all().delete()
+
+    def test_read_parquet_partitioned(self):
+        """Test read_parquet_partitioned method fetches only the matching partitions"""
+        #Expected Results
+        df_input = pd.DataFrame({
+            'isin': ['DE0001', 'DE0002', 'DE0003'] * 4,
+            'date': ['2021-04-14'] * 3 + ['2021-04-15'] * 3 + ['2021-04-16'] * 3
+                    + ['2021-04-19'] * 3,
+            'price': [float(num) for num in range(12)]
+        })
+        isins_exp = ['DE0002']
+        price_exp = [4.0, 7.0]
+        get_calls_exp = 2
+        #Test init
+        self.s3_bucket_conn.write_df_to_s3_partitioned(df_input, 'report1/', 'date', 'isin',
+                                                       isin_buckets=8)
+        self.s3_bucket.put_object(Body='other', Key='report1/index.csv')
+        get_calls = []
+        self.s3_bucket_conn._client.meta.events.register(
+            'before-call.s3.GetObject', lambda **kwargs: get_calls.append(1))
+        #Method Execution
+        df_result = self.s3_bucket_conn.read_parquet_partitioned(
+            'report1/', '2021-04-15', '2021-04-16', 'isin', isins_exp, isin_buckets=8)
+        get_calls_result = len(get_calls)
+        df_all = self.s3_bucket_conn.read_parquet_partitioned(
+            'report1/', '2021-04-15', '2021-04-30')
+        #Test after method execution
+        self.assertEqual(isins_exp * 2, list(df_result['isin']))
+        self.assertEqual(price_exp, list(df_result['price']))
+        self.assertEqual(get_calls_exp, get_calls_result)
+        self.assertEqual(9, df_all.shape[0])
+        #Cleanup
+        self.s3_bucket.objects.all().delete()
+
+    def test_write_df_to_s3_multipart(self):
+        """Test write_df_to_s3 method uploads a large csv in parts"""
+        #Expected Results
+        key_exp = 'large.csv'
+        df_exp = pd.DataFrame({'col1': ['DE0001234567'] * 1000000, 'col2': range(1000000)})
+        #Test init
+        upload_parts = []
+        self.s3_bucket_conn._client.meta.events.register(
+            'before-call.s3.UploadPart', lambda **kwargs: upload_parts.append(1))
+        self.s3_bucket_conn.multipart_chunksize = 5 * 2**20
+        #Method Execution
+        result = self.s3_bucket_conn.write_df_to_s3(df_exp, key_exp, 'csv')
+        #Test after method execution
+        data = self.s3_bucket.Object(key=key_exp).get().get('Body').read()
+        df_result = pd.read_csv(BytesIO(data))
+        self.assertTrue(result)
+        self.assertEqual(-(-len(data) // (5 * 2**20)), len(upload_parts))
+        self.assertTrue(df_exp.equals(df_result))
+        #Cleanup
+        self.s3_bucket.objects.all().delete()
+
+    def test_upload_chunks(self):
+        """Test upload_chunks method combines small chunks to parts"""
+        #Expected Results
+        key_exp = 'chunks.bin'
+        chunks = [bytes([num]) * 2**20 for num in range(12)]
+        upload_parts_exp = 3
+        #Test init
+        upload_parts = []
+        self.s3_bucket_conn._client.meta.events.register(
+            'before-call.s3.UploadPart', lambda **kwargs: upload_parts.append(1))
+        self.s3_bucket_conn.multipart_chunksize = 5 * 2**20
+        #Method Execution
+        result = self.s3_bucket_conn.upload_chunks(iter(chunks), key_exp)
+        #Test after method execution
+        data = self.s3_bucket.Object(key=key_exp).get().get('Body').read()
+        self.assertTrue(result)
+        self.assertEqual(upload_parts_exp, len(upload_parts))
+        self.assertEqual(b''.join(chunks), data)
+        #Cleanup
+        self.s3_bucket.objects.all().delete()
+
+    def test_upload_chunks_failed_part(self):
+        """Test upload_chunks method aborts the multipart upload when a part fails"""
+        #Expected Results
+        key_exp = 'chunks.bin'
+        #Test init
+        def fail_second_part(params, **kwargs):
+            if params['PartNumber'] == 2:
+                raise ConnectionError('connection reset')
+        self.s3_bucket_conn._client.meta.events.register(
+            'before-parameter-build.s3.UploadPart', fail_second_part)
+        self.s3_bucket_conn.multipart_chunksize = 5 * 2**20
+        #Method Execution
+        with self.assertRaises(ConnectionError):
+            self.s3_bucket_conn.upload_chunks([b'x' * 6 * 2**20, b'y' * 6 * 2**20], key_exp)
+        #Test after method execution
+        uploads = self.s3_bucket_conn._client.list_multipart_uploads(Bucket=self.s3_bucket_name)
+        self.assertNotIn('Uploads', uploads)
+        self.assertEqual([], list(self.s3_bucket.objects.all()))
+
     def test_write_df_to_s3_empty(self):
         """Test write_df_to_s3 method with empty dataframe as input"""
         #Expected Results
@@ -160,7 +652,7 @@ class TestS3BucketConnector(unittest.TestCase):
     def test_write_df_to_s3_csv(self):
         """Test write_df_to_s3 method with csv as input"""
         #Expected Results
-        return_exp='True'
+        return_exp=True
         df_exp = pd.DataFrame([['A', 'B'], ['C', 'D']], columns = ['col1', 'col2'])
         key_exp='test.csv'
         log_exp=f'Writing file to {self.s3_endpoint_url}/{self.s3_bucket_name}/{key_exp}'
@@ -191,7 +683,7 @@ class TestS3BucketConnector(unittest.TestCase):
     def test_write_df_to_s3_parquet(self):
         """Test write_df_to_s3 method with parquet as input"""
         #Expected Results
-        return_exp='True'
+        return_exp=True
         df_exp = pd.DataFrame([['A', 'B'], ['C', 'D']], columns = ['col1', 'col2'])
         key_exp='test.parquet'
         log_exp=f'Writing file to {self.s3_endpoint_url}/{self.s3_bucket_name}/{key_exp}'
@@ -219,6 +711,151 @@ class TestS3BucketConnector(unittest.TestCase):
             }
         )
 
+    def test_read_many_csv_as_table(self):
+        """ Test read_many_csv_as_table method with pinned Arrow types and one
+        dictionary for the ISINs of all files"""
+
+        #Expected Results
+        keys_exp = ['prefix/test1.csv', 'prefix/test2.csv']
+        isin_list_exp = ['DE0001', 'DE0002', 'DE0003', 'DE0001']
+        column_types = {'ISIN': pa.dictionary(pa.int32(), pa.string()), 'Date': pa.date32(),
+                        'Time': pa.time32('s'), 'Price': pa.float32()}
+
+        #Test init
+        self.s3_bucket.put_object(
+            Body='ISIN,Desc,Date,Time,Price\nDE0001,a,2021-04-15,08:00,1.5\n'
+                 'DE0002,b,2021-04-15,08:01,2', Key=keys_exp[0])
+        self.s3_bucket.put_object(
+            Body='ISIN,Desc,Date,Time,Price\nDE0003,c,2021-04-16,09:00,3\n'
+                 'DE0001,a,2021-04-16,09:00,4', Key=keys_exp[1])
+
+        #Method Execution
+        table_result = self.s3_bucket_conn.read_many_csv_as_table(
+            keys_exp, columns=list(column_types), column_types=column_types)
+
+        #Test after method execution
+        self.assertEqual(pa.schema(column_types.items()), table_result.schema)
+        self.assertEqual(isin_list_exp, table_result['ISIN'].to_pylist())
+        self.assertEqual([['DE0001', 'DE0002', 'DE0003']] * 2,
+                         [chunk.dictionary.to_pylist() for chunk in table_result['ISIN'].chunks])
+        self.assertTrue(self.s3_bucket_conn.read_many_csv_as_table([]).num_rows == 0)
+        #Cleanup
+        self.s3_bucket.delete_objects(
+            Delete = {
+                'Objects': [{'Key' : key} for key in keys_exp]
+            }
+        )
+
+    def test_write_table_to_s3(self):
+        """Test write_table_to_s3 method writes parquet from a pyarrow Table"""
+        #Expected Results
+        table_exp = pa.table({'col1': pa.array(['A', 'C', 'A']).dictionary_encode(),
+                              'col2': pa.array([1.5, 2.5, 3.5], pa.float32())})
+        key_exp = 'test.parquet'
+        #Method Execution
+        result = self.s3_bucket_conn.write_table_to_s3(table_exp, key_exp, 'parquet')
+        result_empty = self.s3_bucket_conn.write_table_to_s3(table_exp.slice(0, 0), 'empty.parquet',
+                                                             'parquet')
+        #Test after method execution
+        data = self.s3_bucket.Object(key=key_exp).get().get('Body').read()
+        table_result = pq.read_table(BytesIO(data))
+        self.assertTrue(result)
+        self.assertIsNone(result_empty)
+        self.assertTrue(table_exp.equals(table_result))
+        with self.assertRaises(WrongFormatException):
+            self.s3_bucket_conn.write_table_to_s3(table_exp, 'test.json', 'json')
+        # Cleanup after test
+        self.s3_bucket.delete_objects(Delete={'Objects': [{'Key': key_exp}]})
+
+    def test_read_csv_as_df_retry(self):
+        """ Test read_csv_as_df method retries transient errors with backoff and
+        raises other errors at once"""
+
+        #Expected Results
+        key_exp = 'test.csv'
+        df_exp = pd.DataFrame({'col1': ['val1']})
+
+        #Test init
+        self.s3_bucket.put_object(Body='col1\nval1\n', Key=key_exp)
+        self.s3_bucket_conn.retry_base_delay = 0.001
+        requests = []
+        def fail_twice(params, **kwargs):
+            requests.append(params['Key'])
+            if requests.count(key_exp) <= 2:
+                raise EndpointConnectionError(endpoint_url=self.s3_endpoint_url)
+        self.s3_bucket_conn._client.meta.events.register(
+            'before-parameter-build.s3.GetObject', fail_twice)
+
+        #Method Execution
+        with self.assertLogs(level='WARNING') as logm:
+            df_result = self.s3_bucket_conn.read_csv_as_df(key_exp)
+        with self.assertRaises(self.s3_bucket_conn.exceptions.NoSuchKey):
+            self.s3_bucket_conn.read_csv_as_df('missing.csv')
+
+        #Test after method execution
+        pd.testing.assert_frame_equal(df_exp, df_result)
+        self.assertEqual(2, len(logm.output))
+        self.assertEqual([key_exp] * 3 + ['missing.csv'], requests)
+
+    def test_read_parquet_partitioned_retry(self):
+        """ Test read_parquet_partitioned method retries transient errors of the
+        partition reads"""
+
+        #Expected Results
+        df_exp = pd.DataFrame({'isin': ['AT0000A0E9W5', 'DE000A0DJ6J9'],
+                               'date': ['2021-04-15', '2021-04-16']})
+
+        #Test init
+        self.s3_bucket_conn.write_df_to_s3_partitioned(df_exp, 'report1/', 'date', 'isin')
+        self.s3_bucket_conn.retry_base_delay = 0.001
+        requests = []
+        def fail_first(params, **kwargs):
+            requests.append(params['Key'])
+            if requests.count(params['Key']) == 1:
+                raise EndpointConnectionError(endpoint_url=self.s3_endpoint_url)
+        self.s3_bucket_conn._client.meta.events.register(
+            'before-parameter-build.s3.GetObject', fail_first)
+
+        #Method Execution
+        with self.assertLogs(level='WARNING') as logm:
+            df_result = self.s3_bucket_conn.read_parquet_partitioned(
+                'report1/', '2021-04-15', '2021-04-16', max_workers=1)
+
+        #Test after method execution
+        self.assertEqual(list(df_exp['isin']), list(df_result['isin']))
+        self.assertEqual(2, len(logm.output))
+        self.assertEqual(4, len(requests))
+
+    def test_write_df_to_s3_retry(self):
+        """ Test write_df_to_s3 method retries a throttled upload and gives up
+        after max_retries retries"""
+
+        #Expected Results
+        df_exp = pd.DataFrame({'col1': ['A', 'B']})
+
+        #Test init
+        self.s3_bucket_conn.retry_base_delay = 0.001
+        self.s3_bucket_conn.max_retries = 2
+        uploads = []
+        def throttle(params, **kwargs):
+            uploads.append(params['Key'])
+            if params['Key'] == 'failing.csv' or len(uploads) == 1:
+                raise ClientError({'Error': {'Code': 'SlowDown'}}, 'PutObject')
+        self.s3_bucket_conn._client.meta.events.register(
+            'before-parameter-build.s3.PutObject', throttle)
+
+        #Method Execution
+        result = self.s3_bucket_conn.write_df_to_s3(df_exp, 'test.csv', 'csv')
+        with self.assertRaises(ClientError):
+            self.s3_bucket_conn.write_df_to_s3(df_exp, 'failing.csv', 'csv')
+
+        #Test after method execution
+        data = self.s3_bucket.Object(key='test.csv').get().get('Body').read().decode('utf-8')
+        self.assertTrue(result)
+        pd.testing.assert_frame_equal(df_exp, pd.read_csv(StringIO(data)))
+        self.assertEqual(['test.csv'] * 2 + ['failing.csv'] * 3, uploads)
+
+
 
 
 
@@ -0,0 +1,153 @@
+"""Test CLI Methods"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import boto3
+import yaml
+from moto import mock_s3
+
+from benchmarks.bench_startup import HEAVY_MODULES, import_profile
+from xetra.cli import main
+from xetra.common.custom_exceptions import WrongConfigException
+from xetra.common.local_storage import LocalStorageConnector
+from xetra.common.meta_process import MetaProcess
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'configs',
+                           'xetra_report1_config.yml')
+# generous for slow CI machines, the CLI imports in about 60 ms here
+STARTUP_BUDGET_MS = 1000
+
+
+class TestCliMethods(unittest.TestCase):
+    """Tests for the command line interface"""
+
+    def setUp(self):
+        """ Environment set up"""
+        # mocking S3 connection start
+        self.mock_s3 = mock_s3()
+        self.mock_s3.start()
+        # connectors share clients, start each test with new ones
+        S3ClientRegistry.clear()
+
+        os.environ['AWS_ACCESS_KEY_ID'] = 'KEY1'
+        os.environ['AWS_SECRET_ACCESS_KEY'] = 'KEY2'
+        self.s3_endpoint_url = 'https://s3.us-west-2.amazonaws.com'
+        self.s3 = boto3.resource(service_name='s3', endpoint_url=self.s3_endpoint_url)
+        self.s3.create_bucket(Bucket='trg-bucket',
+                              CreateBucketConfiguration={'LocationConstraint': 'us-west-2'})
+        self.trg_bucket = self.s3.Bucket('trg-bucket')
+
+        # job configuration against the mocked bucket, with metrics in a temporary directory
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        with open(CONFIG_PATH, encoding='utf-8') as config_file:
+            config = yaml.safe_load(config_file)
+        config['logging'] = {'version': 1, 'disable_existing_loggers': False}
+        config['s3'].update({'src_endpoint_url': self.s3_endpoint_url,
+                             'trg_endpoint_url': self.s3_endpoint_url,
+                             'trg_bucket': 'trg-bucket', 'cache_dir': ''})
+        self.first_date = (datetime.today().date() - timedelta(days=3)).isoformat()
+        config['source']['src_first_extract_date'] = self.first_date
+        self.meta_key = config['meta']['meta_key']
+        self.metrics_path = os.path.join(self.tmp_dir.name, 'metrics.jsonl')
+        config['metrics']['json_path'] = self.metrics_path
+        self.config_path = os.path.join(self.tmp_dir.name, 'config.yml')
+        with open(self.config_path, 'w', encoding='utf-8') as config_file:
+            yaml.safe_dump(config, config_file)
+
+    def tearDown(self):
+        # mocking S3 connection stop
+        self.mock_s3.stop()
+        self.tmp_dir.cleanup()
+
+    def _main(self, *argv):
+        """Return code and stdout of the CLI with argv"""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            return_code = main(list(argv))
+        return return_code, stdout.getvalue()
+
+    def test_startup_budget(self):
+        """Tests importing the CLI and the status command import none of the
+        heavy modules and stay within the startup budget"""
+        # Method execution
+        for code in ('import xetra.cli',
+                     f'import xetra.cli; xetra.cli.main(["status", "--config", '
+                     f'{self.config_path!r}])'):
+            _, import_us, modules = import_profile(code)
+            # Test after method execution
+            self.assertEqual([], [module for module in HEAVY_MODULES if module in modules])
+            self.assertLess(import_us / 1000, STARTUP_BUDGET_MS)
+
+    def test_plan(self):
+        """Tests the plan command prints the dates not in the meta file"""
+        # Test init
+        today = datetime.today().date()
+        processed = (today - timedelta(days=2)).isoformat()
+        s3_bucket_trg = S3BucketConnector('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY',
+                                          self.s3_endpoint_url, 'trg-bucket')
+        MetaProcess.update_meta_file([processed], self.meta_key, s3_bucket_trg)
+        dates_exp = [self.first_date] + [(today - timedelta(days=day)).isoformat()
+                                         for day in (1, 0)]
+        # Method execution
+        return_code, stdout = self._main('plan', '--config', self.config_path)
+        # Test after method execution
+        plan = json.loads(stdout)['report1']
+        self.assertEqual(0, return_code)
+        self.assertEqual(dates_exp, plan['dates_to_process'])
+        self.assertEqual(sorted(set(dates_exp) | {processed, (
+            today - timedelta(days=4)).isoformat()}), plan['dates_to_extract'])
+
+    def test_plan_local(self):
+        """Tests the plan command against the local storage backend, an
+        unknown backend raises WrongConfigException"""
+        # Test init
+        with open(self.config_path, encoding='utf-8') as config_file:
+            config = yaml.safe_load(config_file)
+        config['s3'].update({'backend': 'local', 'local_dir': self.tmp_dir.name})
+        with open(self.config_path, 'w', encoding='utf-8') as config_file:
+            yaml.safe_dump(config, config_file)
+        today = datetime.today().date()
+        MetaProcess.update_meta_file([self.first_date], self.meta_key,
+                                     LocalStorageConnector(self.tmp_dir.name, 'trg-bucket'))
+        dates_exp = [(today - timedelta(days=day)).isoformat() for day in (2, 1, 0)]
+        # Method execution
+        return_code, stdout = self._main('plan', '--config', self.config_path)
+        config['s3']['backend'] = 'ftp'
+        with open(self.config_path, 'w', encoding='utf-8') as config_file:
+            yaml.safe_dump(config, config_file)
+        with self.assertRaises(WrongConfigException):
+            self._main('plan', '--config', self.config_path)
+        # Test after method execution
+        self.assertEqual(0, return_code)
+        self.assertEqual(dates_exp, json.loads(stdout)['report1']['dates_to_process'])
+        self.assertEqual([], list(self.trg_bucket.objects.all()))
+
+    def test_status(self):
+        """Tests the status command prints the last run of the metrics file"""
+        # Test init
+        return_code_empty, stdout_empty = self._main('status', '--config', self.config_path)
+        stages = {'etl.extract': {'calls': 1, 'wall_s': 1.5, 'cpu_s': 1.0, 'bytes': 2**20,
+                                  'rows': 1000, 'rows_per_s': 666.7, 'mb_per_s': 0.667}}
+        with open(self.metrics_path, 'w', encoding='utf-8') as metrics_file:
+            for started in ('2021-04-19T10:00:00', '2021-04-20T10:00:00'):
+                metrics_file.write(json.dumps({'started': started, 'wall_s': 2.0,
+                                               'cpu_s': 1.5, 'stages': stages}) + '\n')
+        # Method execution
+        return_code, stdout = self._main('status', '--config', self.config_path)
+        # Test after method execution
+        self.assertEqual(1, return_code_empty)
+        self.assertIn('No run recorded', stdout_empty)
+        self.assertEqual(0, return_code)
+        self.assertIn('Last run started 2021-04-20T10:00:00', stdout)
+        self.assertIn('etl.extract', stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""Test ReportQuery Methods"""
+
+import os
+import unittest
+
+import boto3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from moto import mock_s3
+
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
+from xetra.query import ReportQuery
+from xetra.transformers.xetra_transformer import XetraETL, XetraSourceConfig, XetraTargetConfig
+
+
+class TestReportQueryMethods(unittest.TestCase):
+    """Tests for the ReportQuery class"""
+
+    def setUp(self):
+        """ Environment set up"""
+        # mocking S3 connection start
+        self.mock_s3 = mock_s3()
+        self.mock_s3.start()
+        # connectors share clients, start each test with new ones
+        S3ClientRegistry.clear()
+
+        # Defining the class arguments for the S3Bucket COnnector
+        self.s3_access_key = 'AWS_ACCESS_KEY_ID'
+        self.s3_secret_key = 'AWS_SECRET_KEY_ID'
+        self.s3_endpoint_url = 'https://s3.us-west-2.amazonaws.com'
+        self.s3_bucket_name = 'trg-bucket'
+        self.index_prefix = 'report1/index/'
+
+        # Creating S3 access keys as environment variables
+        os.environ[self.s3_access_key] = 'KEY1'
+        os.environ[self.s3_secret_key] = 'KEY2'
+
+        #creating  Bucket instances on mocked S3
+        self.s3 = boto3.resource(service_name='s3', endpoint_url=self.s3_endpoint_url)
+        self.s3.create_bucket(Bucket=self.s3_bucket_name,
+                              CreateBucketConfiguration={
+                                  'LocationConstraint' : 'us-west-2'
+                              })
+        self.trg_bucket = self.s3.Bucket(self.s3_bucket_name)
+        self.s3_bucket_trg = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                               self.s3_endpoint_url, self.s3_bucket_name)
+
+        # XetraETL writing the report in row groups of 5 rows with the index
+        source_config = XetraSourceConfig(
+            src_first_extract_date='2021-04-15', src_columns=[], src_col_date='Date',
+            src_col_isin='ISIN', src_col_time='Time', src_col_start_price='StartPrice',
+            src_col_min_price='MinPrice', src_col_max_price='MaxPrice',
+            src_col_traded_vol='TradedVolume')
+        target_config = XetraTargetConfig(
+            trg_col_isin='isin', trg_col_date='date', trg_col_open_price='opening_price_eur',
+            trg_col_close_price='closing_price_eur', trg_col_min_price='minimum_price_eur',
+            trg_col_max_price='maximum_price_eur', trg_col_daily_traded_vol='daily_traded_volume',
+            trg_col_ch_prev_close='change_prev_closing_%', trg_key='report1/xetra_daily_report1_',
+            trg_key_date_format='%Y%m%d_%H%M%S', trg_format='parquet', trg_row_group_size=5,
+            trg_index_prefix=self.index_prefix)
+        self.xetra_etl = XetraETL(self.s3_bucket_trg, self.s3_bucket_trg, 'meta.csv',
+                                  source_config, target_config)
+        self.xetra_etl.meta_update_list = []
+
+        self.df_report = self._report(10)
+
+        # GET requests of the report objects with their range
+        self.ranges = []
+        self.s3_bucket_trg._client.meta.events.register(
+            'before-parameter-build.s3.GetObject',
+            lambda params, **kwargs: params['Key'].startswith('report1/xetra') and
+            self.ranges.append(params.get('Range')))
+
+    def tearDown(self):
+        # mocking S3 connection stop
+        self.mock_s3.stop()
+
+    @staticmethod
+    def _report(isin_count: int):
+        """Report of isin_count ISINs on 3 days, ordered by ISIN and date as
+        written by XetraETL"""
+        rng = np.random.default_rng(5)
+        rows = isin_count * 3
+        close = rng.uniform(10, 20, rows).round(2)
+        return pd.DataFrame({
+            'isin': np.repeat([f'DE{number:010d}' for number in range(isin_count)], 3),
+            'date': np.tile(['2021-04-15', '2021-04-16', '2021-04-19'], isin_count),
+            'opening_price_eur': close, 'closing_price_eur': close,
+            'minimum_price_eur': close - 1, 'maximum_price_eur': close + 1,
+            'daily_traded_volume': rng.integers(1, 1000, rows),
+            'change_prev_closing_%': rng.uniform(-5, 5, rows).round(2)})
+
+    def _expected(self, isins: list, start_date: str, end_date: str):
+        """Rows of the report of isins between start_date and end_date"""
+        df_report = self.df_report
+        return df_report[df_report['isin'].isin(isins) &
+                         df_report['date'].between(start_date, end_date)].reset_index(drop=True)
+
+    def test_get_report(self):
+        """Tests the get_report method fetches only the row groups with the
+        ISINs with ranged GETs and serves a repeated query from the cache"""
+        # Test init
+        self.df_report = self._report(3000)
+        self.xetra_etl.trg_args = self.xetra_etl.trg_args._replace(trg_row_group_size=1000)
+        self.xetra_etl.load(self.df_report)
+        size = sum(obj.size for obj in self.trg_bucket.objects.filter(Prefix='report1/xetra'))
+        query = ReportQuery(self.s3_bucket_trg, self.index_prefix, 'isin', 'date')
+        isins = ['DE0000000001', 'DE0000001500']
+        # Method execution
+        df_result = query.get_report(isins, '2021-04-16', '2021-04-19')
+        ranges_first = list(self.ranges)
+        df_again = query.get_report(isins[:1], '2021-04-16', '2021-04-16')
+        # Test after method execution
+        df_result['isin'] = df_result['isin'].astype(str)
+        pd.testing.assert_frame_equal(self._expected(isins, '2021-04-16', '2021-04-19'),
+                                      df_result, check_dtype=False)
+        self.assertEqual(['DE0000000001'], list(df_again['isin'].astype(str)))
+        # rows 3 to 5 and 4500 to 4502 are in the row groups 0 and 4 of 9
+        self.assertEqual((2, 1), (query.misses, query.hits))
+        # the tail with the footer and one GET per row group, the two row
+        # groups are a fraction of the object
+        self.assertEqual('bytes=-65536', ranges_first[0])
+        self.assertEqual(3, len(ranges_first))
+        fetched = [int(end) - int(start) + 1 for start, end in
+                   (byte_range[len('bytes='):].split('-') for byte_range in ranges_first[1:])]
+        self.assertLess(sum(fetched), size / 3)
+        self.assertEqual(ranges_first, self.ranges)
+
+    def test_get_report_arrow_loads(self):
+        """Tests the get_report method across report objects of the pandas and
+        the Arrow load, a day loaded again is read from the last load"""
+        # Test init
+        df_first = self.df_report[self.df_report['date'] != '2021-04-19']
+        self.xetra_etl.load(df_first.reset_index(drop=True))
+        df_second = self.df_report[self.df_report['date'] >= '2021-04-16'].copy()
+        df_second['date'] = pd.to_datetime(df_second['date']).dt.date
+        table = pa.Table.from_pandas(df_second, preserve_index=False)
+        # the second load writes a new key
+        self.xetra_etl._report1_key = lambda: 'report1/xetra_daily_report1_99990101.parquet'
+        self.xetra_etl.load_arrow(table)
+        query = ReportQuery(self.s3_bucket_trg, self.index_prefix, 'isin', 'date')
+        isins = ['DE0000000003', 'DE0000000009', 'XX0000000000']
+        # Method execution
+        df_result = query.get_report(isins, '2021-04-15', '2021-04-19')
+        df_none = query.get_report(['XX0000000000'], '2021-04-15', '2021-04-19')
+        # Test after method execution
+        df_result['isin'] = df_result['isin'].astype(str)
+        pd.testing.assert_frame_equal(self._expected(isins, '2021-04-15', '2021-04-19'),
+                                      df_result, check_dtype=False)
+        self.assertTrue(df_none.empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
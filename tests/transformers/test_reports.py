@@ -0,0 +1,165 @@
+"""Test XetraReportsETL Methods"""
+
+import os
+import unittest
+from io import BytesIO
+
+import boto3
+import pandas as pd
+from moto import mock_s3
+
+from xetra.common.config import ReportConfig
+from xetra.common.custom_exceptions import WrongConfigException
+from xetra.common.meta_process import MetaProcess
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
+from xetra.transformers.reports import REPORT_KERNELS, XetraReportsETL
+from xetra.transformers.xetra_transformer import XetraSourceConfig, XetraTargetConfig
+
+
+class TestXetraReportsETLMethods(unittest.TestCase):
+    """Testing the XetraReportsETL class"""
+
+    def setUp(self):
+        """ Environment set up"""
+        # mocking S3 connection start
+        self.mock_s3 = mock_s3()
+        self.mock_s3.start()
+        # connectors share clients, start each test with new ones
+        S3ClientRegistry.clear()
+
+        # Defining the class arguments for the S3Bucket COnnector
+        self.s3_access_key = 'AWS_ACCESS_KEY_ID'
+        self.s3_secret_key = 'AWS_SECRET_KEY_ID'
+        self.s3_endpoint_url = 'https://s3.us-west-2.amazonaws.com'
+        self.s3_bucket_name_src = 'src-bucket'
+        self.s3_bucket_name_trg = 'trg-bucket'
+
+        # Creating S3 access keys as environment variables
+        os.environ[self.s3_access_key] = 'KEY1'
+        os.environ[self.s3_secret_key] = 'KEY2'
+
+        #creating  Bucket instances on mocked S3
+        self.s3 = boto3.resource(service_name='s3', endpoint_url=self.s3_endpoint_url)
+        for bucket in (self.s3_bucket_name_src, self.s3_bucket_name_trg):
+            self.s3.create_bucket(Bucket=bucket,
+                                  CreateBucketConfiguration={
+                                      'LocationConstraint' : 'us-west-2'
+                                  })
+        self.src_bucket = self.s3.Bucket(self.s3_bucket_name_src)
+        self.trg_bucket = self.s3.Bucket(self.s3_bucket_name_trg)
+
+        #Creating S3BucketConnector testing instances
+        self.s3_bucket_src = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                               self.s3_endpoint_url, self.s3_bucket_name_src)
+        self.s3_bucket_trg = S3BucketConnector(self.s3_access_key, self.s3_secret_key,
+                                               self.s3_endpoint_url, self.s3_bucket_name_trg)
+
+        # Creating source and target configuration
+        self.source_config = XetraSourceConfig(
+            src_first_extract_date='2021-04-16',
+            src_columns=['ISIN', 'Mnemonic', 'Date', 'Time', 'StartPrice', 'EndPrice',
+                         'MinPrice', 'MaxPrice', 'TradedVolume'],
+            src_col_date='Date', src_col_isin='ISIN', src_col_time='Time',
+            src_col_start_price='StartPrice', src_col_min_price='MinPrice',
+            src_col_max_price='MaxPrice', src_col_traded_vol='TradedVolume')
+        self.target_config = XetraTargetConfig(
+            trg_col_isin='isin', trg_col_date='date', trg_col_open_price='opening_price_eur',
+            trg_col_close_price='closing_price_eur', trg_col_min_price='minimum_price_eur',
+            trg_col_max_price='maximum_price_eur', trg_col_daily_traded_vol='daily_traded_volume',
+            trg_col_ch_prev_close='change_prev_closing_%', trg_key='report1/xetra_daily_report1_',
+            trg_key_date_format='%Y%m%d_%H%M%S', trg_format='parquet')
+        self.reports = [
+            ReportConfig('report1', 'meta/report1_meta.csv', self.target_config),
+            ReportConfig('vwap', 'meta/vwap_meta.csv',
+                         self.target_config._replace(trg_key='vwap/xetra_daily_vwap_'))]
+
+        # Source data, the files of three days
+        header = ('ISIN,Mnemonic,SecurityDesc,SecurityType,Currency,SecurityID,'
+                  'Date,Time,StartPrice,MaxPrice,MinPrice,EndPrice,'
+                  'TradedVolume,NumberOfTrades\n')
+        self.src_files = {
+            '2021-04-15/2021-04-15_BINS_XETR08.csv': [
+                'AT0000A0E9W5,SANT,S+T AG O.N.,Common stock,EUR,2504159,'
+                '2021-04-15,08:00,20.04,20.04,20.02,20.02,1002,3\n',
+                'DE000A0DJ6J9,S92,SMA SOLAR TECHNOL.AG,Common stock,EUR,2504287,'
+                '2021-04-15,15:00,37.80,37.90,37.70,37.90,1130,4\n'],
+            '2021-04-16/2021-04-16_BINS_XETR09.csv': [
+                'DE000A0DJ6J9,S92,SMA SOLAR TECHNOL.AG,Common stock,EUR,2504287,'
+                '2021-04-16,09:00,38.10,38.20,38.00,38.20,800,2\n'],
+            '2021-04-19/2021-04-19_BINS_XETR10.csv': [
+                'AT0000A0E9W5,SANT,S+T AG O.N.,Common stock,EUR,2504159,'
+                '2021-04-19,10:00,20.55,20.60,20.50,20.58,700,2\n',
+                'AT0000A0E9W5,SANT,S+T AG O.N.,Common stock,EUR,2504159,'
+                '2021-04-19,10:01,20.58,20.70,20.60,20.70,300,1\n']}
+        for key, rows in self.src_files.items():
+            self.src_bucket.put_object(Body=header + ''.join(rows), Key=key)
+        # report1 is missing 2021-04-16, vwap 2021-04-19
+        today = pd.Timestamp.today().strftime('%Y-%m-%d')
+        MetaProcess.update_meta_file(
+            list(pd.date_range('2021-04-17', today).strftime('%Y-%m-%d')),
+            self.reports[0].meta_key, self.s3_bucket_trg)
+        MetaProcess.update_meta_file(
+            [date for date in pd.date_range('2021-04-16', today).strftime('%Y-%m-%d')
+             if date != '2021-04-19'], self.reports[1].meta_key, self.s3_bucket_trg)
+
+    def tearDown(self):
+        # mocking S3 connection stop
+        self.mock_s3.stop()
+
+    def _read_report(self, trg_key: str):
+        """The report written under trg_key"""
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(Prefix=trg_key)]
+        self.assertEqual(1, len(trg_keys))
+        data = self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()
+        return pd.read_parquet(BytesIO(data))
+
+    def test_etl_reports(self):
+        """Tests the etl_reports method reads each source file once and writes
+        each report with its own target key and meta file"""
+        # Expected results
+        extract_date_list_exp = ['2021-04-15', '2021-04-16', '2021-04-18', '2021-04-19']
+        # Test init
+        reads = []
+        self.s3_bucket_src._client.meta.events.register(
+            'before-parameter-build.s3.GetObject',
+            lambda params, **kwargs: reads.append(params['Key'])
+            if params['Bucket'] == self.s3_bucket_name_src else None)
+        reports_etl = XetraReportsETL(self.s3_bucket_src, self.s3_bucket_trg,
+                                      self.source_config, self.reports)
+        # Method execution
+        result = reports_etl.etl_reports()
+        # Test after method execution
+        df_report1 = self._read_report('report1/')
+        df_vwap = self._read_report('vwap/')
+        self.assertTrue(result)
+        self.assertEqual(extract_date_list_exp, reports_etl.extract_date_list)
+        self.assertEqual(sorted(self.src_files), sorted(reads))
+        self.assertEqual(['DE000A0DJ6J9'], list(df_report1['isin']))
+        self.assertEqual([0.79], list(df_report1['change_prev_closing_%']))
+        self.assertEqual(['AT0000A0E9W5'], list(df_vwap['isin']))
+        self.assertEqual(['2021-04-19'], list(df_vwap['date']))
+        self.assertEqual([round((20.55 * 700 + 20.65 * 300) / 1000, 2)],
+                         list(df_vwap['vwap_eur']))
+        self.assertEqual([1000], list(df_vwap['daily_traded_volume']))
+        for report in self.reports:
+            self.assertEqual([], MetaProcess.return_date_list(
+                '2021-04-16', report.meta_key, self.s3_bucket_trg)[1])
+
+    def test_unknown_report(self):
+        """Tests the constructor raises WrongConfigException on a report
+        without registered kernel and on a report with rollups"""
+        # Test init
+        reports = [ReportConfig('movers', 'meta/movers_meta.csv', self.target_config)]
+        # Method execution
+        with self.assertRaises(WrongConfigException):
+            XetraReportsETL(self.s3_bucket_src, self.s3_bucket_trg, self.source_config, reports)
+        with self.assertRaises(WrongConfigException):
+            XetraReportsETL(self.s3_bucket_src, self.s3_bucket_trg, self.source_config, [
+                ReportConfig('report1', 'meta/report1_meta.csv',
+                             self.target_config._replace(trg_rollup_key='rollups/'))])
+        # Test after method execution
+        self.assertIn('report1', REPORT_KERNELS)
+
+
+if __name__ == "__main__":
+    unittest.main()
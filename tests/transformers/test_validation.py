@@ -0,0 +1,106 @@
+"""Test SourceValidator Methods"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from xetra.common.config import XetraSourceConfig
+from xetra.transformers.validation import SourceValidator
+
+
+class TestSourceValidatorMethods(unittest.TestCase):
+    """Testing the SourceValidator class"""
+
+    def setUp(self):
+        """ Environment set up"""
+        self.source_config = XetraSourceConfig(
+            src_first_extract_date='2021-04-15',
+            src_columns=['ISIN', 'Date', 'Time', 'StartPrice', 'MinPrice', 'MaxPrice',
+                         'TradedVolume'],
+            src_col_date='Date', src_col_isin='ISIN', src_col_time='Time',
+            src_col_start_price='StartPrice', src_col_min_price='MinPrice',
+            src_col_max_price='MaxPrice', src_col_traded_vol='TradedVolume')
+        self.validator = SourceValidator(self.source_config)
+        self.key = '2021-04-15/2021-04-15_BINS_XETR08.csv'
+        self.df_src = pd.DataFrame({
+            'ISIN': ['AT0000A0E9W5', 'AT0000A0E9W5', 'DE000A0DJ6J9'],
+            'Date': ['2021-04-15'] * 3,
+            'Time': ['08:00', '12:00', '15:00'],
+            'StartPrice': [20.04, 20.19, 37.80],
+            'MinPrice': [20.02, 20.19, 37.70],
+            'MaxPrice': [20.04, 20.26, 37.90],
+            'TradedVolume': [1002, 3456, 1130]})
+
+    def test_validate_ok(self):
+        """Tests the validate method passes valid and empty source files"""
+        # Method execution
+        reasons = [self.validator.validate(self.key, self.df_src),
+                   self.validator.validate(self.key, self.df_src.iloc[:0]),
+                   self.validator.validate('other/prefix.csv',
+                                           self.df_src.assign(Date='2021-04-16'))]
+        # Test after method execution
+        self.assertEqual([None, None, None], reasons)
+
+    def test_validate_invalid(self):
+        """Tests the validate method names the first failing check of invalid
+        source files"""
+        # Expected results
+        cases = {
+            'missing columns': self.df_src.drop(columns='MaxPrice'),
+            'non-numeric columns': self.df_src.assign(TradedVolume=['1', 'x', '3']),
+            'missing ISIN': self.df_src.assign(ISIN=['AT0000A0E9W5', None, 'DE000A0DJ6J9']),
+            'date other than 2021-04-15': self.df_src.assign(Date='2021-04-16'),
+            'non-positive prices': self.df_src.assign(MinPrice=[20.02, -1.0, np.nan]),
+            'minimum above the maximum': self.df_src.assign(MinPrice=[20.02, 20.30, 37.70]),
+            'negative traded volume': self.df_src.assign(TradedVolume=[1002, -5, 1130])
+        }
+        for name, df_src in cases.items():
+            # Method execution
+            reason = self.validator.validate(self.key, df_src)
+            # Test after method execution
+            self.assertIn(name, reason)
+        self.assertEqual('2 of 3 rows with missing or non-positive prices',
+                         self.validator.validate(self.key, cases['non-positive prices']))
+
+    def test_validate_table(self):
+        """Tests the validate_table method checks the rows of a pyarrow Table
+        with date32 dates"""
+        # Test init
+        table = pa.Table.from_pandas(self.df_src.assign(
+            Date=pd.to_datetime(self.df_src['Date']).dt.date))
+        # Method execution
+        reasons = [self.validator.validate_table(self.key, table),
+                   self.validator.validate_table(self.key, table.slice(0, 0)),
+                   self.validator.validate_table(self.key, table.set_column(
+                       table.schema.get_field_index('MinPrice'), 'MinPrice',
+                       pa.array([20.02, 20.30, 37.70])))]
+        # Test after method execution
+        self.assertEqual(pa.date32(), table.schema.field('Date').type)
+        self.assertEqual([None, None, '1 of 3 rows with a minimum above the maximum price'],
+                         reasons)
+
+    def test_validate_table_invalid(self):
+        """Tests the validate_table method names the same failing row check as
+        the validate method, missing values of the Table as nulls"""
+        # Expected results
+        cases = [
+            self.df_src.assign(ISIN=['AT0000A0E9W5', None, 'DE000A0DJ6J9']),
+            self.df_src.assign(Date='2021-04-16'),
+            self.df_src.assign(MinPrice=[20.02, -1.0, np.nan]),
+            self.df_src.assign(TradedVolume=[1002.0, np.nan, -5.0])
+        ]
+        for df_src in cases:
+            # Test init
+            table = pa.Table.from_pandas(df_src.assign(
+                Date=pd.to_datetime(df_src['Date']).dt.date))
+            # Method execution
+            reason = self.validator.validate_table(self.key, table)
+            # Test after method execution
+            self.assertIsNotNone(reason)
+            self.assertEqual(self.validator.validate(self.key, df_src), reason)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,986 @@
+"""Test XetraETL Methods"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+import unittest
+from io import BytesIO, StringIO
+from unittest import mock
+
+import boto3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from moto import mock_s3
+
+from xetra.common.s3 import S3BucketConnector, S3ClientRegistry
+from xetra.common.meta_process import MetaProcess
+from xetra.common.metrics import METRICS
+from xetra.common.custom_exceptions import WrongConfigException
+from xetra.transformers.xetra_transformer import XetraETL, XetraSourceConfig, XetraTargetConfig
+
+
+class TestXetraETLMethods(unittest.TestCase):
+    """Testing the XetraETL class"""
+
+    def setUp(self):
+        """ Environment set up"""
+        # mocking S3 connection start
+        self.mock_s3 = mock_s3()
+        self.mock_s3.start()
+        # connectors share clients, start each test with new ones
+        S3ClientRegistry.clear()
+
+        # Defining the class arguments for the S3Bucket COnnector
+        self.s3_access_key = 'AWS_ACCESS_KEY_ID'
+        self.s3_secret_key = 'AWS_SECRET_KEY_ID'
+        self.s3_endpoint_url = 'https://s3.us-west-2.amazonaws.com'
+        self.s3_bucket_name_src = 'src-bucket'
+        self.s3_bucket_name_trg = 'trg-bucket'
+        self.meta_key = 'meta_key'
+
+        # Creating S3 access keys as environment variables
+        os.environ[self.s3_access_key] = 'KEY1'
+        os.environ[self.s3_secret_key] = 'KEY2'
+
+        #creating  Bucket instances on mocked S3
+        self.s3 = boto3.resource(service_name='s3', endpoint_url=self.s3_endpoint_url)
+        self.s3.create_bucket(Bucket=self.s3_bucket_name_src,
+                              CreateBucketConfiguration={
+                                  'LocationConstraint' : 'us-west-2'
+                              })
+        self.s3.create_bucket(Bucket=self.s3_bucket_name_trg,
+                              CreateBucketConfiguration={
+                                  'LocationConstraint' : 'us-west-2'
+                              })
+        self.src_bucket = self.s3.Bucket(self.s3_bucket_name_src)
+        self.trg_bucket = self.s3.Bucket(self.s3_bucket_name_trg)
+
+        #Creating S3BucketConnector testing instances
+        self.s3_bucket_src = S3BucketConnector(self.s3_access_key,
+                                               self.s3_secret_key,
+                                               self.s3_endpoint_url,
+                                               self.s3_bucket_name_src)
+        self.s3_bucket_trg = S3BucketConnector(self.s3_access_key,
+                                               self.s3_secret_key,
+                                               self.s3_endpoint_url,
+                                               self.s3_bucket_name_trg)
+
+        # Creating source and target configuration
+        conf_dict_src = {
+            'src_first_extract_date': '2021-04-01',
+            'src_columns': ['ISIN', 'Mnemonic', 'Date', 'Time',
+                            'StartPrice', 'EndPrice', 'MinPrice', 'MaxPrice', 'TradedVolume'],
+            'src_col_date': 'Date',
+            'src_col_isin': 'ISIN',
+            'src_col_time': 'Time',
+            'src_col_start_price': 'StartPrice',
+            'src_col_min_price': 'MinPrice',
+            'src_col_max_price': 'MaxPrice',
+            'src_col_traded_vol': 'TradedVolume'
+        }
+        conf_dict_trg = {
+            'trg_col_isin': 'isin',
+            'trg_col_date': 'date',
+            'trg_col_open_price': 'opening_price_eur',
+            'trg_col_close_price': 'closing_price_eur',
+            'trg_col_min_price': 'minimum_price_eur',
+            'trg_col_max_price': 'maximum_price_eur',
+            'trg_col_daily_traded_vol': 'daily_traded_volume',
+            'trg_col_ch_prev_close': 'change_prev_closing_%',
+            'trg_key': 'report1/xetra_daily_report1_',
+            'trg_key_date_format': '%Y%m%d_%H%M%S',
+            'trg_format': 'parquet'
+        }
+        self.source_config = XetraSourceConfig(**conf_dict_src)
+        self.target_config = XetraTargetConfig(**conf_dict_trg)
+
+        # Source data
+        self.src_header = ('ISIN,Mnemonic,SecurityDesc,SecurityType,Currency,SecurityID,'
+                           'Date,Time,StartPrice,MaxPrice,MinPrice,EndPrice,'
+                           'TradedVolume,NumberOfTrades\n')
+        self.src_rows = [
+            'AT0000A0E9W5,SANT,S+T AG O.N.,Common stock,EUR,2504159,'
+            '2021-04-15,08:00,20.04,20.04,20.02,20.02,1002,3\n',
+            'AT0000A0E9W5,SANT,S+T AG O.N.,Common stock,EUR,2504159,'
+            '2021-04-15,12:00,20.19,20.26,20.19,20.21,3456,8\n',
+            'DE000A0DJ6J9,S92,SMA SOLAR TECHNOL.AG,Common stock,EUR,2504287,'
+            '2021-04-15,15:00,37.80,37.90,37.70,37.90,1130,4\n',
+            'DE000A0DJ6J9,S92,SMA SOLAR TECHNOL.AG,Common stock,EUR,2504287,'
+            '2021-04-16,09:00,38.10,38.20,38.00,38.20,800,2\n'
+        ]
+
+    def tearDown(self):
+        # mocking S3 connection stop
+        self.mock_s3.stop()
+
+    def test_init_meta_update_list(self):
+        """Tests the constructor excludes the look-back days from meta_update_list"""
+        # Expected results
+        today = datetime.today().date()
+        dates = [(today - timedelta(days=day)).strftime('%Y-%m-%d') for day in range(6)]
+        extract_date_exp = dates[4]
+        extract_date_list_exp = [dates[day] for day in (5, 4, 2, 1)]
+        meta_update_list_exp = [dates[4], dates[1]]
+        # Test init
+        MetaProcess.update_meta_file([dates[3], dates[2], dates[0]],
+                                     self.meta_key, self.s3_bucket_trg)
+        source_config = self.source_config._replace(src_first_extract_date=dates[4])
+        # Method execution
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, source_config, self.target_config)
+        # Test after method execution
+        self.assertEqual(extract_date_exp, xetra_etl.extract_date)
+        self.assertEqual(extract_date_list_exp, xetra_etl.extract_date_list)
+        self.assertEqual(meta_update_list_exp, xetra_etl.meta_update_list)
+
+    def test_extract_no_files(self):
+        """Tests the extract method when there are no files to be extracted"""
+        # Test init
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, self.source_config, self.target_config)
+        xetra_etl.extract_date_list = ['2021-04-14', '2021-04-15']
+        # Method execution
+        df_return = xetra_etl.extract()
+        # Test after method execution
+        self.assertTrue(df_return.empty)
+
+    def test_extract_files(self):
+        """Tests the extract method reads only src_columns with pinned dtypes"""
+        # Expected results
+        isin_list_exp = ['AT0000A0E9W5', 'AT0000A0E9W5', 'DE000A0DJ6J9', 'DE000A0DJ6J9']
+        # Test init
+        self.src_bucket.put_object(Body=self.src_header + ''.join(self.src_rows[:2]),
+                                   Key='2021-04-15/2021-04-15_BINS_XETR08.csv')
+        self.src_bucket.put_object(Body=self.src_header + self.src_rows[2],
+                                   Key='2021-04-15/2021-04-15_BINS_XETR15.csv')
+        self.src_bucket.put_object(Body=self.src_header + self.src_rows[3],
+                                   Key='2021-04-16/2021-04-16_BINS_XETR09.csv')
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, self.source_config, self.target_config)
+        xetra_etl.extract_date_list = ['2021-04-15', '2021-04-16']
+        # Method execution
+        df_result = xetra_etl.extract()
+        # Test after method execution
+        self.assertEqual(sorted(self.source_config.src_columns), sorted(df_result.columns))
+        self.assertEqual(isin_list_exp, list(df_result['ISIN']))
+        self.assertEqual('category', df_result['ISIN'].dtype.name)
+        self.assertEqual('float64', df_result['StartPrice'].dtype.name)
+
+    def test_extract_files_pyarrow_float32(self):
+        """Tests the extract method with the pyarrow engine and float32 prices"""
+        # Test init
+        self.src_bucket.put_object(Body=self.src_header + ''.join(self.src_rows),
+                                   Key='2021-04-15/2021-04-15_BINS_XETR08.csv')
+        source_config = self.source_config._replace(src_engine='pyarrow',
+                                                    src_price_dtype='float32')
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, source_config, self.target_config)
+        xetra_etl.extract_date_list = ['2021-04-15']
+        # Method execution
+        df_result = xetra_etl.extract()
+        # Test after method execution
+        self.assertEqual(4, df_result.shape[0])
+        self.assertEqual(len(source_config.src_columns), df_result.shape[1])
+        self.assertEqual('float32', df_result['MinPrice'].dtype.name)
+
+    def test_transform_report1_pyarrow_engine(self):
+        """Tests extract and transform_report1 with the pyarrow engine give the
+        report of the C engine"""
+        # Test init
+        self.src_bucket.put_object(Body=self.src_header + ''.join(self.src_rows[:3]),
+                                   Key='2021-04-15/2021-04-15_BINS_XETR08.csv')
+        self.src_bucket.put_object(Body=self.src_header + self.src_rows[3],
+                                   Key='2021-04-16/2021-04-16_BINS_XETR09.csv')
+        reports = {}
+        for engine in ('c', 'pyarrow'):
+            xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg, self.meta_key,
+                                 self.source_config._replace(src_engine=engine),
+                                 self.target_config)
+            xetra_etl.extract_date_list = ['2021-04-15', '2021-04-16']
+            xetra_etl.meta_update_list = ['2021-04-15', '2021-04-16']
+            # Method execution
+            df_src = xetra_etl.extract()
+            reports[engine] = xetra_etl.transform_report1(df_src)
+            reports[engine]['isin'] = reports[engine]['isin'].astype(str)
+        # Test after method execution
+        self.assertEqual([480, 720, 900, 540], list(xetra_etl._minute_of_day(df_src['Time'])))
+        self.assertEqual(3, len(reports['pyarrow']))
+        self.assertEqual(['2021-04-15', '2021-04-15', '2021-04-16'],
+                         list(reports['pyarrow']['date']))
+        pd.testing.assert_frame_equal(reports['c'], reports['pyarrow'])
+
+    def _reference_report1(self, data_frame, report_dates):
+        """Row by row reference implementation of report 1"""
+        days = {}
+        for row in data_frame.sort_values(by='Time', kind='stable').itertuples(index=False):
+            day = days.get((row.ISIN, row.Date))
+            if day is None:
+                days[(row.ISIN, row.Date)] = [row.StartPrice, row.StartPrice,
+                                              row.MinPrice, row.MaxPrice, row.TradedVolume]
+            else:
+                day[1] = row.StartPrice
+                day[2] = min(day[2], row.MinPrice)
+                day[3] = max(day[3], row.MaxPrice)
+                day[4] += row.TradedVolume
+        rows = []
+        prev_close = {}
+        for isin, date in sorted(days):
+            open_price, close_price, min_price, max_price, volume = days[(isin, date)]
+            prev = prev_close.get(isin)
+            change = (close_price - prev) / prev * 100 if prev is not None else np.nan
+            prev_close[isin] = close_price
+            if date in report_dates:
+                rows.append([isin, date, open_price, close_price, min_price, max_price,
+                             volume, change])
+        return pd.DataFrame(rows, columns=[
+            'isin', 'date', 'opening_price_eur', 'closing_price_eur', 'minimum_price_eur',
+            'maximum_price_eur', 'daily_traded_volume', 'change_prev_closing_%']).round(2)
+
+    def test_transform_report1_emptydf(self):
+        """Tests the transform_report1 method with an empty dataframe as input"""
+        # Expected results
+        log_exp = 'The dataframe is empty. No transformations will be applied.'
+        # Test init
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, self.source_config, self.target_config)
+        df_input = pd.DataFrame()
+        # Method execution
+        with self.assertLogs() as logm:
+            df_result = xetra_etl.transform_report1(df_input)
+            # Log test after method execution
+            self.assertIn(log_exp, logm.output[0])
+        # Test after method execution
+        self.assertTrue(df_result.empty)
+
+    def test_transform_report1_ok(self):
+        """Tests the transform_report1 method with a known result"""
+        # Expected results
+        df_exp = pd.DataFrame({
+            'isin': ['AT0000A0E9W5', 'DE000A0DJ6J9'],
+            'date': ['2021-04-16', '2021-04-16'],
+            'opening_price_eur': [20.58, 38.10],
+            'closing_price_eur': [20.49, 38.30],
+            'minimum_price_eur': [20.48, 38.00],
+            'maximum_price_eur': [20.60, 38.40],
+            'daily_traded_volume': [1200, 1700],
+            'change_prev_closing_%': [1.49, 1.32]
+        })
+        # Test init
+        rows = [
+            self.src_rows[0], self.src_rows[1], self.src_rows[2], self.src_rows[3],
+            'AT0000A0E9W5,SANT,S+T AG O.N.,Common stock,EUR,2504159,'
+            '2021-04-16,15:00,20.49,20.52,20.48,20.50,400,1\n',
+            'AT0000A0E9W5,SANT,S+T AG O.N.,Common stock,EUR,2504159,'
+            '2021-04-16,08:00,20.58,20.60,20.55,20.58,800,2\n',
+            'DE000A0DJ6J9,S92,SMA SOLAR TECHNOL.AG,Common stock,EUR,2504287,'
+            '2021-04-16,12:00,38.30,38.40,38.25,38.30,900,3\n'
+        ]
+        df_input = pd.read_csv(StringIO(self.src_header + ''.join(rows)),
+                               usecols=self.source_config.src_columns)
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, self.source_config, self.target_config)
+        xetra_etl.meta_update_list = ['2021-04-16']
+        # Method execution
+        df_result = xetra_etl.transform_report1(df_input)
+        # Test after method execution
+        pd.testing.assert_frame_equal(df_exp, df_result)
+
+    def test_transform_report1_reference(self):
+        """Tests the transform_report1 method against the row by row reference
+        implementation on random trades"""
+        # Test init
+        rng = np.random.default_rng(7)
+        rows = 5000
+        df_input = pd.DataFrame({
+            'ISIN': rng.choice([f'DE000{num:07d}' for num in range(40)], rows),
+            'Mnemonic': 'M',
+            'Date': rng.choice(['2021-04-14', '2021-04-15', '2021-04-16', '2021-04-19'], rows),
+            'Time': [f'{hour:02d}:{minute:02d}' for hour, minute in
+                     zip(rng.integers(8, 18, rows), rng.integers(0, 60, rows))],
+            'StartPrice': rng.uniform(10, 100, rows),
+            'EndPrice': rng.uniform(10, 100, rows),
+            'MinPrice': rng.uniform(10, 100, rows),
+            'MaxPrice': rng.uniform(10, 100, rows),
+            'TradedVolume': rng.integers(1, 1000, rows)
+        })
+        df_input['ISIN'] = df_input['ISIN'].astype('category')
+        report_dates = ['2021-04-15', '2021-04-16', '2021-04-19']
+        df_exp = self._reference_report1(df_input, report_dates)
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, self.source_config, self.target_config)
+        xetra_etl.meta_update_list = report_dates
+        # Method execution
+        df_result = xetra_etl.transform_report1(df_input)
+        # Test after method execution
+        df_result['isin'] = df_result['isin'].astype(str)
+        pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+
+    def test_load(self):
+        """Tests the load method writes the report and updates the meta file"""
+        # Expected results
+        df_exp = pd.DataFrame({'isin': ['AT0000A0E9W5'], 'date': ['2021-04-16']})
+        meta_update_list_exp = ['2021-04-16']
+        # Test init
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, self.source_config, self.target_config)
+        xetra_etl.meta_update_list = meta_update_list_exp
+        # Method execution
+        result = xetra_etl.load(df_exp)
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        data = self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()
+        df_result = pd.read_parquet(BytesIO(data))
+        df_result['isin'] = df_result['isin'].astype(str)
+        df_meta = MetaProcess.read_meta_file(self.meta_key, self.s3_bucket_trg)
+        self.assertTrue(result)
+        self.assertEqual(1, len(trg_keys))
+        self.assertTrue(df_exp.equals(df_result))
+        self.assertEqual(meta_update_list_exp, list(df_meta['source_date']))
+
+    def test_load_partitioned(self):
+        """Tests the load method with the partitioned target layout"""
+        # Expected results
+        df_exp = pd.DataFrame({'isin': ['DE000A0DJ6J9', 'AT0000A0E9W5', 'AT0000A0E9W5'],
+                               'date': ['2021-04-15', '2021-04-15', '2021-04-16']})
+        keys_exp = ['report1/date=2021-04-15/data.parquet', 'report1/date=2021-04-16/data.parquet']
+        # Test init
+        target_config = self.target_config._replace(trg_key='report1/', trg_partitioned=True)
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, self.source_config, target_config)
+        xetra_etl.meta_update_list = ['2021-04-15', '2021-04-16']
+        # Method execution
+        xetra_etl.load(df_exp)
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(Prefix='report1/')]
+        df_result = self.s3_bucket_trg.read_parquet_partitioned(
+            'report1/', '2021-04-15', '2021-04-16', 'isin', ['AT0000A0E9W5'])
+        self.assertEqual(keys_exp, trg_keys)
+        self.assertEqual(['2021-04-15', '2021-04-16'], list(df_result['date']))
+
+    def test_etl_report1(self):
+        """Tests the etl_report1 method from the source files to the report"""
+        # Expected results
+        isin_list_exp = ['DE000A0DJ6J9']
+        change_exp = [0.79]
+        # Test init
+        self.src_bucket.put_object(Body=self.src_header + ''.join(self.src_rows[:3]),
+                                   Key='2021-04-15/2021-04-15_BINS_XETR08.csv')
+        self.src_bucket.put_object(Body=self.src_header + self.src_rows[3],
+                                   Key='2021-04-16/2021-04-16_BINS_XETR09.csv')
+        source_config = self.source_config._replace(src_first_extract_date='2021-04-16')
+        MetaProcess.update_meta_file(
+            list(pd.date_range('2021-04-17', datetime.today()).strftime('%Y-%m-%d')),
+            self.meta_key, self.s3_bucket_trg)
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, source_config, self.target_config)
+        # Method execution
+        xetra_etl.etl_report1()
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        data = self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()
+        df_result = pd.read_parquet(BytesIO(data))
+        self.assertEqual(isin_list_exp, list(df_result['isin']))
+        self.assertEqual(change_exp, list(df_result['change_prev_closing_%']))
+        self.assertEqual([], MetaProcess.return_date_list(
+            '2021-04-16', self.meta_key, self.s3_bucket_trg)[1])
+
+    def test_etl_report1_parallel(self):
+        """Tests the etl_report1_parallel method gives the report of the in-process run"""
+        # Test init
+        extra_row = ('AT0000A0E9W5,SANT,S+T AG O.N.,Common stock,EUR,2504159,'
+                     '2021-04-19,10:00,20.55,20.60,20.50,20.58,700,2\n')
+        self.src_bucket.put_object(Body=self.src_header + ''.join(self.src_rows[:3]),
+                                   Key='2021-04-15/2021-04-15_BINS_XETR08.csv')
+        self.src_bucket.put_object(Body=self.src_header + self.src_rows[3],
+                                   Key='2021-04-16/2021-04-16_BINS_XETR09.csv')
+        self.src_bucket.put_object(Body=self.src_header + extra_row,
+                                   Key='2021-04-19/2021-04-19_BINS_XETR10.csv')
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, self.source_config, self.target_config)
+        xetra_etl.extract_date = '2021-04-16'
+        xetra_etl.extract_date_list = ['2021-04-15', '2021-04-16', '2021-04-17',
+                                       '2021-04-18', '2021-04-19']
+        xetra_etl.meta_update_list = xetra_etl.extract_date_list[1:]
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        df_exp['isin'] = df_exp['isin'].astype(str)
+        # the workers get the connectors and configurations, a lock fails to
+        # pickle if the XetraETL were sent
+        xetra_etl.lock = threading.Lock()
+        # Method execution
+        result = xetra_etl.etl_report1_parallel(workers=2)
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        data = self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()
+        df_result = pd.read_parquet(BytesIO(data))
+        df_meta = MetaProcess.read_meta_file(self.meta_key, self.s3_bucket_trg)
+        self.assertTrue(result)
+        pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+        self.assertEqual(xetra_etl.meta_update_list, list(df_meta['source_date']))
+
+
+    def _put_validated_source_files(self):
+        """Put two valid source files and two invalid ones and return the
+        XetraETL with src_validate and the invalid keys"""
+        self.src_bucket.put_object(Body=self.src_header + ''.join(self.src_rows[:3]),
+                                   Key='2021-04-15/2021-04-15_BINS_XETR08.csv')
+        self.src_bucket.put_object(Body=self.src_header + self.src_rows[3],
+                                   Key='2021-04-16/2021-04-16_BINS_XETR09.csv')
+        bad_files = {
+            '2021-04-16/2021-04-16_BINS_XETR10.csv':
+                self.src_header.replace(',MaxPrice', '') +
+                'DE000A0DJ6J9,S92,SMA SOLAR TECHNOL.AG,Common stock,EUR,2504287,'
+                '2021-04-16,10:00,38.30,38.00,38.30,900,2\n',
+            '2021-04-16/2021-04-16_BINS_XETR11.csv':
+                self.src_header + self.src_rows[3].replace('09:00,38.10', '11:00,-38.10')}
+        for key, body in bad_files.items():
+            self.src_bucket.put_object(Body=body, Key=key)
+        source_config = self.source_config._replace(src_first_extract_date='2021-04-16',
+                                                    src_validate=True)
+        MetaProcess.update_meta_file(
+            list(pd.date_range('2021-04-17', datetime.today()).strftime('%Y-%m-%d')),
+            self.meta_key, self.s3_bucket_trg)
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, source_config, self.target_config)
+        return xetra_etl, bad_files
+
+    def test_etl_report1_validate(self):
+        """Tests the etl_report1 method with src_validate quarantines the
+        invalid source files and writes the report of the valid ones"""
+        # Test init
+        xetra_etl, bad_files = self._put_validated_source_files()
+        METRICS.reset()
+        # Method execution
+        xetra_etl.etl_report1()
+        # Test after method execution
+        stages = METRICS.summary()['stages']
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        df_result = pd.read_parquet(BytesIO(
+            self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()))
+        self.assertEqual(['DE000A0DJ6J9'], list(df_result['isin']))
+        self.assertEqual([0.79], list(df_result['change_prev_closing_%']))
+        self.assertEqual(sorted(bad_files), sorted(key for key, _ in xetra_etl.quarantined))
+        reasons = dict(xetra_etl.quarantined)
+        self.assertIn("['MaxPrice']", reasons['2021-04-16/2021-04-16_BINS_XETR10.csv'])
+        self.assertIn('non-positive prices', reasons['2021-04-16/2021-04-16_BINS_XETR11.csv'])
+        for key, body in bad_files.items():
+            self.assertEqual(body.encode('utf-8'), self.trg_bucket.Object(
+                key=f'quarantine/{key}').get().get('Body').read())
+        # the file without MaxPrice fails on its header, the others are checked
+        self.assertEqual(3, stages['etl.validate']['calls'])
+        self.assertEqual(2, stages['etl.quarantine']['calls'])
+        self.assertEqual([], MetaProcess.return_date_list(
+            '2021-04-16', self.meta_key, self.s3_bucket_trg)[1])
+
+    def test_etl_report1_validate_read_workers(self):
+        """Tests the extract with src_validate reads the source files through
+        the bounded iter_reads of the connector with src_read_workers threads"""
+        # Test init
+        xetra_etl, bad_files = self._put_validated_source_files()
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg, self.meta_key,
+                             xetra_etl.src_args._replace(src_read_workers=3),
+                             self.target_config)
+        # Method execution
+        with mock.patch.object(self.s3_bucket_src, 'iter_reads',
+                               wraps=self.s3_bucket_src.iter_reads) as iter_reads:
+            xetra_etl.etl_report1()
+        # Test after method execution
+        self.assertEqual(1, iter_reads.call_count)
+        read, keys, max_workers = iter_reads.call_args.args
+        self.assertEqual(xetra_etl.reader.read_file, read)
+        self.assertEqual(3, max_workers)
+        self.assertTrue(set(bad_files) <= set(keys))
+        self.assertEqual(sorted(bad_files), sorted(key for key, _ in xetra_etl.quarantined))
+
+    def test_etl_report1_pipelined_validate(self):
+        """Tests the etl_report1_pipelined method with src_validate leaves the
+        invalid source files out as etl_report1 does"""
+        # Test init
+        xetra_etl, bad_files = self._put_validated_source_files()
+        # Method execution
+        xetra_etl.etl_report1_pipelined(download_workers=2, queue_size=2)
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        df_result = pd.read_parquet(BytesIO(
+            self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()))
+        self.assertEqual(['DE000A0DJ6J9'], list(df_result['isin'].astype(str)))
+        self.assertEqual([0.79], list(df_result['change_prev_closing_%']))
+        self.assertEqual(sorted(bad_files), sorted(key for key, _ in xetra_etl.quarantined))
+
+    def test_etl_report1_parallel_validate(self):
+        """Tests the etl_report1_parallel method with src_validate returns the
+        quarantined files and the stage totals of the worker processes"""
+        # Test init
+        xetra_etl, bad_files = self._put_validated_source_files()
+        METRICS.reset()
+        # Method execution
+        xetra_etl.etl_report1_parallel(workers=2)
+        # Test after method execution
+        stages = METRICS.summary()['stages']
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        df_result = pd.read_parquet(BytesIO(
+            self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()))
+        self.assertEqual(['DE000A0DJ6J9'], list(df_result['isin'].astype(str)))
+        self.assertEqual(sorted(bad_files), sorted(key for key, _ in xetra_etl.quarantined))
+        self.assertEqual(3, stages['etl.validate']['calls'])
+        self.assertEqual(2, stages['etl.quarantine']['calls'])
+        self.assertEqual(4, stages['s3.read_csv_as_df']['calls'])
+
+    def test_etl_report1_arrow_validate(self):
+        """Tests the etl_report1_arrow method with src_validate leaves the
+        invalid source files out as etl_report1 does"""
+        # Test init
+        xetra_etl, bad_files = self._put_validated_source_files()
+        # Method execution
+        xetra_etl.etl_report1_arrow()
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        df_result = pd.read_parquet(BytesIO(
+            self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()))
+        reasons = dict(xetra_etl.quarantined)
+        self.assertEqual(['DE000A0DJ6J9'], list(df_result['isin'].astype(str)))
+        self.assertEqual([0.79], list(df_result['change_prev_closing_%']))
+        self.assertEqual(sorted(bad_files), sorted(reasons))
+        self.assertIn('unreadable', reasons['2021-04-16/2021-04-16_BINS_XETR10.csv'])
+        self.assertIn('non-positive prices', reasons['2021-04-16/2021-04-16_BINS_XETR11.csv'])
+
+    def _put_random_source_files(self, dates: list, files_per_day: int, rows: int,
+                                 isins: tuple = ('AT0000A0E9W5', 'DE000A0DJ6J9', 'DE0005140008'),
+                                 seed: int = 7, minutes: tuple = (480, 490)):
+        """Put source files with random ISINs, prices and times in the minutes
+        of the day, the times are not ordered across the files of a day and repeat"""
+        rng = np.random.default_rng(seed)
+        for date in dates:
+            for hour in range(files_per_day):
+                price = rng.uniform(10, 20, rows).round(2)
+                data_frame = pd.DataFrame({
+                    'ISIN': rng.choice(list(isins), rows),
+                    'Mnemonic': 'M', 'SecurityDesc': 'D', 'SecurityType': 'Common stock',
+                    'Currency': 'EUR', 'SecurityID': 1, 'Date': date,
+                    'Time': [f'{minute // 60:02d}:{minute % 60:02d}'
+                             for minute in rng.integers(*minutes, rows)],
+                    'StartPrice': price, 'MaxPrice': price + 1, 'MinPrice': price - 1,
+                    'EndPrice': price, 'TradedVolume': rng.integers(1, 100, rows),
+                    'NumberOfTrades': 1})
+                self.src_bucket.put_object(Body=data_frame.to_csv(index=False),
+                                           Key=f'{date}/{date}_BINS_XETR{hour:02d}.csv')
+
+    def _pipelined_etl(self, target_config: XetraTargetConfig):
+        """XetraETL on the days 2021-04-14 to 2021-04-20, the first one is the
+        look-back day"""
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg,
+                             self.meta_key, self.source_config, target_config)
+        xetra_etl.extract_date = '2021-04-15'
+        xetra_etl.extract_date_list = [str(date.date()) for date in
+                                       pd.date_range('2021-04-14', '2021-04-20')]
+        xetra_etl.meta_update_list = xetra_etl.extract_date_list[1:]
+        return xetra_etl
+
+    def test_etl_report1_pipelined(self):
+        """Tests the etl_report1_pipelined method gives the report of the
+        sequential run"""
+        # Test init
+        self._put_random_source_files(['2021-04-14', '2021-04-15', '2021-04-16',
+                                       '2021-04-19', '2021-04-20'], files_per_day=3, rows=40)
+        xetra_etl = self._pipelined_etl(self.target_config)
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        df_exp['isin'] = df_exp['isin'].astype(str)
+        # Method execution
+        result = xetra_etl.etl_report1_pipelined(download_workers=3, queue_size=2)
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        data = self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()
+        df_result = pd.read_parquet(BytesIO(data))
+        df_result['isin'] = df_result['isin'].astype(str)
+        df_meta = MetaProcess.read_meta_file(self.meta_key, self.s3_bucket_trg)
+        self.assertTrue(result)
+        self.assertEqual(1, len(trg_keys))
+        pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+        self.assertEqual(xetra_etl.meta_update_list, list(df_meta['source_date']))
+
+    def test_etl_report1_pipelined_partitioned(self):
+        """Tests the etl_report1_pipelined method writes each day as a partition
+        with bounded queues"""
+        # Expected results
+        keys_exp = [f'report1/date={date}/data.parquet'
+                    for date in ['2021-04-15', '2021-04-16', '2021-04-19']]
+        # Test init
+        self._put_random_source_files(['2021-04-14', '2021-04-15', '2021-04-16', '2021-04-19'],
+                                      files_per_day=4, rows=10)
+        target_config = self.target_config._replace(trg_key='report1/', trg_partitioned=True)
+        xetra_etl = self._pipelined_etl(target_config)
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        df_exp['isin'] = df_exp['isin'].astype(str)
+        # Method execution
+        xetra_etl.etl_report1_pipelined(download_workers=2, queue_size=1)
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(Prefix='report1/')]
+        df_result = self.s3_bucket_trg.read_parquet_partitioned(
+            'report1/', '2021-04-15', '2021-04-20', 'isin')
+        df_result['isin'] = df_result['isin'].astype(str)
+        stats = xetra_etl.pipeline_stats
+        self.assertEqual(keys_exp, trg_keys)
+        pd.testing.assert_frame_equal(
+            df_exp.sort_values(['date', 'isin'], ignore_index=True),
+            df_result.sort_values(['date', 'isin'], ignore_index=True), check_dtype=False)
+        self.assertEqual(16, stats['stages']['download']['items'])
+        self.assertEqual(3, stats['stages']['load']['items'])
+        for queue_stats in stats['queues'].values():
+            self.assertLessEqual(queue_stats['max_depth'], 1)
+
+    def test_etl_report1_pipelined_failed_download(self):
+        """Tests the etl_report1_pipelined method raises the error of a failed
+        download and does not update the meta file"""
+        # Test init
+        self._put_random_source_files(['2021-04-15', '2021-04-16'], files_per_day=2, rows=5)
+        xetra_etl = self._pipelined_etl(self.target_config)
+        def fail_second_day(params, **kwargs):
+            if params['Key'].startswith('2021-04-16'):
+                raise ConnectionError('connection reset')
+        self.s3_bucket_src._client.meta.events.register(
+            'before-parameter-build.s3.GetObject', fail_second_day)
+        # Method execution
+        with self.assertRaises(ConnectionError):
+            xetra_etl.etl_report1_pipelined(download_workers=2, queue_size=1)
+        # Test after method execution
+        self.assertEqual([], list(self.trg_bucket.objects.all()))
+
+    def test_etl_report1_arrow(self):
+        """Tests the etl_report1_arrow method writes the report of the pandas
+        run from Arrow with the ISIN dictionary encoded"""
+        # Test init
+        self._put_random_source_files(['2021-04-14', '2021-04-15', '2021-04-16', '2021-04-19'],
+                                      files_per_day=3, rows=40)
+        xetra_etl = self._pipelined_etl(self.target_config)
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        df_exp['isin'] = df_exp['isin'].astype(str)
+        # Method execution
+        result = xetra_etl.etl_report1_arrow()
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        data = self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()
+        table_result = pq.read_table(BytesIO(data))
+        df_result = table_result.to_pandas()
+        df_result['isin'] = df_result['isin'].astype(str)
+        df_result['date'] = df_result['date'].astype(str)
+        self.assertTrue(result)
+        self.assertEqual(pa.dictionary(pa.int32(), pa.string()),
+                         table_result.schema.field('isin').type)
+        self.assertEqual(pa.date32(), table_result.schema.field('date').type)
+        pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+
+    def test_transform_report1_arrow_empty_aggregate(self):
+        """Tests the transform_report1_arrow method returns an empty table if
+        no source row is complete"""
+        # Test init
+        self.src_bucket.put_object(
+            Body=self.src_header + ''.join(row.replace(',20.02,20.02,', ',,20.02,')
+                                           for row in self.src_rows[:1]),
+            Key='2021-04-15/2021-04-15_BINS_XETR08.csv')
+        xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg, self.meta_key,
+                             self.source_config,
+                             self.target_config._replace(trg_last_close_state=True))
+        xetra_etl.extract_date_list = ['2021-04-15']
+        xetra_etl.meta_update_list = ['2021-04-15']
+        table_src = xetra_etl.extract_arrow()
+        # Method execution
+        table_result = xetra_etl.transform_report1_arrow(table_src)
+        # Test after method execution
+        self.assertEqual(1, table_src.num_rows)
+        self.assertEqual(0, table_result.num_rows)
+        self.assertTrue(xetra_etl.load_arrow(table_result))
+        self.assertEqual([], list(self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)))
+
+    def test_transform_rollups(self):
+        """Tests the transform_rollups method gives the bars aggregated from the
+        source rows at each granularity"""
+        # Test init
+        self._put_random_source_files(['2021-04-15', '2021-04-16'], files_per_day=3, rows=60,
+                                      minutes=(480, 1050))
+        xetra_etl = self._pipelined_etl(self.target_config._replace(trg_rollup_key='rollups/'))
+        data_frame = xetra_etl.extract()
+        df_sorted = data_frame.sort_values(by='Time', kind='stable')
+        minute = df_sorted['Time'].str[:2].astype(int) * 60 + df_sorted['Time'].str[3:].astype(int)
+        # Method execution
+        rollups = xetra_etl.transform_rollups(data_frame)
+        # Test after method execution
+        self.assertEqual([15, 60], list(rollups))
+        for minutes, bars in rollups.items():
+            df_exp = df_sorted.groupby(['ISIN', 'Date', minute // minutes * minutes],
+                                       observed=True).agg(
+                opening_price_eur=('StartPrice', 'first'),
+                closing_price_eur=('StartPrice', 'last'),
+                minimum_price_eur=('MinPrice', 'min'),
+                maximum_price_eur=('MaxPrice', 'max'),
+                daily_traded_volume=('TradedVolume', 'sum')).reset_index()
+            self.assertEqual(len(df_exp), len(bars))
+            np.testing.assert_array_equal(df_exp.iloc[:, 2].to_numpy(),
+                                          bars['_bar_minute'].to_numpy())
+            pd.testing.assert_frame_equal(df_exp.iloc[:, 3:], bars.iloc[:, 3:], check_dtype=False)
+
+    def test_etl_report1_rollups(self):
+        """Tests the etl_report1 method writes the partitioned rollups and the
+        report derived from the hourly bars equals the one of the source rows"""
+        # Test init
+        self._put_random_source_files(['2021-04-14', '2021-04-15', '2021-04-16'],
+                                      files_per_day=2, rows=40, minutes=(480, 1050))
+        xetra_etl = self._pipelined_etl(self.target_config._replace(trg_rollup_key='rollups/'))
+        xetra_etl.extract_date_list = xetra_etl.extract_date_list[:3]
+        df_exp = xetra_etl.transform_report1(xetra_etl.extract())
+        df_exp['isin'] = df_exp['isin'].astype(str)
+        # Method execution
+        result = xetra_etl.etl_report1()
+        # Test after method execution
+        trg_keys = [obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix=self.target_config.trg_key)]
+        data = self.trg_bucket.Object(key=trg_keys[0]).get().get('Body').read()
+        df_result = pd.read_parquet(BytesIO(data))
+        df_result['isin'] = df_result['isin'].astype(str)
+        rollup_keys = sorted(obj.key for obj in self.trg_bucket.objects.filter(
+            Prefix='rollups/'))
+        df_hourly = pd.read_parquet(BytesIO(self.trg_bucket.Object(
+            key='rollups/60min/date=2021-04-15/data.parquet').get().get('Body').read()))
+        self.assertTrue(result)
+        pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+        self.assertEqual([f'rollups/{minutes}min/date={date}/data.parquet'
+                          for minutes in (15, 60) for date in ('2021-04-15', '2021-04-16')],
+                         rollup_keys)
+        self.assertEqual(['isin', 'date', 'bar_start', 'opening_price_eur', 'closing_price_eur',
+                          'minimum_price_eur', 'maximum_price_eur', 'traded_volume'],
+                         list(df_hourly.columns))
+        self.assertEqual({f'{hour:02d}:00' for hour in range(8, 18)},
+                         set(df_hourly['bar_start']))
+        self.assertEqual(df_exp.loc[df_exp['date'] == '2021-04-15', 'daily_traded_volume'].sum(),
+                         df_hourly['traded_volume'].sum())
+
+    def test_rollup_minutes_wrong(self):
+        """Tests the constructor raises WrongConfigException on rollup minutes
+        not dividing the next one"""
+        # Method execution
+        with self.assertRaises(WrongConfigException):
+            XetraETL(self.s3_bucket_src, self.s3_bucket_trg, self.meta_key, self.source_config,
+                     self.target_config._replace(trg_rollup_key='rollups/',
+                                                 trg_rollup_minutes=(15, 40)))
+        with self.assertRaises(WrongConfigException):
+            XetraETL(self.s3_bucket_src, self.s3_bucket_trg, self.meta_key, self.source_config,
+                     self.target_config._replace(trg_rollup_key='rollups/',
+                                                 trg_rollup_minutes=()))
+
+    def test_rollups_unsupported_modes(self):
+        """Tests the run modes not writing the rollups raise WrongConfigException
+        with trg_rollup_key"""
+        # Test init
+        xetra_etl = self._pipelined_etl(self.target_config._replace(trg_rollup_key='rollups/'))
+        # Method execution
+        for run in (xetra_etl.etl_report1_arrow, xetra_etl.etl_report1_pipelined,
+                    lambda: xetra_etl.etl_report1_parallel(workers=2)):
+            with self.assertRaises(WrongConfigException):
+                run()
+        # Test after method execution
+        self.assertEqual([], list(self.trg_bucket.objects.all()))
+
+    def test_extract_manifest(self):
+        """Tests the extract method plans the files from the source manifest
+        without listing the dates again"""
+        # Test init
+        self._put_random_source_files(['2021-04-15', '2021-04-16'], files_per_day=2, rows=5)
+        source_config = self.source_config._replace(src_manifest_key='manifest.parquet')
+        listed = []
+        self.s3_bucket_src._client.meta.events.register(
+            'before-parameter-build.s3.ListObjects',
+            lambda params, **kwargs: params['Bucket'] == self.s3_bucket_name_src and
+            listed.append(params['Prefix']))
+        etl_runs = []
+        for _ in range(2):
+            xetra_etl = XetraETL(self.s3_bucket_src, self.s3_bucket_trg, self.meta_key,
+                                 source_config, self.target_config)
+            xetra_etl.extract_date_list = ['2021-04-15', '2021-04-16']
+            etl_runs.append(xetra_etl)
+        # Method execution
+        df_first = etl_runs[0].extract()
+        listed_first = sorted(listed)
+        df_second = etl_runs[1].extract()
+        # Test after method execution
+        self.assertEqual(['2021-04-15', '2021-04-16'], listed_first)
+        self.assertEqual(listed_first, sorted(listed))
+        self.assertEqual(20, len(df_second))
+        pd.testing.assert_frame_equal(df_first, df_second)
+
+    def _etl_on_day(self, today: str, meta_key: str, target_config: XetraTargetConfig):
+        """XetraETL from 2021-04-15 created as on the day today"""
+        class FixedDatetime(datetime):
+            """datetime with today() fixed to today"""
+            @classmethod
+            def today(cls):
+                return cls.fromisoformat(today)
+        with mock.patch('xetra.common.meta_process.datetime', FixedDatetime):
+            return XetraETL(self.s3_bucket_src, self.s3_bucket_trg, meta_key,
+                            self.source_config._replace(src_first_extract_date='2021-04-15'),
+                            target_config)
+
+    def _run_on_day(self, today: str, meta_key: str, target_config: XetraTargetConfig):
+        """Run report 1 as on the day today and return the report and the keys
+        of the source files read"""
+        # source and target connectors share the client
+        keys = []
+        self.s3_bucket_src._client.meta.events.register(
+            'before-parameter-build.s3.GetObject',
+            lambda params, **kwargs: params['Bucket'] == self.s3_bucket_name_src and
+            keys.append(params['Key']), unique_id='test-keys')
+        try:
+            xetra_etl = self._etl_on_day(today, meta_key, target_config)
+            df_report = xetra_etl.transform_report1(xetra_etl.extract())
+            xetra_etl.load(df_report)
+        finally:
+            self.s3_bucket_src._client.meta.events.unregister(
+                'before-parameter-build.s3.GetObject', unique_id='test-keys')
+        if not df_report.empty:
+            df_report['isin'] = df_report['isin'].astype(str)
+        return df_report, keys
+
+    def _put_last_close_source_files(self):
+        """Source files of 2021-04-14 to 2021-04-20, DE0005140008 does not
+        trade on Friday 2021-04-16"""
+        self._put_random_source_files(['2021-04-14', '2021-04-15', '2021-04-19', '2021-04-20'],
+                                      files_per_day=2, rows=20)
+        self._put_random_source_files(['2021-04-16'], files_per_day=2, rows=20,
+                                      isins=('AT0000A0E9W5', 'DE000A0DJ6J9'), seed=8)
+
+    def test_last_close_state_daily_runs(self):
+        """Tests daily runs with the last close state read only the source files
+        of their day and give the report of a full recompute"""
+        # Test init
+        self._put_last_close_source_files()
+        target_config = self.target_config._replace(trg_last_close_state=True)
+        df_exp, _ = self._run_on_day('2021-04-20', 'full_meta.csv', self.target_config)
+        # Method execution
+        reports = []
+        for today in ['2021-04-15', '2021-04-16', '2021-04-17', '2021-04-18',
+                      '2021-04-19', '2021-04-20']:
+            df_report, keys = self._run_on_day(today, 'meta.csv', target_config)
+            reports.append(df_report)
+            # Test after method execution
+            if today == '2021-04-15':
+                # no state yet, the look-back day is read
+                self.assertEqual({'2021-04-14', '2021-04-15'}, {key[:10] for key in keys})
+            else:
+                self.assertEqual({today} if keys else set(), {key[:10] for key in keys})
+        df_result = pd.concat(reports, ignore_index=True).sort_values(
+            ['isin', 'date'], ignore_index=True)
+        df_state = MetaProcess.read_last_close('meta.csv', self.s3_bucket_trg)
+        pd.testing.assert_frame_equal(df_exp, df_result, check_dtype=False)
+        # Monday's change of DE0005140008 is to its closing price of Thursday
+        monday = df_result[(df_result['isin'] == 'DE0005140008') &
+                           (df_result['date'] == '2021-04-19')]
+        self.assertFalse(monday['change_prev_closing_%'].isna().any())
+        self.assertEqual(['2021-04-20'] * 3, list(df_state['date']))
+
+    def test_last_close_state_backfill(self):
+        """Tests a backfill of days before the last close state reads the
+        look-back day and keeps the later closing prices in the state"""
+        # Test init
+        self._put_last_close_source_files()
+        target_config = self.target_config._replace(trg_last_close_state=True)
+        df_full, _ = self._run_on_day('2021-04-20', 'full_meta.csv', self.target_config)
+        df_state_exp = df_full.sort_values('date', kind='stable').drop_duplicates(
+            'isin', keep='last').sort_values('isin', ignore_index=True)[
+                ['isin', 'date', 'closing_price_eur']].rename(
+                    columns={'closing_price_eur': 'closing_price'})
+        MetaProcess.update_meta_file(['2021-04-15', '2021-04-16'], 'meta.csv', self.s3_bucket_trg)
+        backfill_keys = [obj.key for obj in self.trg_bucket.objects.filter(Prefix='meta.csv')]
+        self._run_on_day('2021-04-20', 'meta.csv', target_config)
+        # the first two days are unprocessed again
+        for key in backfill_keys:
+            self.trg_bucket.Object(key).delete()
+        # Method execution
+        df_report, keys = self._run_on_day('2021-04-20', 'meta.csv', target_config)
+        # Test after method execution
+        df_state = MetaProcess.read_last_close('meta.csv', self.s3_bucket_trg)
+        pd.testing.assert_frame_equal(
+            df_full[df_full['date'] <= '2021-04-16'].reset_index(drop=True), df_report,
+            check_dtype=False)
+        self.assertEqual({'2021-04-14', '2021-04-15', '2021-04-16'},
+                         {key[:10] for key in keys})
+        pd.testing.assert_frame_equal(df_state_exp, df_state, check_dtype=False)
+
+    def test_etl_report1_pipelined_resume(self):
+        """Tests a rerun of etl_report1_pipelined after a failed upload
+        extracts only the days not checkpointed and completes the report"""
+        # Test init
+        self._put_last_close_source_files()
+        target_config = self.target_config._replace(trg_key='report1/', trg_partitioned=True,
+                                                    trg_last_close_state=True)
+        df_exp, _ = self._run_on_day('2021-04-20', 'full_meta.csv', self.target_config)
+        uploads = []
+        def fail_monday(params, **kwargs):
+            if params['Key'].startswith('report1/date=2021-04-19'):
+                uploads.append(params['Key'])
+                raise ConnectionError('connection reset')
+        self.s3_bucket_trg._client.meta.events.register(
+            'before-parameter-build.s3.PutObject', fail_monday, unique_id='test-fault')
+        self.s3_bucket_trg.retry_base_delay = 0.001
+        with self.assertRaises(ConnectionError):
+            self._etl_on_day('2021-04-20', 'meta.csv', target_config).etl_report1_pipelined(
+                download_workers=2, queue_size=1)
+        self.s3_bucket_trg._client.meta.events.unregister(
+            'before-parameter-build.s3.PutObject', unique_id='test-fault')
+        # Method execution
+        xetra_etl = self._etl_on_day('2021-04-20', 'meta.csv', target_config)
+        xetra_etl.etl_report1_pipelined(download_workers=2, queue_size=1)
+        # Test after method execution
+        df_result = self.s3_bucket_trg.read_parquet_partitioned(
+            'report1/', '2021-04-15', '2021-04-20', 'isin')
+        df_result['isin'] = df_result['isin'].astype(str)
+        self.assertEqual(4, len(uploads))
+        self.assertEqual(['2021-04-17', '2021-04-18', '2021-04-19', '2021-04-20'],
+                         xetra_etl.extract_date_list)
+        pd.testing.assert_frame_equal(
+            df_exp.sort_values(['date', 'isin'], ignore_index=True),
+            df_result.sort_values(['date', 'isin'], ignore_index=True), check_dtype=False)
+
+    def test_etl_report1_parallel_resume(self):
+        """Tests a rerun of etl_report1_parallel with trg_partitioned after a
+        failed upload extracts only the days not checkpointed and completes
+        the report"""
+        # Test init
+        self._put_last_close_source_files()
+        target_config = self.target_config._replace(trg_key='report1/', trg_partitioned=True,
+                                                    trg_last_close_state=True)
+        df_exp, _ = self._run_on_day('2021-04-20', 'full_meta.csv', self.target_config)
+        def fail_monday(params, **kwargs):
+            if params['Key'].startswith('report1/date=2021-04-19'):
+                raise ConnectionError('connection reset')
+        self.s3_bucket_trg._client.meta.events.register(
+            'before-parameter-build.s3.PutObject', fail_monday, unique_id='test-fault')
+        self.s3_bucket_trg.retry_base_delay = 0.001
+        with self.assertRaises(ConnectionError):
+            self._etl_on_day('2021-04-20', 'meta.csv', target_config).etl_report1_parallel(
+                workers=2)
+        self.s3_bucket_trg._client.meta.events.unregister(
+            'before-parameter-build.s3.PutObject', unique_id='test-fault')
+        # Method execution
+        xetra_etl = self._etl_on_day('2021-04-20', 'meta.csv', target_config)
+        xetra_etl.etl_report1_parallel(workers=2)
+        # Test after method execution
+        df_result = self.s3_bucket_trg.read_parquet_partitioned(
+            'report1/', '2021-04-15', '2021-04-20', 'isin')
+        df_result['isin'] = df_result['isin'].astype(str)
+        self.assertEqual(['2021-04-17', '2021-04-18', '2021-04-19', '2021-04-20'],
+                         xetra_etl.extract_date_list)
+        pd.testing.assert_frame_equal(
+            df_exp.sort_values(['date', 'isin'], ignore_index=True),
+            df_result.sort_values(['date', 'isin'], ignore_index=True), check_dtype=False)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+"""
+Command line interface of the Xetra ETL job
+
+    python run.py run --config configs/xetra_report1_config.yml
+    python run.py plan      dates left to process according to the meta file
+    python run.py status    summary of the last run from the metrics file
+
+The configuration is validated once into typed objects before a command
+runs. pandas, pyarrow and boto3 are imported by the commands needing them,
+status and the argument parsing start without them
+"""
+import argparse
+import json
+import logging
+import logging.config
+import os
+import sys
+
+from xetra.common.config import XetraConfig, load_config
+from xetra.common.constants import StorageBackends
+from xetra.common.custom_exceptions import WrongConfigException
+
+DEFAULT_CONFIG = 'configs/xetra_report1_config.yml'
+
+
+def _connectors(config: XetraConfig):
+    """Source connector, target connector and source cache of the S3
+    configuration, of its storage backend"""
+    s3_config = config.s3
+    if s3_config.backend == StorageBackends.LOCAL.value:
+        # pylint: disable=import-outside-toplevel
+        from xetra.common.local_storage import LocalStorageConnector
+
+        return (LocalStorageConnector(s3_config.local_dir, s3_config.src_bucket),
+                LocalStorageConnector(s3_config.local_dir, s3_config.trg_bucket), None)
+    if s3_config.backend != StorageBackends.S3.value:
+        raise WrongConfigException(
+            f's3.backend must be one of {[backend.value for backend in StorageBackends]}, '
+            f'got {s3_config.backend!r}')
+    # pylint: disable=import-outside-toplevel
+    from xetra.common.s3 import S3BucketConnector, S3ClientRegistry, S3ObjectCache
+
+    S3ClientRegistry.configure(max_pool_connections=s3_config.max_pool_connections,
+                               tcp_keepalive=s3_config.tcp_keepalive,
+                               retry_mode=s3_config.retry_mode,
+                               max_attempts=s3_config.max_attempts)
+    cache = None
+    if s3_config.cache_dir:
+        cache = S3ObjectCache(s3_config.cache_dir, s3_config.cache_max_size_mb)
+    retry_args = {'max_retries': s3_config.file_retries,
+                  'retry_base_delay': s3_config.retry_base_delay_s,
+                  'retry_max_delay': s3_config.retry_max_delay_s}
+    s3_bucket_src = S3BucketConnector(access_key=s3_config.access_key,
+                                      secret_key=s3_config.secret_key,
+                                      endpoint_url=s3_config.src_endpoint_url,
+                                      bucket=s3_config.src_bucket,
+                                      cache=cache, **retry_args)
+    s3_bucket_trg = S3BucketConnector(access_key=s3_config.access_key,
+                                      secret_key=s3_config.secret_key,
+                                      endpoint_url=s3_config.trg_endpoint_url,
+                                      bucket=s3_config.trg_bucket,
+                                      multipart_chunksize=s3_config.multipart_chunksize_mb * 2**20,
+                                      multipart_workers=s3_config.multipart_workers,
+                                      **retry_args)
+    return s3_bucket_src, s3_bucket_trg, cache
+
+
+def run(config: XetraConfig):
+    """Run the ETL job in the mode of the run configuration, the reports of
+    the reports section from one extract if there are any, else report 1"""
+    # pylint: disable=import-outside-toplevel
+    from xetra.common.metrics import METRICS
+    from xetra.transformers.reports import XetraReportsETL
+    from xetra.transformers.xetra_transformer import XetraETL
+
+    logger = logging.getLogger(__name__)
+    s3_bucket_src, s3_bucket_trg, cache = _connectors(config)
+    run_config = config.run
+
+    logger.info('Xetra ETL job started')
+    METRICS.reset()
+    if config.reports:
+        XetraReportsETL(s3_bucket_src, s3_bucket_trg, config.source,
+                        config.reports).etl_reports()
+    else:
+        xetra_etl = XetraETL(s3_bucket_src, s3_bucket_trg, config.meta.meta_key,
+                             config.source, config.target)
+        if run_config.workers > 1:
+            xetra_etl.etl_report1_parallel(run_config.workers)
+        elif run_config.pipelined:
+            xetra_etl.etl_report1_pipelined(run_config.download_workers, run_config.queue_size)
+        elif run_config.arrow:
+            xetra_etl.etl_report1_arrow()
+        else:
+            xetra_etl.etl_report1()
+    _finish_run(config, cache)
+    return 0
+
+
+def _finish_run(config: XetraConfig, cache):
+    """Log and write the metrics of the run"""
+    # pylint: disable=import-outside-toplevel
+    from xetra.common.metrics import METRICS
+
+    logger = logging.getLogger(__name__)
+    if cache is not None:
+        cache.log_stats()
+    logger.info('Xetra ETL metrics: %s', json.dumps(METRICS.summary()))
+    if config.metrics.json_path:
+        METRICS.write_json(config.metrics.json_path)
+    if config.metrics.prometheus_path:
+        METRICS.write_prometheus(config.metrics.prometheus_path, config.metrics.job)
+    logger.info('Xetra ETL job finished')
+
+
+def plan(config: XetraConfig):
+    """Print the dates left to process and the dates to extract for them per
+    report as JSON, reading only the meta data of the target bucket"""
+    # pylint: disable=import-outside-toplevel
+    from xetra.common.meta_process import MetaProcess
+
+    _, s3_bucket_trg, _ = _connectors(config)
+    meta_keys = {report.name: report.meta_key for report in config.reports} \
+        or {'report1': config.meta.meta_key}
+    plans = {}
+    for name, meta_key in meta_keys.items():
+        extract_date, extract_date_list = MetaProcess.return_date_list(
+            config.source.src_first_extract_date, meta_key, s3_bucket_trg)
+        plans[name] = {'dates_to_process': MetaProcess.update_list(
+                           extract_date, extract_date_list, meta_key, s3_bucket_trg),
+                       'dates_to_extract': extract_date_list}
+    print(json.dumps(plans))
+    return 0
+
+
+def status(config: XetraConfig):
+    """Print the summary of the last run from the JSON metrics file, without
+    any S3 request"""
+    json_path = config.metrics.json_path
+    if not json_path or not os.path.isfile(json_path):
+        print(f'No run recorded, metrics file {json_path!r} not found')
+        return 1
+    last_line = ''
+    with open(json_path, encoding='utf-8') as json_file:
+        for line in json_file:
+            last_line = line.strip() or last_line
+    if not last_line:
+        print(f'No run recorded in {json_path}')
+        return 1
+    summary = json.loads(last_line)
+    print(f"Last run started {summary['started']}: "
+          f"{summary['wall_s']:.3f} s wall, {summary['cpu_s']:.3f} s CPU")
+    for name, totals in summary['stages'].items():
+        print(f"  {name:<32}{totals['calls']:>6} calls {totals['wall_s']:10.3f} s "
+              f"{totals['rows_per_s']:14,.0f} rows/s {totals['mb_per_s']:9.1f} MB/s")
+    return 0
+
+
+COMMANDS = {'run': (run, 'run the ETL job'),
+            'plan': (plan, 'print the dates left to process'),
+            'status': (status, 'print the summary of the last run')}
+
+
+def main(argv: list = None):
+    """Entry point for xetra etl job, runs the job without a command"""
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog='xetra', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--config', default=DEFAULT_CONFIG,
+                        help=f'YAML job configuration, default {DEFAULT_CONFIG}')
+    commands = parser.add_subparsers(dest='command')
+    for name, (_, help_text) in COMMANDS.items():
+        commands.add_parser(name, parents=[common], help=help_text)
+    args = parser.parse_args(argv or ['run'])
+    config = load_config(args.config)
+    if args.command != 'status':
+        logging.config.dictConfig(config.logging)
+    return COMMANDS[args.command][0](config)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
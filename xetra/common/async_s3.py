@@ -0,0 +1,108 @@
+"""Asyncio connector and Methods to access AWS S3"""
+
+import asyncio
+import collections
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from xetra.common.s3 import S3BucketConnector, S3ObjectCache
+from xetra.common.storage import concat_frames
+
+
+class AsyncS3BucketConnector():
+    """Class for interating with AWS S3 from asyncio
+
+    The methods of S3BucketConnector as coroutines. The blocking boto3 calls
+    run on a thread pool of max_concurrency threads sharing the thread safe
+    client of one S3BucketConnector, so many date prefixes are listed and
+    many files fetched and parsed concurrently from one event loop
+    """
+
+    def __init__(self, access_key: str, secret_key: str, endpoint_url: str, bucket: str,
+                 cache: S3ObjectCache = None, max_concurrency: int = 32):
+        """
+        Constructor for AsyncS3BucketConnector
+        """
+        self._logger = logging.getLogger(__name__)
+        self.s3_bucket_conn = S3BucketConnector(access_key, secret_key, endpoint_url,
+                                                bucket, cache)
+        self.endpoint_url = endpoint_url
+        self.bucket_name = bucket
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the thread pool of the blocking calls"""
+        self._executor.shutdown(wait=True)
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking S3BucketConnector method on the thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def list_files_in_prefix(self, prefix: str):
+        """
+        Get the list of files with the given prefix from the S3
+        """
+        return await self._run(self.s3_bucket_conn.list_files_in_prefix, prefix)
+
+    async def list_files_in_prefixes(self, prefixes: list):
+        """
+        Get the list of files of all prefixes, in the order of prefixes
+
+        The prefixes are listed concurrently, at most max_concurrency at a time
+        """
+        listings = await asyncio.gather(*(self.list_files_in_prefix(prefix)
+                                          for prefix in prefixes))
+        return [key for listing in listings for key in listing]
+
+    async def read_csv_as_df(self, key: str, **kwargs):
+        """ Read CSV file from S3 and return a dataframe, the keyword arguments
+        are those of S3BucketConnector.read_csv_as_df() without chunksize"""
+        return await self._run(self.s3_bucket_conn.read_csv_as_df, key, **kwargs)
+
+    async def iter_csv_as_df(self, keys: list, **kwargs):
+        """
+        Read CSV files from S3 concurrently and yield one dataframe per key
+
+        GET and parse of a file run in one task streaming the body into the
+        parser, at most 2 * max_concurrency tasks are in flight so parsed
+        dataframes do not pile up ahead of the consumer. The dataframes are
+        yielded in the order of keys
+        """
+        pending = collections.deque()
+        # a failed read or a consumer leaving early cancels the reads in flight
+        try:
+            for key in keys:
+                pending.append(asyncio.ensure_future(self.read_csv_as_df(key, **kwargs)))
+                if len(pending) >= 2 * self.max_concurrency:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def read_many_csv_as_df(self, keys: list, **kwargs):
+        """
+        Read CSV files from S3 concurrently and return one dataframe
+        concatenated in the order of keys
+        """
+        return concat_frames([frame async for frame in self.iter_csv_as_df(keys, **kwargs)])
+
+    async def write_df_to_s3(self, dataframe: pd.DataFrame, key: str, file_format: str):
+        """Write the pandas dataframe to S3 supported format - csv, parquet"""
+        return await self._run(self.s3_bucket_conn.write_df_to_s3, dataframe, key, file_format)
+
+    async def delete_objects(self, keys: list):
+        """Delete the objects with the given keys"""
+        return await self._run(self.s3_bucket_conn.delete_objects, keys)
@@ -0,0 +1,219 @@
+"""
+Typed configuration of the Xetra ETL job
+
+Only the standard library and PyYAML are imported here, so the commands of
+the CLI not touching S3 start without pandas, pyarrow and boto3
+"""
+from typing import NamedTuple
+
+import yaml
+
+from xetra.common.custom_exceptions import WrongConfigException
+
+
+class XetraSourceConfig(NamedTuple):
+    """ Class for source configuration Data """
+
+    src_first_extract_date : str
+    src_columns : list
+    src_col_date : str
+    src_col_isin : str
+    src_col_time: str
+    src_col_start_price : str
+    src_col_min_price : str
+    src_col_max_price : str
+    src_col_traded_vol : str
+    src_price_dtype : str = 'float64'
+    src_engine : str = 'c'
+    src_manifest_key : str = None
+    src_validate : bool = False
+    src_quarantine_prefix : str = 'quarantine/'
+    src_read_workers : int = 8
+
+
+class XetraTargetConfig(NamedTuple):
+    """ Class for target configuration Data"""
+
+
+    trg_col_isin : str
+    trg_col_date : str
+    trg_col_open_price : str
+    trg_col_close_price : str
+    trg_col_min_price : str
+    trg_col_max_price : str
+    trg_col_daily_traded_vol : str
+    trg_col_ch_prev_close : str
+    trg_key : str
+    trg_key_date_format : str
+    trg_format : str
+    trg_partitioned : bool = False
+    trg_isin_buckets : int = 0
+    trg_row_group_size : int = 10000
+    trg_last_close_state : bool = False
+    trg_col_vwap : str = 'vwap_eur'
+    trg_rollup_key : str = ''
+    trg_rollup_minutes : tuple = (15, 60)
+    trg_col_bar_time : str = 'bar_start'
+    trg_col_traded_vol : str = 'traded_volume'
+    trg_index_prefix : str = ''
+
+
+class S3Config(NamedTuple):
+    """ Class for S3 configuration Data"""
+
+    access_key : str
+    secret_key : str
+    src_endpoint_url : str
+    src_bucket : str
+    trg_endpoint_url : str
+    trg_bucket : str
+    cache_dir : str = ''
+    cache_max_size_mb : int = 1024
+    multipart_chunksize_mb : int = 8
+    multipart_workers : int = 4
+    max_pool_connections : int = 50
+    tcp_keepalive : bool = True
+    retry_mode : str = 'standard'
+    max_attempts : int = 5
+    file_retries : int = 3
+    retry_base_delay_s : float = 0.2
+    retry_max_delay_s : float = 10.0
+    backend : str = 's3'
+    local_dir : str = ''
+
+
+class MetaConfig(NamedTuple):
+    """ Class for meta file configuration Data"""
+
+    meta_key : str
+
+
+class RunConfig(NamedTuple):
+    """ Class for job execution configuration Data"""
+
+    workers : int = 1
+    pipelined : bool = False
+    download_workers : int = 8
+    queue_size : int = 16
+    arrow : bool = False
+
+
+class MetricsConfig(NamedTuple):
+    """ Class for metrics configuration Data"""
+
+    json_path : str = ''
+    prometheus_path : str = ''
+    job : str = 'xetra_report1'
+
+
+class ReportConfig(NamedTuple):
+    """ Class for the configuration of one report of the report registry"""
+
+    name : str
+    meta_key : str
+    target : XetraTargetConfig
+
+
+class XetraConfig(NamedTuple):
+    """ Class for the whole job configuration, one typed section per YAML section"""
+
+    logging : dict
+    s3 : S3Config
+    source : XetraSourceConfig
+    target : XetraTargetConfig
+    meta : MetaConfig
+    run : RunConfig = RunConfig()
+    metrics : MetricsConfig = MetricsConfig()
+    reports : tuple = ()
+
+
+def _check_type(section: str, field: str, value, expected: type, optional: bool):
+    """Raise WrongConfigException if value is not of the annotated type, ints
+    are accepted for floats, lists for tuples and None where it is the default"""
+    if value is None and optional:
+        return value
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if expected is tuple and isinstance(value, list):
+        return tuple(value)
+    # bool is a subclass of int, True is no valid number of workers
+    if isinstance(value, expected) and not (expected is int and isinstance(value, bool)):
+        return value
+    raise WrongConfigException(f'{section}.{field} must be of type {expected.__name__}, '
+                               f'got {type(value).__name__} {value!r}')
+
+
+def _parse_section(section: str, values, config_class):
+    """Validate the mapping of one YAML section into an instance of config_class"""
+    if not isinstance(values, dict):
+        raise WrongConfigException(f'{section} must be a mapping, got {type(values).__name__}')
+    unknown = sorted(set(values) - set(config_class._fields))
+    if unknown:
+        raise WrongConfigException(f'{section} has unknown keys {unknown}')
+    missing = [field for field in config_class._fields
+               if field not in values and field not in config_class._field_defaults]
+    if missing:
+        raise WrongConfigException(f'{section} misses the keys {missing}')
+    return config_class(**{
+        field: _check_type(section, field, value, config_class.__annotations__[field],
+                           field in config_class._field_defaults
+                           and config_class._field_defaults[field] is None)
+        for field, value in values.items()})
+
+
+def _parse_reports(values, target: XetraTargetConfig):
+    """Validate the list of reports, the target keys of a report override the
+    ones of the target section"""
+    if not isinstance(values, list):
+        raise WrongConfigException(f'reports must be a list, got {type(values).__name__}')
+    reports = []
+    for index, report in enumerate(values):
+        section = f'reports[{index}]'
+        if not isinstance(report, dict):
+            raise WrongConfigException(f'{section} must be a mapping')
+        overrides = report.get('target') or {}
+        if not isinstance(overrides, dict):
+            raise WrongConfigException(f'{section}.target must be a mapping')
+        report_target = _parse_section(f'{section}.target', {**target._asdict(), **overrides},
+                                       XetraTargetConfig)
+        reports.append(_parse_section(section, {**report, 'target': report_target},
+                                      ReportConfig))
+    return tuple(reports)
+
+
+def parse_config(config: dict):
+    """Validate the parsed YAML of the job configuration into a XetraConfig,
+    raising WrongConfigException on unknown or missing keys and wrong types"""
+    sections = {'logging': dict, 's3': S3Config, 'source': XetraSourceConfig,
+                'target': XetraTargetConfig, 'meta': MetaConfig, 'run': RunConfig,
+                'metrics': MetricsConfig, 'reports': list}
+    if not isinstance(config, dict):
+        raise WrongConfigException('The configuration must be a mapping of sections')
+    values = {}
+    for section, values_section in config.items():
+        if section not in sections:
+            raise WrongConfigException(f'Unknown configuration section {section}')
+        if sections[section] is list:
+            # parsed on top of the target section
+            continue
+        if sections[section] is not dict:
+            values[section] = _parse_section(section, values_section, sections[section])
+        elif isinstance(values_section, dict):
+            values[section] = values_section
+        else:
+            raise WrongConfigException(f'{section} must be a mapping')
+    missing = [section for section in XetraConfig._fields
+               if section not in values and section not in XetraConfig._field_defaults]
+    if missing:
+        raise WrongConfigException(f'The configuration misses the sections {missing}')
+    if config.get('reports'):
+        values['reports'] = _parse_reports(config['reports'], values['target'])
+    return XetraConfig(**values)
+
+
+def load_config(config_path: str):
+    """Read and validate the YAML job configuration at config_path once,
+    with the C loader of PyYAML where available"""
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(config_path, encoding='utf-8') as config_file:
+        return parse_config(yaml.load(config_file, Loader=loader))
@@ -11,6 +11,24 @@ class S3FileTypes(Enum):
     PARQUET = 'parquet'
 
 
+class StorageBackends(Enum):
+    """
+    storage backends of the connectors
+    """
+    S3 = 's3'
+    LOCAL = 'local'
+
+
+class S3PartitionFormat(Enum):
+    """
+    key layout of partitioned parquet objects
+    written by S3BucketConnector
+    """
+    PARTITION_DATE = 'date'
+    PARTITION_ISIN_BUCKET = 'isin_bucket'
+    PARTITION_FILE_NAME = 'data.parquet'
+
+
 class MetaProcessFormat(Enum):
     """
     formation for MetaProcess class
@@ -19,4 +37,37 @@ class MetaProcessFormat(Enum):
     META_PROCESS_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
     META_SOURCE_DATE_COL = 'source_date'
     META_PROCESS_COL = 'datetime_of_processing'
-    META_FILE_FORMAT = 'csv'
\ No newline at end of file
+    META_FILE_FORMAT = 'csv'
+    META_BATCH_SUFFIX = '_batches/'
+    META_BATCH_KEY_FORMAT = '%Y%m%d_%H%M%S_%f'
+    META_COMPACTION_BATCHES = 30
+    META_LAST_CLOSE_SUFFIX = '_last_close.parquet'
+    META_LAST_CLOSE_ISIN_COL = 'isin'
+    META_LAST_CLOSE_DATE_COL = 'date'
+    META_LAST_CLOSE_PRICE_COL = 'closing_price'
+
+
+class ManifestFormat(Enum):
+    """
+    formation for SourceManifest class
+    """
+    MANIFEST_DATE_COL = 'source_date'
+    MANIFEST_KEY_COL = 'key'
+    MANIFEST_SIZE_COL = 'size'
+    MANIFEST_ETAG_COL = 'etag'
+    MANIFEST_LISTED_COL = 'listed_on'
+    MANIFEST_DATE_FORMAT = '%Y-%m-%d'
+    MANIFEST_LIST_WORKERS = 8
+
+
+class ReportIndexFormat(Enum):
+    """
+    formation for the sidecar index
+    of xetra.query.ReportQuery
+    """
+    INDEX_ISIN_COL = 'isin'
+    INDEX_DATE_COL = 'date'
+    INDEX_KEY_COL = 'key'
+    INDEX_ROW_GROUP_COL = 'row_group'
+    INDEX_TAIL_BYTES = 64 * 2**10
+    INDEX_CACHE_ROW_GROUPS = 256
@@ -8,4 +8,13 @@ class WrongFormatException(Exception):
 
 
 class WrongMetaFIleException(Exception):
-    """Wrong Meta File Format Exception"""
\ No newline at end of file
+    """Wrong Meta File Format Exception"""
+
+class PipelineStoppedException(Exception):
+    """A pipeline stage was stopped because another stage failed"""
+
+class WrongConfigException(Exception):
+    """Wrong Job Configuration Exception"""
+
+class NoSuchKeyException(FileNotFoundError):
+    """Missing Storage Key Exception"""
@@ -0,0 +1,165 @@
+"""Connector and Methods to access a local directory as bucket"""
+
+import logging
+import os
+import uuid
+from io import BytesIO
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+from xetra.common.custom_exceptions import NoSuchKeyException
+from xetra.common.metrics import METRICS
+from xetra.common.storage import StorageConnector
+
+
+class LocalStorageConnector(StorageConnector):
+    """Class for interacting with a bucket of files in the local filesystem
+
+    The objects of bucket are the files under root_dir/bucket, a key is the
+    path of its file relative to the bucket directory. Source files and
+    Parquet objects are read memory mapped, the parsers read the pages of
+    the file without copying it to a buffer first. An object is written to a
+    temporary file renamed to its key, readers never see a partial object
+    """
+
+    STAGE_PREFIX = 'local'
+
+    def __init__(self, root_dir: str, bucket: str):
+        """
+        Constructor for LocalStorageConnector
+        """
+        self._logger = logging.getLogger(__name__)
+        self.root_dir = root_dir
+        self.bucket_name = bucket
+        self.endpoint_url = f'file://{os.path.abspath(root_dir)}'
+        self._bucket_dir = os.path.join(os.path.abspath(root_dir), bucket)
+
+    def _path(self, key: str):
+        """Path of the file of key"""
+        return os.path.join(self._bucket_dir, *key.split('/'))
+
+    def _existing_path(self, key: str):
+        """Path of the file of key, NoSuchKeyException if there is none"""
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise NoSuchKeyException(f'{self.bucket_name}/{key}')
+        return path
+
+    def list_objects_in_prefix(self, prefix: str):
+        """Get the key, size and ETag of the objects with the given prefix
+
+        Only the entries of the directory of the prefix whose names start with
+        the rest of the prefix are walked, e.g. the directory 2021-04-15 of the
+        bucket for the prefix 2021-04-15 but not the other days. The ETag is
+        made of the modification time and the size of the file
+        """
+        directory, _, name_prefix = prefix.rpartition('/')
+        try:
+            entries = [entry for entry in os.scandir(
+                os.path.join(self._bucket_dir, *directory.split('/')))
+                       if entry.name.startswith(name_prefix)]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+        paths = []
+        for entry in entries:
+            if entry.is_dir():
+                paths.extend(os.path.join(root, name) for root, _, names in os.walk(entry.path)
+                             for name in names)
+            else:
+                paths.append(entry.path)
+        objects = []
+        for path in paths:
+            if path.endswith('.tmp'):
+                continue
+            key = os.path.relpath(path, self._bucket_dir).replace(os.sep, '/')
+            stat = os.stat(path)
+            objects.append((key, stat.st_size, f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'))
+        # S3 lists keys in lexicographic order
+        return sorted(objects)
+
+    def read_csv_as_df(self, key: str, encoding: str = 'utf-8', sep: str = ',',
+                       chunksize: int = None, usecols: list = None, dtype: dict = None,
+                       engine: str = None):
+        """Read CSV file and return a dataframe
+
+        The file is memory mapped, with chunksize an iterator of dataframes
+        with chunksize rows each is returned instead. The options are those of
+        S3BucketConnector.read_csv_as_df()
+        """
+        path = self._existing_path(key)
+        self._logger.info('Reading file %s', path)
+        with METRICS.stage('local.read_csv_as_df') as record:
+            record.bytes = os.path.getsize(path)
+            options = {'sep': sep, 'encoding': encoding, 'chunksize': chunksize,
+                       'usecols': usecols, 'dtype': dtype, 'engine': engine}
+            if engine == 'pyarrow':
+                # pandas memory maps the file for its own parsers only, the
+                # pyarrow engine reads it whole, so the map is closed after it
+                with pa.memory_map(path) as source:
+                    dataframe = pd.read_csv(source, **options)
+            else:
+                dataframe = pd.read_csv(path, memory_map=True, **options)
+            if chunksize is None:
+                record.rows = len(dataframe)
+        return dataframe
+
+    def read_csv_as_table(self, key: str, columns: list = None, column_types: dict = None):
+        """Read CSV file from the memory mapped file and return a pyarrow
+        Table, the options are those of S3BucketConnector.read_csv_as_table()"""
+        path = self._existing_path(key)
+        self._logger.info('Reading file %s', path)
+        with METRICS.stage('local.read_csv_as_table') as record, \
+                pa.memory_map(path) as source:
+            record.bytes = source.size()
+            table = pcsv.read_csv(source, convert_options=pcsv.ConvertOptions(
+                include_columns=columns, column_types=column_types))
+            record.rows = table.num_rows
+        return table
+
+    def read_parquet_as_df(self, key: str, columns: list = None):
+        """Read Parquet file from the memory mapped file and return a
+        dataframe, only the given columns if columns is set"""
+        path = self._existing_path(key)
+        self._logger.info('Reading file %s', path)
+        with METRICS.stage('local.read_parquet_as_df') as record:
+            table = pq.read_table(path, columns=columns, memory_map=True)
+            record.bytes, record.rows = os.path.getsize(path), table.num_rows
+        return table.to_pandas()
+
+    def read_range(self, key: str, start: int, end: int = None):
+        """Read the bytes start to end, inclusive, of the object key, the last
+        -start bytes if start is negative, and the size of the whole object"""
+        path = self._existing_path(key)
+        with METRICS.stage('local.read_range') as record, open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            start = max(0, size + start) if start < 0 else start
+            end = size - 1 if end is None else min(end, size - 1)
+            file.seek(start)
+            body = file.read(max(0, end - start + 1))
+            record.bytes = len(body)
+        return body, size
+
+    def delete_objects(self, keys: list):
+        """Delete the files of the given keys, missing ones are skipped as
+        S3 does"""
+        self._logger.info('Deleting %s files from %s', len(keys), self._bucket_dir)
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+        return True
+
+    def _put_object(self, out_buffer: BytesIO, key: str):
+        """Helper function for self.write_df_to_s3() writing the buffer to a
+        temporary file and renaming it to the file of key"""
+        path = self._path(key)
+        self._logger.info('Writing file %s', path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(out_buffer.getbuffer())
+        os.replace(tmp_path, path)
+        return True
@@ -0,0 +1,98 @@
+"""
+Manifest of the source files per date
+
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+from xetra.common.s3 import S3BucketConnector
+from xetra.common.constants import ManifestFormat, S3FileTypes
+from xetra.common.metrics import METRICS
+
+
+class SourceManifest():
+    """Key, size and ETag of the source files per date, persisted as a Parquet
+    file in the meta bucket
+
+    A date listed on a later day is complete, the Deutsche Boerse publishes
+    the files of a day during that day, so it is never listed again. Dates
+    not in the manifest, today and dates in the future are listed on use
+    """
+
+    def __init__(self, s3_bucket_src: S3BucketConnector, s3_bucket_meta: S3BucketConnector,
+                 manifest_key: str, list_workers: int = ManifestFormat.MANIFEST_LIST_WORKERS.value):
+        """
+        Constructor for SourceManifest
+        """
+        self._logger = logging.getLogger(__name__)
+        self.s3_bucket_src = s3_bucket_src
+        self.s3_bucket_meta = s3_bucket_meta
+        self.manifest_key = manifest_key
+        self.list_workers = list_workers
+        # manifest rows, read on first use
+        self._df_manifest = None
+
+    def _read(self):
+        """Read the manifest from the meta bucket, an empty one if there is none yet"""
+        if self._df_manifest is None:
+            try:
+                self._df_manifest = self.s3_bucket_meta.read_parquet_as_df(self.manifest_key)
+            except self.s3_bucket_meta.exceptions.NoSuchKey:
+                self._df_manifest = pd.DataFrame(columns=[
+                    ManifestFormat.MANIFEST_DATE_COL.value, ManifestFormat.MANIFEST_KEY_COL.value,
+                    ManifestFormat.MANIFEST_SIZE_COL.value, ManifestFormat.MANIFEST_ETAG_COL.value,
+                    ManifestFormat.MANIFEST_LISTED_COL.value])
+        return self._df_manifest
+
+    def _complete_dates(self, df_manifest: pd.DataFrame):
+        """Dates of the manifest listed on a later day"""
+        date_col = ManifestFormat.MANIFEST_DATE_COL.value
+        complete = df_manifest[date_col] < df_manifest[ManifestFormat.MANIFEST_LISTED_COL.value]
+        return set(df_manifest.loc[complete, date_col])
+
+    @METRICS.timed('manifest.refresh')
+    def _refresh(self, dates: list):
+        """List the source files of dates and write them to the manifest, a
+        date without files is kept as one row without key"""
+        today = datetime.today().strftime(ManifestFormat.MANIFEST_DATE_FORMAT.value)
+        with ThreadPoolExecutor(max_workers=self.list_workers) as executor:
+            listings = list(executor.map(self.s3_bucket_src.list_objects_in_prefix, dates))
+        rows = []
+        for date, objects in zip(dates, listings):
+            rows += [(date, key, size, etag, today) for key, size, etag in objects] \
+                or [(date, None, None, None, today)]
+        df_new = pd.DataFrame(rows, columns=self._df_manifest.columns)
+        df_old = self._df_manifest[
+            ~self._df_manifest[ManifestFormat.MANIFEST_DATE_COL.value].isin(dates)]
+        self._df_manifest = pd.concat([df_old, df_new] if not df_old.empty else [df_new],
+                                      ignore_index=True).sort_values(
+            by=ManifestFormat.MANIFEST_DATE_COL.value, kind='stable', ignore_index=True)
+        self.s3_bucket_meta.write_df_to_s3(self._df_manifest.astype(
+            {ManifestFormat.MANIFEST_SIZE_COL.value: 'Int64'}), self.manifest_key,
+            S3FileTypes.PARQUET.value)
+        self._logger.info('Source manifest refreshed for %s dates.', len(dates))
+
+    def files(self, dates: list):
+        """Get the keys of the source files of each date, as a dict of date to
+        the list of keys in listing order
+
+        Only the dates not complete in the manifest are listed. The ETags of
+        the files are passed to the source connector, so cached reads need no
+        HEAD request
+        """
+        df_manifest = self._read()
+        complete = self._complete_dates(df_manifest)
+        stale = [date for date in dict.fromkeys(dates) if date not in complete]
+        if stale:
+            self._refresh(stale)
+            df_manifest = self._df_manifest
+        df_files = df_manifest[df_manifest[ManifestFormat.MANIFEST_DATE_COL.value].isin(dates) &
+                               df_manifest[ManifestFormat.MANIFEST_KEY_COL.value].notna()]
+        keys = df_files[ManifestFormat.MANIFEST_KEY_COL.value]
+        self.s3_bucket_src.add_etags(dict(zip(keys,
+                                              df_files[ManifestFormat.MANIFEST_ETAG_COL.value])))
+        files = {date: [] for date in dates}
+        for date, key in zip(df_files[ManifestFormat.MANIFEST_DATE_COL.value], keys):
+            files[date].append(key)
+        return files
@@ -3,54 +3,232 @@ Methods for processing the meta file
 
 """
 import collections
+import os
+import uuid
 from datetime import datetime
+import numpy as np
 import pandas as pd
-from xetra.common.custom_exceptions import WrongFormatException
 from xetra.common.s3 import S3BucketConnector
-from xetra.common.constants import MetaProcessFormat
+from xetra.common.constants import MetaProcessFormat, S3FileTypes
 from xetra.common.custom_exceptions import WrongMetaFIleException
+from xetra.common.metrics import METRICS
 
 
 class MetaProcess():
-    """ Class with Meta File Processing Methods"""
+    """ Class with Meta File Processing Methods
+
+    The meta data of a meta_key is the meta file at meta_key plus the batch
+    files under the meta_key batch prefix, one small file per update and the
+    files the compaction merged them into
+    """
+
+    # index of the processed source dates as sorted datetime64[D] arrays,
+    # keyed by (bucket, meta_key), read again by each return_date_list call
+    _processed_dates = {}
+
+    @staticmethod
+    def _batch_prefix(meta_key: str):
+        """Prefix of the batch files of meta_key"""
+        return f'{meta_key}{MetaProcessFormat.META_BATCH_SUFFIX.value}'
+
+    @staticmethod
+    def _batch_key(meta_key: str):
+        """New unique key of a batch file of meta_key"""
+        return (f'{MetaProcess._batch_prefix(meta_key)}'
+                f'{datetime.today().strftime(MetaProcessFormat.META_BATCH_KEY_FORMAT.value)}'
+                f'_{uuid.uuid4().hex[:8]}.{MetaProcessFormat.META_FILE_FORMAT.value}')
+
+    @staticmethod
+    @METRICS.timed('meta.update_meta_file')
+    def update_meta_file(extract_date_list: list,meta_key: str,s3_bucket_meta: S3BucketConnector):
+        """Updating meta file with the dates processed from xetra and
+        today's date as the processing date
+
+        The dates are appended as a new batch file, so no history is read or
+        rewritten and concurrent runs do not overwrite each other. The batches
+        are compacted into one batch file once there are META_COMPACTION_BATCHES
+        """
+
+        #Create the meta rows of the new dates with today's date as processed date
+        df_new = pd.DataFrame({
+            MetaProcessFormat.META_SOURCE_DATE_COL.value: extract_date_list,
+            MetaProcessFormat.META_PROCESS_COL.value:
+                datetime.today().strftime(MetaProcessFormat.META_PROCESS_DATE_FORMAT.value)
+        })
+
+        #Writing the batch file to S3
+        if s3_bucket_meta.write_df_to_s3(df_new, MetaProcess._batch_key(meta_key),
+                                         MetaProcessFormat.META_FILE_FORMAT.value) is None:
+            return True
+
+        #Keeping a loaded index of processed dates up to date
+        index_key = (s3_bucket_meta.bucket_name, meta_key)
+        if index_key in MetaProcess._processed_dates:
+            MetaProcess._processed_dates[index_key] = np.union1d(
+                MetaProcess._processed_dates[index_key],
+                np.array(extract_date_list, dtype='datetime64[D]'))
+
+        batch_keys = s3_bucket_meta.list_files_in_prefix(MetaProcess._batch_prefix(meta_key))
+        if len(batch_keys) >= MetaProcessFormat.META_COMPACTION_BATCHES.value:
+            MetaProcess.compact_meta_file(meta_key, s3_bucket_meta)
+        return True
+
+    @staticmethod
+    def _read_batches(meta_key: str, s3_bucket_meta: S3BucketConnector,
+                      batch_keys: list = None):
+        """Read the batch files of meta_key, listed unless batch_keys are given
+
+        Returns the batch dataframes and the keys of the batch files read
+        """
+        if batch_keys is None:
+            batch_keys = s3_bucket_meta.list_files_in_prefix(
+                MetaProcess._batch_prefix(meta_key))
+        try:
+            frames = list(s3_bucket_meta.iter_csv_as_df(batch_keys))
+        except s3_bucket_meta.exceptions.NoSuchKey:
+            #A concurrent compaction deleted batch files after they were listed,
+            #their rows are in the batch file it wrote before
+            batch_keys = s3_bucket_meta.list_files_in_prefix(MetaProcess._batch_prefix(meta_key))
+            frames = list(s3_bucket_meta.iter_csv_as_df(batch_keys))
+        return frames, batch_keys
 
     @staticmethod
-    def update_meta_file(extract_date_list: str,meta_key: str,s3_bucket_meta: S3BucketConnector):
-        """Updating meta file with the dates processed from xetra and 
-        today's date as the processing date"""
+    def _read_meta_batches(meta_key: str, s3_bucket_meta: S3BucketConnector):
+        """Read the meta file and the batch files of meta_key
 
-        #Create an empty dataframe with metafile column list
-        df_new = pd.DataFrame(columns=[
+        Returns the meta dataframe and the keys of the batch files read
+        """
+        meta_columns = collections.Counter([
             MetaProcessFormat.META_SOURCE_DATE_COL.value,
             MetaProcessFormat.META_PROCESS_COL.value
         ])
-
-        #Update date column with extract_date_list and processed date with today's date
-        df_new[MetaProcessFormat.META_SOURCE_DATE_COL.value] = extract_date_list
-        df_new[MetaProcessFormat.META_PROCESS_DATE_FORMAT.value] = \
-            datetime.today().strftime(MetaProcessFormat.META_DATE_FORMAT.value)
-        
+        frames, batch_keys = MetaProcess._read_batches(meta_key, s3_bucket_meta)
         try:
-            # If old meta file exists, create a new df with the union of old and new
-            df_old = s3_bucket_meta.read_csv_as_df(meta_key)
-            if collections.Counter(df_old.columns) != collections.Counter(df_new.columns):
+            frames.insert(0, s3_bucket_meta.read_csv_as_df(meta_key))
+        except s3_bucket_meta.exceptions.NoSuchKey:
+            #If the compacted meta file doesn't exist yet
+            pass
+        for frame in frames:
+            if collections.Counter(frame.columns) != meta_columns:
                 raise WrongMetaFIleException
-            df_all = pd.concat([df_old,df_new])
-        
-        except s3_bucket_meta.session.client('s3').exceptions.NoSuchKey:
-            #If old meta file doesn't exists
-            df_all = df_new
-
-        #Writing to S3
-        s3_bucket_meta.write_df_to_s3(df_all,meta_key,MetaProcessFormat.META_FILE_FORMAT.value)
+        if not frames:
+            return pd.DataFrame(columns=list(meta_columns)), batch_keys
+        return pd.concat(frames, ignore_index=True), batch_keys
+
+    @staticmethod
+    @METRICS.timed('meta.read_meta_file')
+    def read_meta_file(meta_key: str, s3_bucket_meta: S3BucketConnector):
+        """Read all meta data of meta_key, the meta file and its batch files"""
+        return MetaProcess._read_meta_batches(meta_key, s3_bucket_meta)[0]
+
+    @staticmethod
+    def compact_meta_file(meta_key: str, s3_bucket_meta: S3BucketConnector):
+        """Merge the batch files into one new batch file and delete them
+
+        Nothing is overwritten, the merged rows are written under a new unique
+        key before the batch files that were read are deleted. Batches written
+        by a concurrent run in the meantime are kept for the next compaction,
+        concurrent compactions at worst leave duplicate rows that the next
+        compaction drops. The meta file at meta_key is only read
+        """
+        batch_keys = s3_bucket_meta.list_files_in_prefix(MetaProcess._batch_prefix(meta_key))
+        if len(batch_keys) < 2:
+            return True
+        frames, batch_keys = MetaProcess._read_batches(meta_key, s3_bucket_meta, batch_keys)
+        if len(batch_keys) < 2:
+            #A concurrent compaction merged the batch files in the meantime
+            return True
+        df_batches = pd.concat(frames, ignore_index=True).drop_duplicates(ignore_index=True)
+        s3_bucket_meta.write_df_to_s3(df_batches, MetaProcess._batch_key(meta_key),
+                                      MetaProcessFormat.META_FILE_FORMAT.value)
+        s3_bucket_meta.delete_objects(batch_keys)
         return True
 
+    @staticmethod
+    def processed_dates(meta_key: str, s3_bucket_meta: S3BucketConnector, reload: bool = False):
+        """Sorted datetime64[D] array of the source dates in the meta data,
+        read from S3 once and kept in memory, read again with reload"""
+        index_key = (s3_bucket_meta.bucket_name, meta_key)
+        if reload or index_key not in MetaProcess._processed_dates:
+            df_meta = MetaProcess.read_meta_file(meta_key, s3_bucket_meta)
+            MetaProcess._processed_dates[index_key] = np.unique(
+                pd.to_datetime(df_meta[MetaProcessFormat.META_SOURCE_DATE_COL.value])
+                .to_numpy().astype('datetime64[D]'))
+        return MetaProcess._processed_dates[index_key]
+
+    @staticmethod
+    def is_processed(dates: np.ndarray, meta_key: str, s3_bucket_meta: S3BucketConnector):
+        """Boolean mask of the datetime64[D] dates already in the meta data,
+        a binary search per date instead of a scan of the history"""
+        processed = MetaProcess.processed_dates(meta_key, s3_bucket_meta)
+        if processed.size == 0:
+            return np.zeros(len(dates), dtype=bool)
+        positions = np.searchsorted(processed, dates).clip(max=processed.size - 1)
+        return processed[positions] == dates
+
+    @staticmethod
+    def return_date_list(first_date: str, meta_key: str, s3_bucket_meta: S3BucketConnector):
+        """Creating the list of dates to extract based on first_date and the
+        dates already processed according to the meta data
 
-        
+        Returns the first unprocessed date and the sorted list of the
+        unprocessed dates between first_date and today, each with the day
+        before it for the previous closing price. The processed dates are read
+        again, so dates written by other runs in the meantime are seen
+        """
+        MetaProcess.processed_dates(meta_key, s3_bucket_meta, reload=True)
+        dates = np.arange(np.datetime64(first_date, 'D'),
+                          np.datetime64(datetime.today().date(), 'D') + 1)
+        missing = dates[~MetaProcess.is_processed(dates, meta_key, s3_bucket_meta)]
+        if missing.size == 0:
+            return datetime(2200, 1, 1).strftime(MetaProcessFormat.META_DATE_FORMAT.value), []
+        return_dates = np.union1d(missing, missing - 1)
+        return str(missing[0]), np.datetime_as_string(return_dates, unit='D').tolist()
 
+    @staticmethod
+    def update_list(extract_date: str, extract_date_list: list, meta_key: str,
+                    s3_bucket_meta: S3BucketConnector):
+        """Dates of extract_date_list to process and add to the meta file, the
+        look-back days before extract_date and the processed days are only read
+        for the previous closing price"""
+        processed = MetaProcess.is_processed(np.array(extract_date_list, dtype='datetime64[D]'),
+                                             meta_key, s3_bucket_meta)
+        return [date for date, is_processed in zip(extract_date_list, processed)
+                if not is_processed and date >= extract_date]
 
     @staticmethod
-    def return_date_list(self):
-        pass
+    def last_close_key(meta_key: str):
+        """Key of the last close state of meta_key, next to the meta file"""
+        return f'{os.path.splitext(meta_key)[0]}{MetaProcessFormat.META_LAST_CLOSE_SUFFIX.value}'
 
-    
\ No newline at end of file
+    @staticmethod
+    def read_last_close(meta_key: str, s3_bucket_meta: S3BucketConnector):
+        """Read the last close state of meta_key, the latest closing price and
+        its date per ISIN, None if there is no state yet"""
+        try:
+            return s3_bucket_meta.read_parquet_as_df(MetaProcess.last_close_key(meta_key))
+        except s3_bucket_meta.exceptions.NoSuchKey:
+            return None
+
+    @staticmethod
+    def update_last_close(df_last_close: pd.DataFrame, meta_key: str,
+                          s3_bucket_meta: S3BucketConnector):
+        """Merge the closing prices of df_last_close into the last close state
+
+        Per ISIN the row with the latest date is kept, on the same date the row
+        of df_last_close, so processing days before the state (a backfill)
+        leaves the later closing prices in place
+        """
+        isin_col = MetaProcessFormat.META_LAST_CLOSE_ISIN_COL.value
+        date_col = MetaProcessFormat.META_LAST_CLOSE_DATE_COL.value
+        frames = [df_last_close]
+        df_old = MetaProcess.read_last_close(meta_key, s3_bucket_meta)
+        if df_old is not None:
+            frames.insert(0, df_old)
+        df_state = pd.concat(frames, ignore_index=True).astype({isin_col: str, date_col: str})
+        df_state = df_state.sort_values(by=date_col, kind='stable') \
+            .drop_duplicates(subset=isin_col, keep='last') \
+            .sort_values(by=isin_col, ignore_index=True)
+        s3_bucket_meta.write_df_to_s3(df_state, MetaProcess.last_close_key(meta_key),
+                                      S3FileTypes.PARQUET.value)
+        return True
@@ -0,0 +1,159 @@
+"""Wall time, CPU time, bytes and rows per stage of the ETL run"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+
+
+class StageRecord():
+    """Counters of one call of a stage, the code of the stage adds the bytes
+    transferred and the rows processed"""
+
+    __slots__ = ('bytes', 'rows')
+
+    def __init__(self):
+        self.bytes = 0
+        self.rows = 0
+
+
+class Metrics():
+    """Thread safe totals per stage since the last reset()
+
+    The wall time of a stage is summed over its calls, concurrent calls count
+    each. The CPU time is the one of the thread running the call. The calls
+    in worker processes of XetraETL.etl_report1_parallel() are recorded in
+    the worker and added with merge() in the parent process
+    """
+
+    def __init__(self):
+        """
+        Constructor for Metrics
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all totals and restart the run clock"""
+        with self._lock:
+            self._stages = {}
+            self._started = datetime.now()
+            self._wall_start = time.perf_counter()
+            self._cpu_start = time.process_time()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Context manager recording one call of the stage name, yields the
+        StageRecord for the bytes and rows of the call"""
+        record = StageRecord()
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            with self._lock:
+                totals = self._stages.setdefault(
+                    name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'bytes': 0, 'rows': 0})
+                totals['calls'] += 1
+                totals['wall_s'] += wall
+                totals['cpu_s'] += cpu
+                totals['bytes'] += record.bytes
+                totals['rows'] += record.rows
+
+    def stage_totals(self, since: dict = None):
+        """Totals per stage, less the totals since of an earlier call, to be
+        added with merge() in another process"""
+        with self._lock:
+            stages = {name: dict(totals) for name, totals in self._stages.items()}
+        for name, totals in (since or {}).items():
+            for field, value in totals.items():
+                stages[name][field] -= value
+        return {name: totals for name, totals in stages.items() if totals['calls']}
+
+    def merge(self, stages: dict):
+        """Add the stage totals of stage_totals() recorded in another process"""
+        with self._lock:
+            for name, totals in stages.items():
+                merged = self._stages.setdefault(
+                    name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'bytes': 0, 'rows': 0})
+                for field, value in totals.items():
+                    merged[field] += value
+
+    def timed(self, name: str):
+        """Decorator recording each call of the function as the stage name,
+        the rows of a returned dataframe or pyarrow Table are counted"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name) as record:
+                    result = func(*args, **kwargs)
+                    if isinstance(result, pd.DataFrame):
+                        record.rows += len(result)
+                    elif isinstance(result, pa.Table):
+                        record.rows += result.num_rows
+                    return result
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """Run and stage totals with rows and MB per second of wall time"""
+        with self._lock:
+            stages = {name: dict(totals) for name, totals in sorted(self._stages.items())}
+            started = self._started
+            wall = time.perf_counter() - self._wall_start
+            cpu = time.process_time() - self._cpu_start
+        for totals in stages.values():
+            wall_s = totals['wall_s']
+            totals['rows_per_s'] = round(totals['rows'] / wall_s, 1) if wall_s else 0.0
+            totals['mb_per_s'] = round(totals['bytes'] / 2**20 / wall_s, 3) if wall_s else 0.0
+            totals['wall_s'] = round(wall_s, 6)
+            totals['cpu_s'] = round(totals['cpu_s'], 6)
+        return {'started': started.isoformat(timespec='seconds'),
+                'wall_s': round(wall, 6), 'cpu_s': round(cpu, 6), 'stages': stages}
+
+    def write_json(self, path: str):
+        """Append the summary as one JSON line to path, one line per run to
+        compare the throughput run over run"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as json_file:
+            json_file.write(json.dumps(self.summary()) + '\n')
+
+    def write_prometheus(self, path: str, job: str):
+        """Write the summary in the Prometheus text format for the textfile
+        collector of the node exporter, replacing the file atomically"""
+        summary = self.summary()
+        lines = []
+        for metric, help_text, value in (
+                ('xetra_run_wall_seconds', 'Wall time of the last run.', summary['wall_s']),
+                ('xetra_run_cpu_seconds', 'CPU time of the last run.', summary['cpu_s']),
+                ('xetra_run_start_timestamp_seconds', 'Start time of the last run.',
+                 datetime.fromisoformat(summary['started']).timestamp())):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge',
+                      f'{metric}{{job="{job}"}} {value}']
+        for metric, field, help_text in (
+                ('xetra_stage_calls', 'calls', 'Calls of the stage in the last run.'),
+                ('xetra_stage_wall_seconds', 'wall_s', 'Wall time of the stage in the last run.'),
+                ('xetra_stage_cpu_seconds', 'cpu_s', 'CPU time of the stage in the last run.'),
+                ('xetra_stage_bytes', 'bytes', 'Bytes transferred by the stage in the last run.'),
+                ('xetra_stage_rows', 'rows', 'Rows processed by the stage in the last run.')):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge']
+            lines += [f'{metric}{{job="{job}",stage="{name}"}} {totals[field]}'
+                      for name, totals in summary['stages'].items()]
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as prom_file:
+            prom_file.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+
+# metrics of the ETL run, recorded by the connectors, MetaProcess and XetraETL
+METRICS = Metrics()
@@ -0,0 +1,111 @@
+"""Bounded queues and stage timings of pipelined processing"""
+
+import contextlib
+import queue
+import threading
+import time
+
+from xetra.common.custom_exceptions import PipelineStoppedException
+
+
+class BoundedQueue(queue.Queue):
+    """Queue between two pipeline stages
+
+    put_item() blocks while maxsize items are queued, so a producer faster
+    than its consumer waits instead of filling up memory. Both put_item() and
+    get_item() give up with PipelineStoppedException once stop is set, a
+    failed stage never leaves the others blocked. The depth seen by the
+    consumer and the time the stages spent waiting are recorded
+    """
+
+    def __init__(self, name: str, maxsize: int, stop: threading.Event):
+        """
+        Constructor for BoundedQueue
+        """
+        super().__init__(maxsize)
+        self.name = name
+        self._stop = stop
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+        self.max_depth = 0
+        self._depth_sum = 0
+        self._gets = 0
+
+    def put_item(self, item):
+        """Put item, waiting for a free slot while the queue is full"""
+        start = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise PipelineStoppedException
+            try:
+                self.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        with self.mutex:
+            self.put_wait += time.perf_counter() - start
+
+    def get_item(self):
+        """Remove and return the next item, waiting while the queue is empty"""
+        return self.get_items(1)[0]
+
+    def get_items(self, max_items: int):
+        """Remove and return the next item, waiting while the queue is empty,
+        and the items queued behind it up to max_items, so a consumer that
+        falls behind processes the backlog in batches"""
+        start = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise PipelineStoppedException
+            try:
+                items = [self.get(timeout=0.1)]
+                break
+            except queue.Empty:
+                continue
+        with self.mutex:
+            depth = len(self.queue) + 1
+            self.get_wait += time.perf_counter() - start
+            self.max_depth = max(self.max_depth, depth)
+            self._depth_sum += depth
+            self._gets += 1
+        while len(items) < max_items:
+            try:
+                items.append(self.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def stats(self):
+        """Capacity, maximum and mean depth and the waiting times in seconds"""
+        return {'maxsize': self.maxsize, 'max_depth': self.max_depth,
+                'mean_depth': round(self._depth_sum / self._gets, 2) if self._gets else 0,
+                'put_wait_s': round(self.put_wait, 3), 'get_wait_s': round(self.get_wait, 3)}
+
+
+class StageTimer():
+    """Busy time and number of items of a pipeline stage, summed over the
+    threads of the stage"""
+
+    def __init__(self, name: str):
+        """
+        Constructor for StageTimer
+        """
+        self.name = name
+        self.seconds = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def time(self):
+        """Context manager adding the time of one item to the stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.seconds += time.perf_counter() - start
+                self.items += 1
+
+    def stats(self):
+        """Busy seconds and number of items"""
+        return {'busy_s': round(self.seconds, 3), 'items': self.items}
@@ -1,73 +1,582 @@
 """Connector and Methods to access AWS S3"""
 
+import io
 import os
 import logging
-from io import BytesIO, StringIO
+import collections
+import contextlib
+import hashlib
+import itertools
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 import pandas as pd
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import (ClientError, ConnectionError as BotoConnectionError,
+                                 HTTPClientError, IncompleteReadError, ResponseStreamingError)
 
-from xetra.common.constants import S3FileTypes
-from xetra.common.custom_exceptions import WrongFormatException
+from xetra.common.constants import S3PartitionFormat
+from xetra.common.metrics import METRICS
+from xetra.common.storage import StorageConnector, isin_bucket
 
 
+# error codes of S3 responses worth retrying, besides the 5xx status codes
+_TRANSIENT_ERROR_CODES = {'RequestTimeout', 'RequestTimeoutException', 'SlowDown', 'Throttling',
+                          'ThrottlingException', 'InternalError', 'ServiceUnavailable'}
 
-class S3BucketConnector():
+
+def is_transient_error(error: Exception):
+    """Whether the error of an S3 request may pass on a retry, connection and
+    read errors, throttling and server errors"""
+    if isinstance(error, ClientError):
+        response = error.response
+        return (response.get('Error', {}).get('Code') in _TRANSIENT_ERROR_CODES or
+                response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500)
+    return isinstance(error, (BotoConnectionError, HTTPClientError, IncompleteReadError,
+                              ResponseStreamingError, ConnectionError, TimeoutError))
+
+
+class _MemoryviewReader(io.RawIOBase):
+    """Seekable read-only file object over a memoryview, lets botocore upload
+    a slice of a buffer without copying the slice first"""
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = max(0, min(len(buffer), len(self._view) - self._pos))
+        buffer[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        start = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = start + offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+class S3ObjectCache():
+    """Local read-through cache of parsed S3 objects
+
+    Objects are stored as Parquet under cache_dir/bucket/key/etag-options.parquet,
+    so a changed object or different read options never return a stale entry.
+    The least recently used files are evicted when the cache exceeds max_size_mb,
+    down to CACHE_LOW_WATER of it, so the cache is walked only when it is full
+    """
+
+    CACHE_LOW_WATER = 0.9
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 1024):
+        """
+        Constructor for S3ObjectCache
+        """
+        self._logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 2**20
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # running size of the cache files, walked on the first put
+        self._size = None
+
+    def __reduce__(self):
+        """Pickle support for worker processes, the counters start from zero"""
+        return (S3ObjectCache, (self.cache_dir, self.max_size / 2**20))
+
+    def _path(self, bucket: str, key: str, etag: str, options: tuple):
+        """Path of the cache file of one object read with the given options"""
+        options_hash = hashlib.sha1(repr(options).encode('utf-8')).hexdigest()[:16]
+        etag = etag.strip('"')
+        return os.path.join(self.cache_dir, bucket, key, f'{etag}-{options_hash}.parquet')
+
+    def get(self, bucket: str, key: str, etag: str, options: tuple):
+        """Return the cached dataframe or None if the object is not cached"""
+        path = self._path(bucket, key, etag, options)
+        try:
+            dataframe = pd.read_parquet(path)
+            # the modification time is the recency used for the LRU eviction
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            self._logger.debug('Cache miss for %s/%s', bucket, key)
+            return None
+        with self._lock:
+            self.hits += 1
+        self._logger.debug('Cache hit for %s/%s', bucket, key)
+        return dataframe
+
+    def put(self, bucket: str, key: str, etag: str, options: tuple, dataframe: pd.DataFrame):
+        """Store the dataframe of an object and evict files above the size cap"""
+        path = self._path(bucket, key, etag, options)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        dataframe.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._files())
+            else:
+                with contextlib.suppress(FileNotFoundError):
+                    self._size += os.path.getsize(path)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _files(self):
+        """Modification time, size and path of the cache files, files removed
+        while walking are skipped"""
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith('.parquet'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict(self):
+        """Remove the least recently used files until the cache fits
+        CACHE_LOW_WATER of max_size, called with self._lock held
+
+        Worker processes share cache_dir, a file may be evicted by another
+        process meanwhile. The running size of this process misses the files
+        of the others, it is set to the size walked here
+        """
+        files = self._files()
+        cache_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if cache_size <= self.max_size * self.CACHE_LOW_WATER:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+                self._logger.debug('Evicted %s from the cache', path)
+            cache_size -= size
+        self._size = cache_size
+
+    def log_stats(self):
+        """Log the hit and miss counters"""
+        self._logger.info('S3 object cache %s: %s hits, %s misses',
+                          self.cache_dir, self.hits, self.misses)
+
+
+class S3ClientRegistry():
+    """Process wide registry of boto3 sessions and S3 resources
+
+    Connectors with the same endpoint and credentials share one session and
+    one resource, so the session setup and credential resolution happen once
+    and the source, target and meta connectors reuse the warm HTTP connection
+    pool of one thread safe client. The client configuration applies to the
+    resources created after S3ClientRegistry.configure(). A forked child
+    process, e.g. a worker of XetraETL.etl_report1_parallel(), starts with an
+    empty registry, so it never shares the connections of the parent
+    """
+
+    _resources = {}
+    _lock = threading.Lock()
+    _config = {'max_pool_connections': 50, 'tcp_keepalive': True,
+               'retry_mode': 'standard', 'max_attempts': 5}
+
+    @classmethod
+    def configure(cls, max_pool_connections: int = 50, tcp_keepalive: bool = True,
+                  retry_mode: str = 'standard', max_attempts: int = 5):
+        """Set the client configuration, max_pool_connections is the size of the
+        HTTP connection pool and should cover the concurrent readers and the
+        multipart workers, retry_mode is 'legacy', 'standard' or 'adaptive'"""
+        with cls._lock:
+            cls._config = {'max_pool_connections': max_pool_connections,
+                           'tcp_keepalive': tcp_keepalive,
+                           'retry_mode': retry_mode, 'max_attempts': max_attempts}
+
+    @classmethod
+    def get_resource(cls, access_key: str, secret_key: str, endpoint_url: str):
+        """Return the shared session and S3 resource of the endpoint and the
+        credentials in the access_key and secret_key environment variables"""
+        config = cls._config
+        key = (endpoint_url, os.environ[access_key], os.environ[secret_key],
+               tuple(sorted(config.items())))
+        with cls._lock:
+            if key not in cls._resources:
+                session = boto3.Session(aws_access_key_id=os.environ[access_key],
+                                        aws_secret_access_key=os.environ[secret_key])
+                resource = session.resource(
+                    service_name='s3', endpoint_url=endpoint_url, config=Config(
+                        max_pool_connections=config['max_pool_connections'],
+                        tcp_keepalive=config['tcp_keepalive'],
+                        retries={'mode': config['retry_mode'],
+                                 'max_attempts': config['max_attempts']}))
+                cls._resources[key] = (session, resource)
+            return cls._resources[key]
+
+    @classmethod
+    def clear(cls):
+        """Drop the shared sessions and resources"""
+        with cls._lock:
+            cls._resources.clear()
+
+    @classmethod
+    def _after_fork_in_child(cls):
+        """Drop the sessions and resources inherited from the parent process,
+        the lock may have been held by another thread of the parent"""
+        cls._lock = threading.Lock()
+        cls._resources = {}
+
+
+os.register_at_fork(after_in_child=S3ClientRegistry._after_fork_in_child)
+
+
+class S3BucketConnector(StorageConnector):
     """Class for interating with AWS S3"""
 
-    def __init__(self,access_key: str, secret_key: str, endpoint_url: str,bucket: str):
+    STAGE_PREFIX = 's3'
+
+    def __init__(self,access_key: str, secret_key: str, endpoint_url: str,bucket: str,
+                 cache: S3ObjectCache = None, multipart_chunksize: int = 8 * 2**20,
+                 multipart_workers: int = 4, max_retries: int = 3,
+                 retry_base_delay: float = 0.2, retry_max_delay: float = 10.0):
         """
         Constructor for S3BucketConnector
+
+        Objects larger than multipart_chunksize are uploaded in parts of that
+        size (S3 requires at least 5 MB) with multipart_workers parts in flight.
+        Reads and uploads of a file are retried max_retries times on transient
+        errors, waiting a random time up to retry_base_delay * 2 ** retry,
+        at most retry_max_delay seconds
         """
         self._logger = logging.getLogger(__name__)
+        self._access_key = access_key
+        self._secret_key = secret_key
         self.endpoint_url = endpoint_url
-        self.session = boto3.Session(aws_access_key_id = os.environ[access_key],
-                                     aws_secret_access_key = os.environ[secret_key])
-        self._s3 = self.session.resource(service_name='s3',endpoint_url=endpoint_url)
+        self.session, self._s3 = S3ClientRegistry.get_resource(access_key, secret_key,
+                                                               endpoint_url)
+        # low level client is thread safe and shared by the concurrent readers
+        # and the other connectors of the endpoint
+        self._client = self._s3.meta.client
+        self.exceptions = self._client.exceptions
         self._bucket = self._s3.Bucket(bucket)
+        self.bucket_name = bucket
+        self.cache = cache
+        self.multipart_chunksize = multipart_chunksize
+        self.multipart_workers = multipart_workers
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        # ETags seen while listing, they spare the HEAD request of cached reads
+        self._etags = {}
 
-    def list_files_in_prefix(self, prefix: str):
-        """
-        Get the list of files with the given prefix from the S3 
+    def __reduce__(self):
+        """Pickle support for worker processes, the session is created again from
+        the names of the access key environment variables"""
+        return (S3BucketConnector, (self._access_key, self._secret_key, self.endpoint_url,
+                                    self.bucket_name, self.cache, self.multipart_chunksize,
+                                    self.multipart_workers, self.max_retries,
+                                    self.retry_base_delay, self.retry_max_delay))
+
+    def _retry(self, func, *args, **kwargs):
+        """Call func and retry it on transient errors with exponential backoff
+        and full jitter
+
+        botocore retries failed requests itself, this also covers errors
+        while a response body is streamed into a parser and requests botocore
+        gave up on. func has to start over on each call
         """
-        files = [obj.key for obj in self._bucket.objects.filter(Prefix=prefix)]
-        return files
+        for retry in itertools.count():
+            try:
+                return func(*args, **kwargs)
+            except Exception as error:  # pylint: disable=broad-except
+                if retry >= self.max_retries or not is_transient_error(error):
+                    raise
+                delay = random.uniform(0, min(self.retry_max_delay,
+                                              self.retry_base_delay * 2 ** retry))
+                self._logger.warning('Transient error %r, retry %s of %s in %.2f s',
+                                     error, retry + 1, self.max_retries, delay)
+                with METRICS.stage('s3.retry'):
+                    time.sleep(delay)
+
+    def add_etags(self, etags: dict):
+        """Add ETags of objects known from elsewhere, e.g. a manifest, they
+        spare the HEAD request of cached reads as the ETags seen while listing"""
+        self._etags.update(etags)
 
+    def list_objects_in_prefix(self, prefix: str):
+        """Get the key, size and ETag of the objects with the given prefix"""
+        objects = []
+        for obj in self._bucket.objects.filter(Prefix=prefix):
+            self._etags[obj.key] = obj.e_tag
+            objects.append((obj.key, obj.size, obj.e_tag))
+        return objects
 
-    def read_csv_as_df(self,key: str, encoding: str = 'utf-8', sep: str = ','):
-        """ Read CSV file from S3 and return a dataframe"""
+
+    def read_csv_as_df(self,key: str, encoding: str = 'utf-8', sep: str = ',',
+                       chunksize: int = None, usecols: list = None, dtype: dict = None,
+                       engine: str = None):
+        """ Read CSV file from S3 and return a dataframe
+
+        The response body is streamed into the CSV parser without being
+        decoded to a string first. With chunksize an iterator of dataframes
+        with chunksize rows each is returned instead.
+        usecols restricts parsing to the given columns, dtype pins the column
+        types instead of inferring them and engine selects the pandas CSV
+        parser ('c', 'python' or 'pyarrow')
+        """
 
         self._logger.info('Reading file %s/%s/%s',self.endpoint_url,self._bucket.name, key)
-        csv_obj = self._bucket.Object(key=key).get().get('Body').read().decode(encoding)
-        data = StringIO(csv_obj)
-        dataframe = pd.read_csv(data,sep=sep)
+        with METRICS.stage('s3.read_csv_as_df') as record:
+            if self.cache is not None and chunksize is None:
+                dataframe = self._retry(self._read_csv_cached, key, encoding, sep, usecols, dtype,
+                                        engine, record)
+            else:
+                # with chunksize only opening the body is retried, chunks are read lazily
+                dataframe = self._retry(self._read_csv, key, encoding, sep, chunksize, usecols,
+                                        dtype, engine, record)
+            if chunksize is None:
+                record.rows = len(dataframe)
         return dataframe
 
+    def _read_csv(self, key: str, encoding: str, sep: str, chunksize: int, usecols: list,
+                  dtype: dict, engine: str, record):
+        """Helper function for self.read_csv_as_df() streaming the response
+        body into the parser, the bytes downloaded are set in record"""
+        response = self._client.get_object(Bucket=self._bucket.name, Key=key)
+        record.bytes = response['ContentLength']
+        return pd.read_csv(response.get('Body'), sep=sep, encoding=encoding, chunksize=chunksize,
+                           usecols=usecols, dtype=dtype, engine=engine)
 
+    def _read_csv_cached(self, key: str, encoding: str, sep: str, usecols: list,
+                         dtype: dict, engine: str, record):
+        """Helper function for self.read_csv_as_df() reading through self.cache,
+        the bytes downloaded on a miss are added to record"""
+        options = (encoding, sep, usecols, dtype, engine)
+        etag = self._etags.get(key)
+        if etag is None:
+            etag = self._client.head_object(Bucket=self._bucket.name, Key=key)['ETag']
+        dataframe = self.cache.get(self._bucket.name, key, etag, options)
+        if dataframe is not None:
+            return dataframe
+        response = self._client.get_object(Bucket=self._bucket.name, Key=key, IfMatch=etag)
+        record.bytes = response['ContentLength']
+        dataframe = pd.read_csv(response.get('Body'), sep=sep, encoding=encoding,
+                                usecols=usecols, dtype=dtype, engine=engine)
+        self.cache.put(self._bucket.name, key, etag, options, dataframe)
+        return dataframe
 
+    def read_parquet_as_df(self, key: str, columns: list = None):
+        """Read Parquet file from S3 and return a dataframe, only the given
+        columns if columns is set"""
+        self._logger.info('Reading file %s/%s/%s', self.endpoint_url, self._bucket.name, key)
+        with METRICS.stage('s3.read_parquet_as_df') as record:
+            body = self._retry(lambda: self._client.get_object(
+                Bucket=self._bucket.name, Key=key).get('Body').read())
+            table = pq.read_table(BytesIO(body), columns=columns)
+            record.bytes, record.rows = len(body), table.num_rows
+        return table.to_pandas()
 
-    def write_df_to_s3(self,dataframe:pd.DataFrame, key:str, file_format: str):
-        """Write the pandas dataframe to S3 supported format - csv, parquet"""
+    def read_range(self, key: str, start: int, end: int = None):
+        """Read the bytes start to end, inclusive, of the object key with a
+        ranged GET, the last -start bytes if start is negative
 
-        if dataframe.empty:
-            self._logger.info("The dataframe is empty. No file will be written to S3")
-            return None
+        Returns the bytes and the size of the whole object, so the first read
+        of the end of an object needs no HEAD request
+        """
+        byte_range = f'bytes={start}' if start < 0 else \
+            f'bytes={start}-{"" if end is None else end}'
+
+        def get_range():
+            response = self._client.get_object(Bucket=self._bucket.name, Key=key,
+                                               Range=byte_range)
+            return response, response['Body'].read()
 
-        if file_format == S3FileTypes.CSV.value:
-            out_buffer = StringIO()
-            dataframe.to_csv(out_buffer,index=False)
-            return self._put_object(out_buffer,key)
+        with METRICS.stage('s3.read_range') as record:
+            response, body = self._retry(get_range)
+            record.bytes = len(body)
+        # 'bytes 0-99/1234', without it the whole object was returned
+        content_range = response.get('ContentRange')
+        size = int(content_range.rsplit('/', 1)[1]) if content_range else len(body)
+        return body, size
 
-        if file_format == S3FileTypes.PARQUET.value:
-            out_buffer = BytesIO()
-            dataframe.to_parquet(out_buffer,index=False)
-            return self._put_object(out_buffer,key)
-        self._logger.info('The file format %s is not supported to be written to s3!', file_format)
-        raise WrongFormatException
+    def read_csv_as_table(self, key: str, columns: list = None, column_types: dict = None):
+        """Read CSV file from S3 and return a pyarrow Table
 
+        The response body is streamed into the Arrow CSV reader, no pandas
+        objects are created. columns restricts parsing to the given columns and
+        column_types pins their Arrow types instead of inferring them, e.g. a
+        dictionary type for repeated strings or date32 and time32 for dates and
+        times
+        """
+        self._logger.info('Reading file %s/%s/%s', self.endpoint_url, self._bucket.name, key)
+        with METRICS.stage('s3.read_csv_as_table') as record:
+            table = self._retry(self._read_csv_table, key, columns, column_types, record)
+            record.rows = table.num_rows
+        return table
 
-    def _put_object(self, out_buffer: StringIO or BytesIO, key:str):
-        """Helper function for self.write_df_to_s3()"""
+    def _read_csv_table(self, key: str, columns: list, column_types: dict, record):
+        """Helper function for self.read_csv_as_table() streaming the response
+        body into the Arrow CSV reader, the bytes downloaded are set in record"""
+        response = self._client.get_object(Bucket=self._bucket.name, Key=key)
+        record.bytes = response['ContentLength']
+        return pcsv.read_csv(response.get('Body'), convert_options=pcsv.ConvertOptions(
+            include_columns=columns, column_types=column_types))
+
+    def list_partitions(self, key_prefix: str, start_date: str, end_date: str,
+                        isin_buckets: set = None):
+        """
+        Get the keys of the partitioned Parquet objects under key_prefix with a
+        date between start_date and end_date and optionally in isin_buckets
+
+        The listing starts at the start_date partition and stops after end_date
+        """
+        date_prefix = f'{key_prefix}{S3PartitionFormat.PARTITION_DATE.value}='
+        keys = []
+        for obj in self._bucket.objects.filter(Prefix=key_prefix,
+                                               Marker=f'{date_prefix}{start_date}'):
+            partitions = dict(part.split('=', 1) for part in
+                              obj.key[len(key_prefix):].split('/')[:-1] if '=' in part)
+            date = partitions.get(S3PartitionFormat.PARTITION_DATE.value)
+            if date is None or date < start_date:
+                continue
+            if date > end_date:
+                break
+            bucket = partitions.get(S3PartitionFormat.PARTITION_ISIN_BUCKET.value)
+            if isin_buckets is not None and bucket is not None and int(bucket) not in isin_buckets:
+                continue
+            keys.append(obj.key)
+        return keys
+
+    def read_parquet_partitioned(self, key_prefix: str, start_date: str, end_date: str,
+                                 isin_col: str = None, isins: list = None,
+                                 isin_buckets: int = 0, columns: list = None,
+                                 max_workers: int = 8):
+        """Read the partitioned Parquet objects written by
+        self.write_df_to_s3_partitioned() for a date range and optionally a list
+        of ISINs to one dataframe
+
+        Only the objects of matching date and ISIN bucket partitions are fetched,
+        within an object the row group statistics skip row groups without the ISINs
+        """
+        buckets = None
+        if isins is not None and isin_buckets:
+            buckets = set(isin_bucket(pd.Series(isins), isin_buckets))
+        keys = self.list_partitions(key_prefix, start_date, end_date, buckets)
+        filters = [(isin_col, 'in', list(isins))] if isins is not None else None
+
+        def read_key(key):
+            self._logger.info('Reading file %s/%s/%s', self.endpoint_url, self._bucket.name, key)
+            with METRICS.stage('s3.read_parquet_partitioned') as record:
+                body = self._client.get_object(Bucket=self._bucket.name,
+                                               Key=key).get('Body').read()
+                table = pq.read_table(BytesIO(body), columns=columns, filters=filters)
+                record.bytes, record.rows = len(body), table.num_rows
+            return table.to_pandas()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(lambda key: self._retry(read_key, key), keys))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def delete_objects(self, keys: list):
+        """Delete the given keys from S3"""
+        # delete_objects accepts at most 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            self._logger.info('Deleting %s files from %s/%s',
+                              len(batch), self.endpoint_url, self._bucket.name)
+            self._bucket.delete_objects(Delete={'Objects': [{'Key': key} for key in batch]})
+        return True
+
+    def _put_object(self, out_buffer: BytesIO, key:str):
+        """Helper function for self.write_df_to_s3()
+
+        The buffer is uploaded from memoryview slices without copying it,
+        as multipart upload if it is larger than multipart_chunksize
+        """
         self._logger.info('Writing file to %s/%s/%s', self.endpoint_url, self._bucket.name, key)
-        self._bucket.put_object(Body=out_buffer.getvalue(), Key=key)
+        view = out_buffer.getbuffer()
+        if len(view) <= self.multipart_chunksize:
+            # a new reader per attempt, the body is read from its start again
+            self._retry(lambda: self._client.put_object(Bucket=self._bucket.name, Key=key,
+                                                        Body=_MemoryviewReader(view)))
+            return True
+        parts = (view[start:start + self.multipart_chunksize]
+                 for start in range(0, len(view), self.multipart_chunksize))
+        return self._upload_parts(parts, key)
+
+    def upload_chunks(self, chunks, key: str):
+        """Upload an iterable of bytes-like chunks to S3 as one object
+
+        Chunks are combined to parts of multipart_chunksize, the chunks are
+        not held in memory beyond the parts in flight
+        """
+        self._logger.info('Writing file to %s/%s/%s', self.endpoint_url, self._bucket.name, key)
+        return self._upload_parts(self._iter_parts(chunks), key)
+
+    def _iter_parts(self, chunks):
+        """Helper function for self.upload_chunks() combining chunks to parts"""
+        part = bytearray()
+        for chunk in chunks:
+            if not part and len(chunk) >= self.multipart_chunksize:
+                yield memoryview(chunk)
+                continue
+            part += chunk
+            if len(part) >= self.multipart_chunksize:
+                yield memoryview(part)
+                part = bytearray()
+        if part:
+            yield memoryview(part)
+
+    def _upload_part(self, key: str, upload_id: str, part_number: int, part: memoryview):
+        """Helper function for self._upload_parts() uploading one part"""
+        response = self._retry(lambda: self._client.upload_part(
+            Bucket=self._bucket.name, Key=key, UploadId=upload_id, PartNumber=part_number,
+            Body=_MemoryviewReader(part)))
+        return {'ETag': response['ETag'], 'PartNumber': part_number}
+
+    def _upload_parts(self, parts, key: str):
+        """Multipart upload of the parts with at most multipart_workers parts
+        in flight, the upload is aborted if a part fails"""
+        upload_id = self._client.create_multipart_upload(
+            Bucket=self._bucket.name, Key=key)['UploadId']
+        completed = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.multipart_workers) as executor:
+                pending = collections.deque()
+                for part_number, part in enumerate(parts, start=1):
+                    pending.append(executor.submit(self._upload_part, key, upload_id,
+                                                   part_number, part))
+                    if len(pending) >= self.multipart_workers:
+                        completed.append(pending.popleft().result())
+                while pending:
+                    completed.append(pending.popleft().result())
+            if not completed:
+                # a multipart upload needs at least one part
+                completed.append(self._upload_part(key, upload_id, 1, memoryview(b'')))
+            self._client.complete_multipart_upload(Bucket=self._bucket.name, Key=key,
+                                                   UploadId=upload_id,
+                                                   MultipartUpload={'Parts': completed})
+        except Exception:
+            self._logger.info('Aborting the upload of %s/%s/%s',
+                              self.endpoint_url, self._bucket.name, key)
+            self._client.abort_multipart_upload(Bucket=self._bucket.name, Key=key,
+                                                UploadId=upload_id)
+            raise
         return True
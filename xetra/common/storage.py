@@ -0,0 +1,254 @@
+"""Storage interface of the connectors the ETL job reads and writes through"""
+
+import abc
+import collections
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+from xetra.common.constants import S3FileTypes, S3PartitionFormat
+from xetra.common.custom_exceptions import NoSuchKeyException, WrongFormatException
+from xetra.common.metrics import METRICS
+
+
+def isin_bucket(isins: pd.Series, buckets: int):
+    """Stable hash bucket (crc32 modulo buckets) of each ISIN, hashed once per distinct ISIN"""
+    codes, uniques = pd.factorize(isins)
+    bucket_of_unique = np.array([zlib.crc32(str(isin).encode('utf-8')) % buckets
+                                 for isin in uniques], dtype='int64')
+    return pd.Series(bucket_of_unique[codes], index=isins.index)
+
+
+def concat_frames(frames: list):
+    """Concatenate the dataframes of files read with the same options, an
+    empty dataframe without frames"""
+    if not frames:
+        return pd.DataFrame()
+    dataframe = pd.concat(frames, ignore_index=True)
+    # concat falls back to object dtype for categoricals with different categories
+    for col in frames[0].select_dtypes('category').columns:
+        dataframe[col] = union_categoricals([frame[col] for frame in frames])
+    return dataframe
+
+
+class StorageExceptions():
+    """Exceptions of a storage backend, as the exceptions attribute of the
+    boto3 client of S3BucketConnector"""
+
+    NoSuchKey = NoSuchKeyException
+
+
+class StorageConnector(abc.ABC):
+    """Interface of a bucket of objects addressed by keys
+
+    Backends implement listing, the reads of single objects and the upload of
+    a written buffer. The concurrent reads and the CSV and Parquet writers
+    are shared, so MetaProcess and XetraETL run against any backend. Reads of
+    a missing key raise exceptions.NoSuchKey of the backend, metrics stages
+    are named STAGE_PREFIX.method. Backends set bucket_name, endpoint_url and
+    _logger
+    """
+
+    STAGE_PREFIX = 'storage'
+    exceptions = StorageExceptions
+
+    @abc.abstractmethod
+    def list_objects_in_prefix(self, prefix: str):
+        """Get the key, size and ETag of the objects with the given prefix, in
+        the order of their keys"""
+
+    @abc.abstractmethod
+    def read_csv_as_df(self, key: str, encoding: str = 'utf-8', sep: str = ',',
+                       chunksize: int = None, usecols: list = None, dtype: dict = None,
+                       engine: str = None):
+        """Read CSV file and return a dataframe, an iterator of dataframes
+        with chunksize rows each with chunksize"""
+
+    @abc.abstractmethod
+    def read_csv_as_table(self, key: str, columns: list = None, column_types: dict = None):
+        """Read CSV file and return a pyarrow Table"""
+
+    @abc.abstractmethod
+    def read_parquet_as_df(self, key: str, columns: list = None):
+        """Read Parquet file and return a dataframe, only the given columns if
+        columns is set"""
+
+    @abc.abstractmethod
+    def read_range(self, key: str, start: int, end: int = None):
+        """Read the bytes start to end, inclusive, of the object key, the last
+        -start bytes if start is negative, and return them with the size of
+        the whole object"""
+
+    @abc.abstractmethod
+    def delete_objects(self, keys: list):
+        """Delete the given keys"""
+
+    @abc.abstractmethod
+    def _put_object(self, out_buffer: BytesIO, key: str):
+        """Store the content of out_buffer as the object key"""
+
+    def list_files_in_prefix(self, prefix: str):
+        """
+        Get the list of files with the given prefix
+        """
+        return [key for key, _, _ in self.list_objects_in_prefix(prefix)]
+
+    def add_etags(self, etags: dict):
+        """Add ETags of objects known from elsewhere, e.g. a manifest, backends
+        without use for them ignore them"""
+
+    def iter_reads(self, read, keys: list, max_workers: int = 8, **kwargs):
+        """Call read(key, **kwargs) for each key on a bounded thread pool
+        sharing one client, at most 2 * max_workers reads are in flight at a
+        time and the results are yielded in the order of keys
+
+        read may be any function of a key, e.g. a read of this connector
+        followed by a check of the result
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = collections.deque()
+            for key in keys:
+                pending.append(executor.submit(read, key, **kwargs))
+                if len(pending) >= 2 * max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def iter_csv_as_df(self, keys: list, max_workers: int = 8, **kwargs):
+        """
+        Read CSV files concurrently and yield one dataframe per key
+
+        The files are read by a bounded thread pool sharing one client,
+        at most 2 * max_workers reads are in flight at a time and the
+        dataframes are yielded in the order of keys
+        """
+        yield from self.iter_reads(self.read_csv_as_df, keys, max_workers, **kwargs)
+
+    def iter_csv_as_table(self, keys: list, max_workers: int = 8, **kwargs):
+        """Read CSV files concurrently as self.iter_csv_as_df() does and yield
+        one pyarrow Table per key"""
+        yield from self.iter_reads(self.read_csv_as_table, keys, max_workers, **kwargs)
+
+    def read_many_csv_as_table(self, keys: list, max_workers: int = 8, **kwargs):
+        """
+        Read CSV files concurrently and return one pyarrow Table concatenated
+        in the order of keys
+
+        The files need the same schema, so column_types should pin the types
+        of all columns. Dictionary columns are unified to one dictionary
+        without copying the other columns. Without keys an empty Table is
+        returned
+        """
+        tables = list(self.iter_csv_as_table(keys, max_workers, **kwargs))
+        if not tables:
+            return pa.table({})
+        return pa.concat_tables(tables).unify_dictionaries()
+
+    def read_many_csv_as_df(self, keys: list, max_workers: int = 8, **kwargs):
+        """
+        Read CSV files concurrently and return one dataframe concatenated in
+        the order of keys
+        """
+        return concat_frames(list(self.iter_csv_as_df(keys, max_workers, **kwargs)))
+
+    def write_bytes_to_s3(self, body: bytes, key: str):
+        """Write the bytes body as the object key unchanged"""
+        with METRICS.stage(f'{self.STAGE_PREFIX}.write_bytes_to_s3') as record:
+            record.bytes = len(body)
+            return self._put_object(BytesIO(body), key)
+
+    def write_df_to_s3(self,dataframe:pd.DataFrame, key:str, file_format: str,
+                       row_group_size: int = None):
+        """Write the pandas dataframe to S3 supported format - csv, parquet,
+        Parquet in row groups of row_group_size rows if it is set"""
+
+        if dataframe.empty:
+            self._logger.info("The dataframe is empty. No file will be written to S3")
+            return None
+
+        if file_format not in (S3FileTypes.CSV.value, S3FileTypes.PARQUET.value):
+            self._logger.info('The file format %s is not supported to be written to s3!',
+                              file_format)
+            raise WrongFormatException
+        with METRICS.stage(f'{self.STAGE_PREFIX}.write_df_to_s3') as record:
+            out_buffer = BytesIO()
+            if file_format == S3FileTypes.CSV.value:
+                dataframe.to_csv(out_buffer,index=False,encoding='utf-8')
+            else:
+                dataframe.to_parquet(out_buffer,index=False, row_group_size=row_group_size)
+            record.bytes, record.rows = out_buffer.getbuffer().nbytes, len(dataframe)
+            return self._put_object(out_buffer,key)
+
+    def write_table_to_s3(self, table: pa.Table, key: str, file_format: str,
+                          row_group_size: int = None):
+        """Write the pyarrow Table to S3 supported format - csv, parquet, the
+        file is written from the Arrow buffers without converting to pandas,
+        Parquet in row groups of row_group_size rows if it is set"""
+
+        if table.num_rows == 0:
+            self._logger.info("The table is empty. No file will be written to S3")
+            return None
+
+        if file_format not in (S3FileTypes.CSV.value, S3FileTypes.PARQUET.value):
+            self._logger.info('The file format %s is not supported to be written to s3!',
+                              file_format)
+            raise WrongFormatException
+        with METRICS.stage(f'{self.STAGE_PREFIX}.write_table_to_s3') as record:
+            out_buffer = BytesIO()
+            if file_format == S3FileTypes.CSV.value:
+                pcsv.write_csv(table, out_buffer)
+            else:
+                pq.write_table(table, out_buffer, row_group_size=row_group_size)
+            record.bytes, record.rows = out_buffer.getbuffer().nbytes, table.num_rows
+            return self._put_object(out_buffer, key)
+
+    def write_df_to_s3_partitioned(self, dataframe: pd.DataFrame, key_prefix: str,
+                                   date_col: str, isin_col: str = None, isin_buckets: int = 0,
+                                   row_group_size: int = 10000):
+        """Write the pandas dataframe as Parquet partitioned by date and
+        optionally by ISIN hash bucket
+
+        Keys are key_prefix/date=YYYY-MM-DD[/isin_bucket=NNN]/data.parquet. The
+        rows of each object are sorted by ISIN and written in row groups of
+        row_group_size rows with dictionary encoding and column statistics, so
+        readers can skip partitions and row groups
+        """
+        if dataframe.empty:
+            self._logger.info("The dataframe is empty. No file will be written to S3")
+            return None
+        partition_cols = [date_col]
+        if isin_buckets:
+            dataframe = dataframe.assign(**{
+                S3PartitionFormat.PARTITION_ISIN_BUCKET.value:
+                    isin_bucket(dataframe[isin_col], isin_buckets)})
+            partition_cols.append(S3PartitionFormat.PARTITION_ISIN_BUCKET.value)
+        with METRICS.stage(f'{self.STAGE_PREFIX}.write_df_to_s3_partitioned') as record:
+            record.rows = len(dataframe)
+            record.bytes = self._write_partitions(dataframe, key_prefix, partition_cols,
+                                                  isin_col, isin_buckets, row_group_size)
+        return True
+
+    def _write_partitions(self, dataframe: pd.DataFrame, key_prefix: str, partition_cols: list,
+                          isin_col: str, isin_buckets: int, row_group_size: int):
+        """Helper function for self.write_df_to_s3_partitioned() writing one
+        object per partition, returns the bytes written"""
+        written = 0
+        for values, partition in dataframe.groupby(partition_cols, observed=True, sort=True):
+            key = f'{key_prefix}{S3PartitionFormat.PARTITION_DATE.value}={values[0]}/'
+            if isin_buckets:
+                key += f'{S3PartitionFormat.PARTITION_ISIN_BUCKET.value}={values[1]:03d}/'
+                partition = partition.drop(columns=S3PartitionFormat.PARTITION_ISIN_BUCKET.value)
+            if isin_col is not None:
+                partition = partition.sort_values(by=isin_col)
+            out_buffer = BytesIO()
+            partition.to_parquet(out_buffer, index=False, row_group_size=row_group_size,
+                                 use_dictionary=True, write_statistics=True)
+            written += out_buffer.getbuffer().nbytes
+            self._put_object(out_buffer, f'{key}{S3PartitionFormat.PARTITION_FILE_NAME.value}')
+        return written
@@ -0,0 +1,232 @@
+"""
+Query API over the report objects
+
+The loads of XetraETL write a sidecar index next to each report object, the
+object key and row group of each ISIN and date. ReportQuery answers lookups of
+a few ISINs over a date range from the index, fetching only the row groups
+holding them with ranged GETs
+"""
+import collections
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from xetra.common.constants import ReportIndexFormat
+from xetra.common.metrics import METRICS
+from xetra.common.s3 import S3BucketConnector
+
+
+def index_key(index_prefix: str, report_key: str):
+    """Key of the sidecar index of the report object report_key"""
+    return f'{index_prefix}{posixpath.basename(report_key)}'
+
+
+def build_index(isins: pd.Series, dates: pd.Series, report_key: str, row_group_size: int):
+    """Sidecar index of a report object written in row groups of
+    row_group_size rows, isins and dates are the ISIN and date of each row in
+    the order of the object"""
+    return pd.DataFrame({
+        ReportIndexFormat.INDEX_ISIN_COL.value: pd.Categorical(isins.astype(str).to_numpy()),
+        ReportIndexFormat.INDEX_DATE_COL.value: dates.astype(str).to_numpy(),
+        ReportIndexFormat.INDEX_KEY_COL.value: pd.Categorical([report_key] * len(isins)),
+        ReportIndexFormat.INDEX_ROW_GROUP_COL.value:
+            (np.arange(len(isins)) // row_group_size).astype(np.int32)})
+
+
+class _S3RangeReader(io.RawIOBase):
+    """Seekable read-only file object over an S3 object, every read is a
+    ranged GET
+
+    Unless given the tail of an earlier reader, the first GET fetches the
+    last tail_bytes with the Parquet footer and the size of the object. Reads
+    within the tail need no request
+    """
+
+    def __init__(self, s3_bucket: S3BucketConnector, key: str, tail: bytes = None,
+                 size: int = None, tail_bytes: int = ReportIndexFormat.INDEX_TAIL_BYTES.value):
+        super().__init__()
+        self._s3_bucket = s3_bucket
+        self._key = key
+        if tail is None:
+            tail, size = s3_bucket.read_range(key, -tail_bytes)
+        self._tail = tail
+        self._size = size
+        self._tail_start = size - len(self._tail)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = max(0, min(len(buffer), self._size - self._pos))
+        if size == 0:
+            return 0
+        if self._pos >= self._tail_start:
+            start = self._pos - self._tail_start
+            data = self._tail[start:start + size]
+        else:
+            data, _ = self._s3_bucket.read_range(self._key, self._pos, self._pos + size - 1)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = base + offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    @property
+    def tail(self):
+        """The tail and the size of the S3 object"""
+        return self._tail, self._size
+
+
+class ReportQuery():
+    """Lookups of report rows of ISINs over a date range from the sidecar
+    index under index_prefix
+
+    The index objects are read on the first query. Decoded row groups are kept
+    in an LRU cache of cache_row_groups row groups and the footers of the
+    report objects once read, so repeated queries need no request
+    """
+
+    def __init__(self, s3_bucket_trg: S3BucketConnector, index_prefix: str,
+                 isin_col: str, date_col: str,
+                 cache_row_groups: int = ReportIndexFormat.INDEX_CACHE_ROW_GROUPS.value,
+                 max_workers: int = 8,
+                 tail_bytes: int = ReportIndexFormat.INDEX_TAIL_BYTES.value):
+        """
+        Constructor for ReportQuery
+
+        :param isin_col: column of the ISIN in the report objects
+        :param date_col: column of the date in the report objects
+        :param tail_bytes: bytes fetched from the end of a report object for
+        its footer, objects up to this size are fetched with one GET
+        """
+        self._logger = logging.getLogger(__name__)
+        self.s3_bucket_trg = s3_bucket_trg
+        self.index_prefix = index_prefix
+        self.isin_col = isin_col
+        self.date_col = date_col
+        self.cache_row_groups = cache_row_groups
+        self.max_workers = max_workers
+        self.tail_bytes = tail_bytes
+        self._index = None
+        # footer metadata, tail and size per report object
+        self._files = {}
+        self._row_groups = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def refresh(self):
+        """Drop the index read so far, the next query reads the index objects
+        written since"""
+        self._index = None
+
+    def _read_index(self):
+        """Read all index objects to one dataframe, the first time only"""
+        if self._index is None:
+            keys = sorted(self.s3_bucket_trg.list_files_in_prefix(self.index_prefix))
+            frames = [self.s3_bucket_trg.read_parquet_as_df(key) for key in keys]
+            if frames:
+                # the report keys are named by load time, a day loaded again
+                # is taken from the last load
+                self._index = pd.concat(frames, ignore_index=True).drop_duplicates(
+                    subset=[ReportIndexFormat.INDEX_ISIN_COL.value,
+                            ReportIndexFormat.INDEX_DATE_COL.value], keep='last')
+            else:
+                self._index = pd.DataFrame(columns=[
+                    ReportIndexFormat.INDEX_ISIN_COL.value, ReportIndexFormat.INDEX_DATE_COL.value,
+                    ReportIndexFormat.INDEX_KEY_COL.value,
+                    ReportIndexFormat.INDEX_ROW_GROUP_COL.value])
+            self._logger.info('Report index of %s rows read from %s objects.',
+                              len(self._index), len(keys))
+        return self._index
+
+    def _read_footer(self, key: str):
+        """Fetch the footer metadata, the tail and the size of the report
+        object key, once per object"""
+        if key not in self._files:
+            reader = _S3RangeReader(self.s3_bucket_trg, key, tail_bytes=self.tail_bytes)
+            self._files[key] = (pq.ParquetFile(reader).metadata, *reader.tail)
+        return self._files[key]
+
+    def _read_row_group(self, key: str, row_group: int):
+        """Fetch and decode one row group of the report object key with
+        ranged GETs, a small object is read from its tail"""
+        metadata, tail, size = self._read_footer(key)
+        # pre_buffer coalesces the column chunks of the row group to few GETs
+        return pq.ParquetFile(_S3RangeReader(self.s3_bucket_trg, key, tail, size),
+                              metadata=metadata, pre_buffer=True).read_row_group(row_group)
+
+    def _row_group(self, key: str, row_group: int):
+        """One decoded row group from the LRU cache, fetched on a miss"""
+        cache_key = (key, row_group)
+        with self._lock:
+            if cache_key in self._row_groups:
+                self._row_groups.move_to_end(cache_key)
+                self.hits += 1
+                return self._row_groups[cache_key]
+            self.misses += 1
+        table = self._read_row_group(key, row_group)
+        with self._lock:
+            self._row_groups[cache_key] = table
+            while len(self._row_groups) > self.cache_row_groups:
+                self._row_groups.popitem(last=False)
+        return table
+
+    def _select(self, table: pa.Table, rows: pd.DataFrame):
+        """Rows of a row group with the ISIN and date of an index row in rows,
+        with ISIN and date as strings whichever way the report object was written"""
+        for col in (self.isin_col, self.date_col):
+            table = table.set_column(table.schema.get_field_index(col), col,
+                                     table[col].cast(pa.string()))
+        # rows of a day loaded again are only taken from the object of the index row
+        wanted = (rows[ReportIndexFormat.INDEX_ISIN_COL.value].astype(str) + '|' +
+                  rows[ReportIndexFormat.INDEX_DATE_COL.value].astype(str))
+        return table.filter(pc.is_in(
+            pc.binary_join_element_wise(table[self.isin_col], table[self.date_col], '|'),
+            value_set=pa.array(wanted.to_numpy(), pa.string())))
+
+    @METRICS.timed('query.get_report')
+    def get_report(self, isins: list, start_date: str, end_date: str):
+        """Report rows of isins between start_date and end_date, inclusive, as
+        pandas dataframe ordered by ISIN and date
+
+        Only the row groups holding the rows according to the index are
+        fetched, concurrently with max_workers threads
+        """
+        key_col = ReportIndexFormat.INDEX_KEY_COL.value
+        row_group_col = ReportIndexFormat.INDEX_ROW_GROUP_COL.value
+        index = self._read_index()
+        rows = index[index[ReportIndexFormat.INDEX_ISIN_COL.value].isin(
+            [str(isin) for isin in isins]) &
+                     index[ReportIndexFormat.INDEX_DATE_COL.value].between(start_date, end_date)]
+        if rows.empty:
+            return pd.DataFrame()
+        groups = [(str(key), int(row_group), group_rows) for (key, row_group), group_rows
+                  in rows.groupby([key_col, row_group_col], observed=True, sort=True)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # the footers first, so the row groups of one object share one
+            list(executor.map(self._read_footer, {key for key, _, _ in groups}))
+            tables = list(executor.map(self._row_group, [key for key, _, _ in groups],
+                                       [row_group for _, row_group, _ in groups]))
+        table = pa.concat_tables([self._select(table, group_rows) for table, (_, _, group_rows)
+                                  in zip(tables, groups)], promote_options='permissive')
+        return table.to_pandas().sort_values(by=[self.isin_col, self.date_col],
+                                             ignore_index=True)
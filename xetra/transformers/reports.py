@@ -0,0 +1,112 @@
+""" Registry of the Xetra reports computed from one extract """
+
+import logging
+
+import pandas as pd
+
+from xetra.common.s3 import S3BucketConnector
+from xetra.common.config import XetraSourceConfig
+from xetra.common.custom_exceptions import WrongConfigException
+from xetra.common.metrics import METRICS
+from xetra.transformers.xetra_transformer import XetraETL
+
+# transform kernels by report name, a kernel takes the XetraETL of the report
+# and the extracted source rows and returns the report rows
+REPORT_KERNELS = {}
+
+
+def register_report(name: str):
+    """Decorator registering a transform kernel as report name
+
+    The kernel must not modify the source dataframe, it is shared by all
+    reports of the run. Its rows are filtered to the days of meta_update_list
+    of the XetraETL of the report
+    """
+    def register(kernel):
+        REPORT_KERNELS[name] = kernel
+        return kernel
+    return register
+
+
+register_report('report1')(XetraETL.transform_report1)
+
+
+@register_report('vwap')
+@METRICS.timed('etl.transform_vwap')
+def transform_vwap(xetra_etl: XetraETL, data_frame: pd.DataFrame):
+    """Volume weighted average price and traded volume per ISIN and day
+
+    The source rows are minute bars, the mid of their minimum and maximum
+    price is taken as the price of the volume traded in the minute
+    """
+    src, trg = xetra_etl.src_args, xetra_etl.trg_args
+    if data_frame.empty:
+        return data_frame
+    data_frame = data_frame.dropna(subset=[src.src_col_isin, src.src_col_date,
+                                           src.src_col_min_price, src.src_col_max_price,
+                                           src.src_col_traded_vol])
+    data_frame = data_frame[data_frame[src.src_col_date].isin(xetra_etl.meta_update_list)]
+    volume = data_frame[src.src_col_traded_vol]
+    report = pd.DataFrame({
+        trg.trg_col_isin: data_frame[src.src_col_isin],
+        trg.trg_col_date: data_frame[src.src_col_date],
+        trg.trg_col_vwap: (data_frame[src.src_col_min_price]
+                           + data_frame[src.src_col_max_price]) / 2 * volume,
+        trg.trg_col_daily_traded_vol: volume
+    }).groupby([trg.trg_col_isin, trg.trg_col_date], observed=True, sort=True).sum().reset_index()
+    # a day without traded volume has no average price
+    report[trg.trg_col_vwap] = (report[trg.trg_col_vwap]
+                                / report[trg.trg_col_daily_traded_vol].where(
+                                    report[trg.trg_col_daily_traded_vol] != 0)).round(2)
+    return report
+
+
+class XetraReportsETL():
+    """Reads the source files once and computes the registered reports from
+    them, each loaded to its own target key and meta file"""
+
+    def __init__(self, s3_bucket_src: S3BucketConnector, s3_bucket_trg: S3BucketConnector,
+                 src_args: XetraSourceConfig, reports: list):
+        """
+        Constructor for XetraReportsETL
+
+        :param reports: ReportConfig of each report, with the name of a
+        registered kernel, the meta key and the target configuration
+        """
+        self._logger = logging.getLogger(__name__)
+        unknown = [report.name for report in reports if report.name not in REPORT_KERNELS]
+        if unknown:
+            raise WrongConfigException(f'Unknown reports {unknown}, registered are '
+                                       f'{sorted(REPORT_KERNELS)}')
+        rollups = [report.name for report in reports if report.target.trg_rollup_key]
+        if rollups:
+            raise WrongConfigException(f'The rollups of trg_rollup_key are not written for the '
+                                       f'reports {rollups}, only by etl_report1')
+        self.src_args = src_args
+        # the days to process and to extract are planned per report, from its meta file
+        self.reports = [(report.name, XetraETL(s3_bucket_src, s3_bucket_trg, report.meta_key,
+                                               src_args, report.target))
+                        for report in reports]
+        self.extract_date_list = sorted(set().union(
+            *(xetra_etl.extract_date_list for _, xetra_etl in self.reports)))
+
+    def extract(self):
+        """Read the source files of the days of all reports to one pandas dataframe"""
+        if not self.reports:
+            return pd.DataFrame()
+        # the reports share the source configuration, any of them can read the files
+        return self.reports[0][1].extract(self.extract_date_list)
+
+    @METRICS.timed('etl.etl_reports')
+    def etl_reports(self):
+        """Extract the source files once, then transform and load each report"""
+        data_frame = self.extract()
+        for name, xetra_etl in self.reports:
+            report_frame = data_frame
+            if not data_frame.empty and xetra_etl.extract_date_list != self.extract_date_list:
+                # the look-back days of a report are the ones it planned
+                report_frame = data_frame[data_frame[self.src_args.src_col_date].isin(
+                    xetra_etl.extract_date_list)]
+            self._logger.info('Computing report %s to %s.', name, xetra_etl.trg_args.trg_key)
+            xetra_etl.load(REPORT_KERNELS[name](xetra_etl, report_frame))
+        return True
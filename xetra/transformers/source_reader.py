@@ -0,0 +1,145 @@
+"""Reads of the Xetra source files with the optional checks and quarantine"""
+
+import logging
+
+import numpy as np
+import pyarrow as pa
+
+from xetra.common.config import XetraSourceConfig
+from xetra.common.metrics import METRICS
+from xetra.common.storage import StorageConnector, concat_frames
+from xetra.transformers.validation import SourceValidator
+
+
+class SourceReader():
+    """Reads the source files of the source bucket as pandas dataframes or
+    pyarrow Tables
+
+    With src_validate each file is checked by SourceValidator and a failing
+    one is copied to src_quarantine_prefix in the target bucket and left out.
+    It holds only the connectors and the source configuration, so it is
+    cheap to send to a worker process
+    """
+
+    def __init__(self, s3_bucket_src: StorageConnector, s3_bucket_trg: StorageConnector,
+                 src_args: XetraSourceConfig):
+        """
+        Constructor for SourceReader
+        """
+        self._logger = logging.getLogger(__name__)
+        self.s3_bucket_src = s3_bucket_src
+        self.s3_bucket_trg = s3_bucket_trg
+        self.src_args = src_args
+        self.validator = SourceValidator(src_args)
+        # source files failing the checks of src_validate and the reason
+        self.quarantined = []
+
+    def dtypes(self):
+        """Explicit dtypes of the source columns, ISIN as category, prices as
+        src_price_dtype and date and time as strings, other columns are inferred
+
+        The pyarrow engine would parse the date and time to datetime.date and
+        datetime.time, the report days are matched as strings. It keeps the
+        seconds of the time, HH:MM:SS sorts as HH:MM does
+        """
+        src = self.src_args
+        dtypes = {src.src_col_isin: 'category', src.src_col_date: 'str',
+                  src.src_col_time: 'str'}
+        for col in (src.src_col_start_price, src.src_col_min_price, src.src_col_max_price):
+            dtypes[col] = src.src_price_dtype
+        return {col: dtype for col, dtype in dtypes.items() if col in src.src_columns}
+
+    def read_kwargs(self):
+        """Keyword arguments of the source file reads, parsing only the columns
+        in src_columns"""
+        return {'usecols': self.src_args.src_columns, 'dtype': self.dtypes(),
+                'engine': self.src_args.src_engine}
+
+    def arrow_types(self):
+        """Arrow types of the source columns of report 1, ISIN dictionary
+        encoded, date and time as date32 and time32 and prices as
+        src_price_dtype"""
+        src = self.src_args
+        price = pa.from_numpy_dtype(np.dtype(src.src_price_dtype))
+        types = {src.src_col_isin: pa.dictionary(pa.int32(), pa.string()),
+                 src.src_col_date: pa.date32(), src.src_col_time: pa.time32('s'),
+                 src.src_col_start_price: price, src.src_col_min_price: price,
+                 src.src_col_max_price: price, src.src_col_traded_vol: pa.int64()}
+        return {col: col_type for col, col_type in types.items() if col in src.src_columns}
+
+    def read_files(self, files: list):
+        """Read the source files to one pandas dataframe, with src_validate
+        only the files passing the checks"""
+        if not self.src_args.src_validate:
+            return self.s3_bucket_src.read_many_csv_as_df(
+                files, self.src_args.src_read_workers, **self.read_kwargs())
+        frames = self.s3_bucket_src.iter_reads(self.read_file, files,
+                                               self.src_args.src_read_workers)
+        return concat_frames([data_frame for data_frame in frames if data_frame is not None])
+
+    def read_file(self, key: str):
+        """Read one source file, with src_validate check it and quarantine it
+        if it fails, None for a quarantined file"""
+        try:
+            data_frame = self.s3_bucket_src.read_csv_as_df(key, **self.read_kwargs())
+        except (ValueError, KeyError) as error:
+            # a header without the src_columns fails before the rows are
+            # parsed, ValueError in pandas and KeyError in pyarrow, values
+            # not of the pinned dtype fail with ValueError
+            if not self.src_args.src_validate:
+                raise
+            self.quarantine(key, f'unreadable, {error}')
+            return None
+        if not self.src_args.src_validate:
+            return data_frame
+        with METRICS.stage('etl.validate') as record:
+            record.rows = len(data_frame)
+            reason = self.validator.validate(key, data_frame)
+        if reason is not None:
+            self.quarantine(key, reason)
+            return None
+        return data_frame
+
+    def read_tables(self, files: list):
+        """Read the source files to one pyarrow Table, only the columns of
+        report 1 with the types of self.arrow_types(), with src_validate only
+        the files passing the checks"""
+        column_types = self.arrow_types()
+        if not self.src_args.src_validate:
+            return self.s3_bucket_src.read_many_csv_as_table(
+                files, self.src_args.src_read_workers, columns=list(column_types),
+                column_types=column_types)
+        tables = [table for table in self.s3_bucket_src.iter_reads(
+            self.read_table, files, self.src_args.src_read_workers) if table is not None]
+        return pa.concat_tables(tables).unify_dictionaries() if tables else pa.table({})
+
+    def read_table(self, key: str):
+        """Read one source file to a pyarrow Table, check it and quarantine it
+        if it fails, None for a quarantined file"""
+        column_types = self.arrow_types()
+        try:
+            table = self.s3_bucket_src.read_csv_as_table(key, columns=list(column_types),
+                                                         column_types=column_types)
+        except (ValueError, KeyError) as error:
+            # ArrowKeyError for columns missing in the header, ArrowInvalid
+            # for values not of the pinned types
+            self.quarantine(key, f'unreadable, {error}')
+            return None
+        with METRICS.stage('etl.validate') as record:
+            record.rows = table.num_rows
+            reason = self.validator.validate_table(key, table)
+        if reason is not None:
+            self.quarantine(key, reason)
+            return None
+        return table
+
+    def quarantine(self, key: str, reason: str):
+        """Copy the invalid source file key unchanged to src_quarantine_prefix
+        in the target bucket, the run goes on without it"""
+        quarantine_key = f'{self.src_args.src_quarantine_prefix}{key}'
+        with METRICS.stage('etl.quarantine') as record:
+            body, _ = self.s3_bucket_src.read_range(key, 0)
+            self.s3_bucket_trg.write_bytes_to_s3(body, quarantine_key)
+            record.bytes = len(body)
+        self.quarantined.append((key, reason))
+        self._logger.warning('Source file %s quarantined to %s: %s', key, quarantine_key, reason)
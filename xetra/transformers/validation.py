@@ -0,0 +1,134 @@
+"""Data quality checks of the Xetra source files"""
+
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from xetra.common.config import XetraSourceConfig
+
+# the source files of a day are listed under the day as prefix
+_KEY_DATE = re.compile(r'^(\d{4}-\d{2}-\d{2})')
+
+
+class SourceValidator():
+    """Vectorized checks of the dataframe or pyarrow Table of one source file
+
+    The checks run cheapest first and stop at the first failing one, each is
+    one NumPy or Arrow compute mask over the column values without a Python
+    loop over rows
+    """
+
+    def __init__(self, src_args: XetraSourceConfig):
+        """
+        Constructor for SourceValidator
+        """
+        self.src_args = src_args
+
+    def _present(self, data_frame: pd.DataFrame, cols: list):
+        """The columns of cols in data_frame"""
+        return [col for col in cols if col in data_frame.columns]
+
+    def _checks(self, key: str, data_frame: pd.DataFrame):
+        """Yield the name of each check and a function returning its mask of
+        the invalid rows"""
+        src = self.src_args
+        key_cols = self._present(data_frame, [src.src_col_isin, src.src_col_date,
+                                              src.src_col_time])
+        price_cols = self._present(data_frame, [src.src_col_start_price, src.src_col_min_price,
+                                                src.src_col_max_price])
+        yield ('missing ISIN, date or time',
+               lambda: data_frame[key_cols].isna().to_numpy().any(axis=1))
+        key_date = _KEY_DATE.match(key)
+        if key_date and src.src_col_date in data_frame.columns:
+            yield (f'a date other than {key_date.group(1)}',
+                   lambda: data_frame[src.src_col_date].astype(str).to_numpy()
+                   != key_date.group(1))
+        # NaN compares False, missing prices fail the checks as well
+        yield ('missing or non-positive prices',
+               lambda: ~(data_frame[price_cols].to_numpy(dtype='float64') > 0).all(axis=1))
+        if src.src_col_min_price in price_cols and src.src_col_max_price in price_cols:
+            yield ('a minimum above the maximum price',
+                   lambda: data_frame[src.src_col_min_price].to_numpy()
+                   > data_frame[src.src_col_max_price].to_numpy())
+        if src.src_col_traded_vol in data_frame.columns:
+            yield ('missing or negative traded volume',
+                   lambda: ~(data_frame[src.src_col_traded_vol].to_numpy(dtype='float64') >= 0))
+
+    def validate(self, key: str, data_frame: pd.DataFrame):
+        """Reason why the source file key with the rows data_frame is invalid,
+        None if it passes all checks"""
+        src = self.src_args
+        missing = [col for col in src.src_columns if col not in data_frame.columns]
+        if missing:
+            return f'missing columns {missing}'
+        numeric_cols = self._present(data_frame, [
+            src.src_col_start_price, src.src_col_min_price, src.src_col_max_price,
+            src.src_col_traded_vol])
+        non_numeric = [col for col in numeric_cols if not is_numeric_dtype(data_frame[col])]
+        if non_numeric:
+            return f'non-numeric columns {non_numeric}'
+        return self._check_rows(key, data_frame)
+
+    def _table_checks(self, key: str, table: pa.Table):
+        """Yield the name of each check of self._checks() and a function
+        returning its Arrow mask of the invalid rows of table"""
+        src = self.src_args
+        key_cols = [col for col in (src.src_col_isin, src.src_col_date, src.src_col_time)
+                    if col in table.column_names]
+        price_cols = [col for col in (src.src_col_start_price, src.src_col_min_price,
+                                      src.src_col_max_price) if col in table.column_names]
+        # null compares null, filled False as NaN compares False in pandas
+        if key_cols:
+            yield ('missing ISIN, date or time',
+                   lambda: functools.reduce(pc.or_, [pc.is_null(table[col])
+                                                     for col in key_cols]))
+        key_date = _KEY_DATE.match(key)
+        if key_date and src.src_col_date in table.column_names:
+            dates = table[src.src_col_date]
+            yield (f'a date other than {key_date.group(1)}',
+                   lambda: pc.fill_null(pc.not_equal(
+                       dates, pa.scalar(key_date.group(1)).cast(dates.type)), False))
+        if price_cols:
+            yield ('missing or non-positive prices',
+                   lambda: pc.invert(functools.reduce(pc.and_, [
+                       pc.fill_null(pc.greater(table[col], 0), False) for col in price_cols])))
+        if src.src_col_min_price in price_cols and src.src_col_max_price in price_cols:
+            yield ('a minimum above the maximum price',
+                   lambda: pc.fill_null(pc.greater(table[src.src_col_min_price],
+                                                   table[src.src_col_max_price]), False))
+        if src.src_col_traded_vol in table.column_names:
+            yield ('missing or negative traded volume',
+                   lambda: pc.invert(pc.fill_null(
+                       pc.greater_equal(table[src.src_col_traded_vol], 0), False)))
+
+    def validate_table(self, key: str, table: pa.Table):
+        """Reason why the source file key read to the pyarrow Table table is
+        invalid, None if it passes the row checks of self.validate()
+
+        The Arrow reader already fails on missing columns and values not of
+        the pinned types, the rows are checked with Arrow compute masks on
+        the columns of table without converting it to pandas
+        """
+        if table.num_rows == 0:
+            return None
+        for name, invalid in self._table_checks(key, table):
+            count = pc.sum(invalid()).as_py()
+            if count:
+                return f'{count} of {table.num_rows} rows with {name}'
+        return None
+
+    def _check_rows(self, key: str, data_frame: pd.DataFrame):
+        """Reason of the first failing check of the rows of data_frame, None
+        if all pass"""
+        if data_frame.empty:
+            return None
+        for name, invalid in self._checks(key, data_frame):
+            count = int(np.count_nonzero(invalid()))
+            if count:
+                return f'{count} of {len(data_frame)} rows with {name}'
+        return None
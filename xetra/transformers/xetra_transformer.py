@@ -1,46 +1,89 @@
 """ Xetra ETL Component """
 
 
-from typing import NamedTuple
+import collections
+import contextlib
+import functools
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from xetra.common.s3 import S3BucketConnector
+from xetra.common.config import XetraSourceConfig, XetraTargetConfig
+from xetra.common.manifest import SourceManifest
+from xetra.common.meta_process import MetaProcess
+from xetra.common.constants import MetaProcessFormat, S3FileTypes
+from xetra.common.metrics import METRICS
+from xetra.common.pipeline import BoundedQueue, StageTimer
+from xetra.common.custom_exceptions import PipelineStoppedException, WrongConfigException
+from xetra.query import build_index, index_key
+from xetra.transformers.source_reader import SourceReader
 import logging
 
-class XetraSourceConfig(NamedTuple):
-    """ Class for source configuration Data """
+# columns of the partial aggregates of self.etl_report1_pipelined()
+_PARTIAL_OPEN_TIME = '_open_time'
+_PARTIAL_CLOSE_TIME = '_close_time'
+_PARTIAL_OPEN_FILE = '_open_file'
+_PARTIAL_CLOSE_FILE = '_close_file'
+_PARTIAL_FILE = '_file'
+# start of the bar in minutes of the day in self.transform_rollups()
+_BAR_MINUTE = '_bar_minute'
+_MINUTES_PER_DAY = 24 * 60
+
 
-    src_first_extract_date : str
-    src_columns : list
-    src_col_date : str
-    src_col_isin : str
-    src_col_time: str
-    src_col_start_price : str
-    src_col_min_price : str
-    src_col_max_price : str
-    src_col_traded_vol : str
+def _dropna_report1(data_frame: pd.DataFrame, src_args: XetraSourceConfig):
+    """Drop the source rows with missing values in the columns of report 1"""
+    return data_frame.dropna(subset=[
+        src_args.src_col_isin, src_args.src_col_date, src_args.src_col_time,
+        src_args.src_col_start_price, src_args.src_col_min_price, src_args.src_col_max_price,
+        src_args.src_col_traded_vol])
 
 
-class XetraTargetConfig(NamedTuple):
-    """ Class for target configuration Data"""
+def _aggregate_report1(data_frame: pd.DataFrame, src_args: XetraSourceConfig,
+                       trg_args: XetraTargetConfig):
+    """Aggregate the source rows to one row per ISIN and day with opening,
+    closing, minimum and maximum price and traded volume"""
+    src, trg = src_args, trg_args
+    data_frame = _dropna_report1(data_frame, src)
+    # groupby keeps the row order within the groups, first and last are in time order
+    data_frame = data_frame.sort_values(by=src.src_col_time, kind='stable')
+    return data_frame.groupby([src.src_col_isin, src.src_col_date],
+                              observed=True, sort=True).agg(**{
+        trg.trg_col_open_price: (src.src_col_start_price, 'first'),
+        trg.trg_col_close_price: (src.src_col_start_price, 'last'),
+        trg.trg_col_min_price: (src.src_col_min_price, 'min'),
+        trg.trg_col_max_price: (src.src_col_max_price, 'max'),
+        trg.trg_col_daily_traded_vol: (src.src_col_traded_vol, 'sum')
+    }).reset_index()
 
 
-    trg_col_isin : str
-    trg_col_date : str
-    trg_col_open_price : str
-    trg_col_close_price : str
-    trg_col_min_price : str
-    trg_col_max_price : str
-    trg_col_daily_traded_vol : str
-    trg_col_ch_prev_close : str
-    trg_key : str
-    trg_key_date_format : str
-    trg_format : str
+def _extract_aggregate_day(s3_bucket_src: S3BucketConnector, s3_bucket_trg: S3BucketConnector,
+                           src_args: XetraSourceConfig, trg_args: XetraTargetConfig, keys: list):
+    """Map step of XetraETL.etl_report1_parallel() in a worker process,
+    extracts the source files keys of one day and aggregates them per ISIN
+
+    Only the connectors, the configurations and the keys are sent to the
+    worker, not the XetraETL with its manifest and last close state. Returns
+    the aggregate, the quarantined files and the stage totals of the call
+    """
+    stages_before = METRICS.stage_totals()
+    reader = SourceReader(s3_bucket_src, s3_bucket_trg, src_args)
+    data_frame = reader.read_files(keys)
+    if not data_frame.empty:
+        data_frame = _aggregate_report1(data_frame, src_args, trg_args)
+    return data_frame, reader.quarantined, METRICS.stage_totals(since=stages_before)
 
 
 class XetraETL():
     """Reads the data from source, tranforms and loads to the target"""
 
-     def __init__(self, s3_bucket_src: S3BucketConnector,
+    def __init__(self, s3_bucket_src: S3BucketConnector,
                  s3_bucket_trg: S3BucketConnector, meta_key: str,
                  src_args: XetraSourceConfig, trg_args: XetraTargetConfig):
         self._logger = logging.getLogger(__name__)
@@ -49,18 +92,767 @@ class XetraETL():
         self.meta_key = meta_key
         self.src_args = src_args
         self.trg_args = trg_args
-        self.extract_date =
-        self.extract_date_list =
-        self.meta_update_list = 
-    
-    def extract(self):
-        pass
-
-    def transform_report1(self):
-        pass
-    
-    def load(self):
-        pass
-    
+        # queue depths and stage timings of the last self.etl_report1_pipelined()
+        self.pipeline_stats = {}
+        # manifest of the source files in the target bucket, it spares listing
+        # the dates already listed
+        self.manifest = None
+        if self.src_args.src_manifest_key:
+            self.manifest = SourceManifest(self.s3_bucket_src, self.s3_bucket_trg,
+                                           self.src_args.src_manifest_key)
+        self.extract_date, self.extract_date_list = MetaProcess.return_date_list(
+            self.src_args.src_first_extract_date, self.meta_key, self.s3_bucket_trg)
+        # the look-back days in extract_date_list are only read for the previous closing price
+        self.meta_update_list = MetaProcess.update_list(self.extract_date, self.extract_date_list,
+                                                        self.meta_key, self.s3_bucket_trg)
+        # last aggregated row per ISIN before extract_date, from the last close state
+        self.last_close = None
+        # last aggregated row per ISIN of this run, merged into the state on load
+        self._last_close_update = None
+        # days of meta_update_list added to the meta file during the run
+        self._checkpointed = set()
+        # reads and with src_validate checks the source files
+        self.reader = SourceReader(self.s3_bucket_src, self.s3_bucket_trg, self.src_args)
+        # report 1 is derived from the coarsest rollup, each granularity must
+        # divide the next one and the day
+        self.rollup_minutes = sorted(self.trg_args.trg_rollup_minutes)
+        if self.trg_args.trg_rollup_key and not self.rollup_minutes:
+            raise WrongConfigException('The rollup minutes must not be empty with a rollup key')
+        if self.trg_args.trg_rollup_key and any(
+                coarser % finer for finer, coarser in zip(
+                    self.rollup_minutes, self.rollup_minutes[1:] + [_MINUTES_PER_DAY])):
+            raise WrongConfigException(f'The rollup minutes {self.rollup_minutes} must each '
+                                       f'divide the next one and the day')
+        if self.trg_args.trg_last_close_state and self.meta_update_list:
+            self._plan_from_last_close()
+
+    @property
+    def quarantined(self):
+        """Source files failing the checks of src_validate and the reason"""
+        return self.reader.quarantined
+
+    def _plan_from_last_close(self):
+        """Take the previous closing prices from the last close state instead
+        of the source files of the look-back days
+
+        Only if all closing prices in the state are older than extract_date,
+        then only the days of meta_update_list are extracted. A backfill of
+        days before the state extracts the look-back days as before
+        """
+        df_state = MetaProcess.read_last_close(self.meta_key, self.s3_bucket_trg)
+        if df_state is None or df_state.empty:
+            return
+        if df_state[MetaProcessFormat.META_LAST_CLOSE_DATE_COL.value].max() >= self.extract_date:
+            return
+        src, trg = self.src_args, self.trg_args
+        close = df_state[MetaProcessFormat.META_LAST_CLOSE_PRICE_COL.value]
+        # rows of self._aggregate_report1(), only the closing price is used, the
+        # other columns keep the dtypes of the report as the rows are never output
+        self.last_close = pd.DataFrame({
+            src.src_col_isin: df_state[MetaProcessFormat.META_LAST_CLOSE_ISIN_COL.value],
+            src.src_col_date: df_state[MetaProcessFormat.META_LAST_CLOSE_DATE_COL.value],
+            trg.trg_col_open_price: close,
+            trg.trg_col_close_price: close,
+            trg.trg_col_min_price: close,
+            trg.trg_col_max_price: close,
+            trg.trg_col_daily_traded_vol: 0})
+        self.extract_date_list = list(self.meta_update_list)
+        self._logger.info('Previous closing prices of %s ISINs taken from the last close state.',
+                          len(self.last_close))
+
+    def _with_last_close(self, data_frame: pd.DataFrame):
+        """Prepend the rows of the last close state to the rows aggregated by
+        self._aggregate_report1() and keep the last row per ISIN for the state"""
+        if self.last_close is not None:
+            data_frame = pd.concat([self.last_close, data_frame], ignore_index=True)
+        self._keep_last_close(data_frame)
+        return data_frame
+
+    def _keep_last_close(self, data_frame: pd.DataFrame):
+        """Keep the last aggregated row per ISIN of data_frame for the update of
+        the last close state on load"""
+        if not self.trg_args.trg_last_close_state or data_frame.empty:
+            return
+        self._last_close_update = self._last_close_rows(data_frame)
+
+    def _last_close_rows(self, data_frame: pd.DataFrame):
+        """Rows of the last close state of the last aggregated row per ISIN of
+        data_frame"""
+        src, trg = self.src_args, self.trg_args
+        return data_frame.sort_values(
+            by=[src.src_col_isin, src.src_col_date], kind='stable').drop_duplicates(
+                subset=src.src_col_isin, keep='last')[
+                    [src.src_col_isin, src.src_col_date, trg.trg_col_close_price]].rename(
+                        columns={
+                            src.src_col_isin: MetaProcessFormat.META_LAST_CLOSE_ISIN_COL.value,
+                            src.src_col_date: MetaProcessFormat.META_LAST_CLOSE_DATE_COL.value,
+                            trg.trg_col_close_price:
+                                MetaProcessFormat.META_LAST_CLOSE_PRICE_COL.value})
+
+    def _source_files(self, dates: list):
+        """Keys of the source files of each date as a dict of date to keys,
+        from the manifest if src_manifest_key is set, else listed"""
+        if self.manifest is not None:
+            return self.manifest.files(dates)
+        return {date: self.s3_bucket_src.list_files_in_prefix(date) for date in dates}
+
+    @METRICS.timed('etl.extract')
+    def extract(self, dates: list = None):
+        """Read the source files of dates, by default extract_date_list, to one
+        pandas dataframe"""
+        self._logger.info('Extracting Xetra source files started...')
+        dates = self.extract_date_list if dates is None else dates
+        files = [key for keys in self._source_files(dates).values() for key in keys]
+        data_frame = self.reader.read_files(files)
+        self._logger.info('Extracting Xetra source files finished.')
+        return data_frame
+
+    def _dropna_report1(self, data_frame: pd.DataFrame):
+        """Drop the source rows with missing values in the columns of report 1"""
+        return _dropna_report1(data_frame, self.src_args)
+
+    def _aggregate_report1(self, data_frame: pd.DataFrame):
+        """Aggregate the source rows to one row per ISIN and day with opening,
+        closing, minimum and maximum price and traded volume"""
+        return _aggregate_report1(data_frame, self.src_args, self.trg_args)
+
+    def _finish_report1(self, data_frame: pd.DataFrame):
+        """Add the change to the previous closing price to the rows aggregated by
+        self._aggregate_report1() and keep the days of meta_update_list"""
+        src, trg = self.src_args, self.trg_args
+        data_frame = data_frame.sort_values(by=[src.src_col_isin, src.src_col_date],
+                                            ignore_index=True)
+        prev_close = data_frame.groupby(src.src_col_isin, observed=True)[
+            trg.trg_col_close_price].shift(1)
+        data_frame[trg.trg_col_ch_prev_close] = \
+            (data_frame[trg.trg_col_close_price] - prev_close) / prev_close * 100
+        data_frame = data_frame.rename(columns={src.src_col_isin: trg.trg_col_isin,
+                                                src.src_col_date: trg.trg_col_date})
+        data_frame = data_frame.round(decimals=2)
+        return data_frame[data_frame[trg.trg_col_date].isin(self.meta_update_list)] \
+            .reset_index(drop=True)
+
+    @METRICS.timed('etl.transform_report1')
+    def transform_report1(self, data_frame: pd.DataFrame):
+        """Applies the necessary transformation to create report 1
+
+        One vectorized pass: a sort by time, a groupby aggregation per ISIN and
+        day and a shift per ISIN for the previous closing price
+        """
+        if data_frame.empty:
+            self._logger.info('The dataframe is empty. No transformations will be applied.')
+            return data_frame
+        self._logger.info('Applying transformations to Xetra source data for report 1 started...')
+        data_frame = self._finish_report1(
+            self._with_last_close(self._aggregate_report1(data_frame)))
+        self._logger.info('Applying transformations to Xetra source data finished...')
+        return data_frame
+
+    def _write_report1(self, data_frame: pd.DataFrame):
+        """Saves a pandas dataframe to the target
+
+        With trg_partitioned the report is written as Parquet partitioned by
+        date (and ISIN hash bucket) under the trg_key prefix
+        """
+        if self.trg_args.trg_partitioned:
+            self.s3_bucket_trg.write_df_to_s3_partitioned(
+                data_frame, self.trg_args.trg_key, self.trg_args.trg_col_date,
+                self.trg_args.trg_col_isin, self.trg_args.trg_isin_buckets,
+                self.trg_args.trg_row_group_size)
+        elif self._indexed():
+            key = self._report1_key()
+            if self.s3_bucket_trg.write_df_to_s3(data_frame, key, self.trg_args.trg_format,
+                                                 self.trg_args.trg_row_group_size):
+                self._write_index(key, data_frame[self.trg_args.trg_col_isin],
+                                  data_frame[self.trg_args.trg_col_date])
+        else:
+            self.s3_bucket_trg.write_df_to_s3(data_frame, self._report1_key(),
+                                              self.trg_args.trg_format)
+
+    def _indexed(self):
+        """Whether the report objects get a sidecar index for xetra.query"""
+        return bool(self.trg_args.trg_index_prefix) and \
+            self.trg_args.trg_format == S3FileTypes.PARQUET.value
+
+    def _write_index(self, key: str, isins: pd.Series, dates: pd.Series):
+        """Write the sidecar index of the report object key, whose rows are
+        isins and dates, for the lookups of xetra.query.ReportQuery"""
+        self.s3_bucket_trg.write_df_to_s3(
+            build_index(isins, dates, key, self.trg_args.trg_row_group_size),
+            index_key(self.trg_args.trg_index_prefix, key), S3FileTypes.PARQUET.value)
+        self._logger.info('Xetra report index successfully written.')
+
+    def _report1_key(self):
+        """Key of the report written as a single object"""
+        return (f'{self.trg_args.trg_key}'
+                f'{datetime.today().strftime(self.trg_args.trg_key_date_format)}.'
+                f'{self.trg_args.trg_format}')
+
+    def _update_meta_report1(self):
+        """Adds the days of meta_update_list to the meta file, after merging the
+        closing prices of the run into the last close state"""
+        if self._last_close_update is not None:
+            MetaProcess.update_last_close(self._last_close_update, self.meta_key,
+                                          self.s3_bucket_trg)
+            self._last_close_update = None
+            self._logger.info('Xetra last close state successfully updated.')
+        MetaProcess.update_meta_file([date for date in self.meta_update_list
+                                      if date not in self._checkpointed],
+                                     self.meta_key, self.s3_bucket_trg)
+        self._logger.info('Xetra meta file successfully updated.')
+
+    def _checkpoint_report1(self, dates: list, carry: pd.DataFrame):
+        """Adds the days dates, whose report is written, to the meta file
+        during the run, after merging the closing prices up to the days into
+        the last close state
+
+        carry is the last aggregated row per ISIN up to the days. A rerun after
+        a failure extracts only the days missing in the meta file
+        """
+        if self.trg_args.trg_last_close_state:
+            MetaProcess.update_last_close(self._last_close_rows(carry), self.meta_key,
+                                          self.s3_bucket_trg)
+        MetaProcess.update_meta_file(dates, self.meta_key, self.s3_bucket_trg)
+        self._checkpointed.update(dates)
+        self._logger.info('Xetra meta file checkpointed up to %s.', dates[-1])
+
+    def load(self, data_frame: pd.DataFrame):
+        """Saves a pandas dataframe to the target and updates the meta file"""
+        with METRICS.stage('etl.load') as record:
+            record.rows = len(data_frame)
+            self._write_report1(data_frame)
+            self._logger.info('Xetra target data successfully written.')
+            self._update_meta_report1()
+        return True
+
+    def _check_no_rollups(self, mode: str):
+        """Raise WrongConfigException if trg_rollup_key is set, only
+        self.etl_report1() writes the rollups"""
+        if self.trg_args.trg_rollup_key:
+            raise WrongConfigException(f'The rollups of trg_rollup_key are not written by {mode}, '
+                                       f'only by etl_report1')
+
+    @METRICS.timed('etl.etl_report1')
     def etl_report1(self):
-        pass
\ No newline at end of file
+        """Extract, transform and load to create report 1
+
+        With trg_rollup_key the OHLCV bars are built and written first and
+        report 1 is derived from the coarsest bars instead of the source rows
+        """
+        data_frame = self.extract()
+        if self.trg_args.trg_rollup_key and not data_frame.empty:
+            rollups = self.transform_rollups(data_frame)
+            self.load_rollups(rollups)
+            data_frame = self.transform_report1_rollup(rollups[self.rollup_minutes[-1]])
+        else:
+            data_frame = self.transform_report1(data_frame)
+        self.load(data_frame)
+        return True
+
+    def _minute_of_day(self, times: pd.Series):
+        """Minutes since midnight of the HH:MM source times, each distinct time
+        is parsed once"""
+        codes, uniques = pd.factorize(times)
+        minutes = np.array([int(time_value[:2]) * 60 + int(time_value[3:5])
+                            for time_value in uniques], dtype=np.int16)
+        return minutes[codes]
+
+    def _aggregate_bars(self, data_frame: pd.DataFrame, keys: list):
+        """Aggregate rows in time order per keys to open, close, minimum and
+        maximum price and traded volume"""
+        trg = self.trg_args
+        return data_frame.groupby(keys, observed=True, sort=True).agg(**{
+            trg.trg_col_open_price: (trg.trg_col_open_price, 'first'),
+            trg.trg_col_close_price: (trg.trg_col_close_price, 'last'),
+            trg.trg_col_min_price: (trg.trg_col_min_price, 'min'),
+            trg.trg_col_max_price: (trg.trg_col_max_price, 'max'),
+            trg.trg_col_daily_traded_vol: (trg.trg_col_daily_traded_vol, 'sum')
+        }).reset_index()
+
+    @METRICS.timed('etl.transform_rollups')
+    def transform_rollups(self, data_frame: pd.DataFrame):
+        """Build the OHLCV bars per ISIN of each granularity of
+        trg_rollup_minutes, as dict of minutes to bars
+
+        One sort of the source rows by time, the finest bars are aggregated
+        from the rows and each coarser one from the bars before. Prices are the
+        ones of report 1, the close is the start price of the last minute
+        """
+        src, trg = self.src_args, self.trg_args
+        data_frame = self._dropna_report1(data_frame).sort_values(by=src.src_col_time,
+                                                                   kind='stable')
+        bars = pd.DataFrame({
+            src.src_col_isin: data_frame[src.src_col_isin],
+            src.src_col_date: data_frame[src.src_col_date],
+            _BAR_MINUTE: self._minute_of_day(data_frame[src.src_col_time]),
+            trg.trg_col_open_price: data_frame[src.src_col_start_price],
+            trg.trg_col_close_price: data_frame[src.src_col_start_price],
+            trg.trg_col_min_price: data_frame[src.src_col_min_price],
+            trg.trg_col_max_price: data_frame[src.src_col_max_price],
+            trg.trg_col_daily_traded_vol: data_frame[src.src_col_traded_vol]})
+        rollups = {}
+        for minutes in self.rollup_minutes:
+            # the bars before are sorted by ISIN, date and start, so first and
+            # last stay in time order
+            bars = self._aggregate_bars(
+                bars.assign(**{_BAR_MINUTE: bars[_BAR_MINUTE] // minutes * minutes}),
+                [src.src_col_isin, src.src_col_date, _BAR_MINUTE])
+            rollups[minutes] = bars
+        return rollups
+
+    @METRICS.timed('etl.transform_report1_rollup')
+    def transform_report1_rollup(self, bars: pd.DataFrame):
+        """Applies the transformation of report 1 to bars of
+        self.transform_rollups(), the report equals the one of
+        self.transform_report1() on the source rows"""
+        src = self.src_args
+        self._logger.info('Applying transformations to Xetra rollups for report 1 started...')
+        data_frame = self._finish_report1(self._with_last_close(
+            self._aggregate_bars(bars, [src.src_col_isin, src.src_col_date])))
+        self._logger.info('Applying transformations to Xetra rollups finished...')
+        return data_frame
+
+    def load_rollups(self, rollups: dict):
+        """Saves the bars of the days of meta_update_list as Parquet partitioned
+        by date (and ISIN hash bucket) under trg_rollup_key<minutes>min/, with
+        the start of the bar as HH:MM"""
+        src, trg = self.src_args, self.trg_args
+        bar_times = np.array([f'{minute // 60:02d}:{minute % 60:02d}'
+                              for minute in range(_MINUTES_PER_DAY)], dtype=object)
+        with METRICS.stage('etl.load_rollups') as record:
+            for minutes, bars in rollups.items():
+                bars = bars[bars[src.src_col_date].isin(self.meta_update_list)]
+                bars = pd.DataFrame({
+                    trg.trg_col_isin: bars[src.src_col_isin],
+                    trg.trg_col_date: bars[src.src_col_date],
+                    trg.trg_col_bar_time: bar_times[bars[_BAR_MINUTE].to_numpy()],
+                    trg.trg_col_open_price: bars[trg.trg_col_open_price],
+                    trg.trg_col_close_price: bars[trg.trg_col_close_price],
+                    trg.trg_col_min_price: bars[trg.trg_col_min_price],
+                    trg.trg_col_max_price: bars[trg.trg_col_max_price],
+                    trg.trg_col_traded_vol: bars[trg.trg_col_daily_traded_vol]
+                }).reset_index(drop=True)
+                record.rows += len(bars)
+                self.s3_bucket_trg.write_df_to_s3_partitioned(
+                    bars, f'{trg.trg_rollup_key}{minutes}min/', trg.trg_col_date,
+                    trg.trg_col_isin, trg.trg_isin_buckets, trg.trg_row_group_size)
+        self._logger.info('Xetra rollups successfully written.')
+
+    @METRICS.timed('etl.extract_arrow')
+    def extract_arrow(self):
+        """Read the source files of extract_date_list to one pyarrow Table,
+        only the columns of report 1 with the types of
+        SourceReader.arrow_types(), with src_validate only the files passing
+        the checks"""
+        self._logger.info('Extracting Xetra source files to Arrow started...')
+        files = [key for keys in self._source_files(self.extract_date_list).values()
+                 for key in keys]
+        table = self.reader.read_tables(files)
+        self._logger.info('Extracting Xetra source files finished.')
+        return table
+
+    def _aggregate_report1_arrow(self, table: pa.Table):
+        """Aggregate the source rows as self._aggregate_report1() does with the
+        Arrow group by, ordered aggregations run single threaded"""
+        src, trg = self.src_args, self.trg_args
+        # the sort is stable, first and last are in time and file order
+        table = table.drop_null().sort_by(src.src_col_time)
+        table = table.group_by([src.src_col_isin, src.src_col_date], use_threads=False).aggregate([
+            (src.src_col_start_price, 'first'), (src.src_col_start_price, 'last'),
+            (src.src_col_min_price, 'min'), (src.src_col_max_price, 'max'),
+            (src.src_col_traded_vol, 'sum')])
+        return table.select([
+            src.src_col_isin, src.src_col_date, f'{src.src_col_start_price}_first',
+            f'{src.src_col_start_price}_last', f'{src.src_col_min_price}_min',
+            f'{src.src_col_max_price}_max', f'{src.src_col_traded_vol}_sum']).rename_columns([
+                src.src_col_isin, src.src_col_date, trg.trg_col_open_price,
+                trg.trg_col_close_price, trg.trg_col_min_price, trg.trg_col_max_price,
+                trg.trg_col_daily_traded_vol])
+
+    def _finish_report1_arrow(self, table: pa.Table):
+        """Finish step of self.transform_report1_arrow() as
+        self._finish_report1() does, the rows are ordered by ISIN and date and
+        the previous closing price is the one of the row before of the same ISIN"""
+        if table.num_rows == 0:
+            self._logger.info('No source rows without missing values. No report will be written.')
+            return table
+        src, trg = self.src_args, self.trg_args
+        if self.last_close is not None:
+            table = pa.concat_tables([
+                pa.Table.from_pandas(self.last_close, preserve_index=False).cast(table.schema),
+                table]).unify_dictionaries()
+        table = table.take(pc.sort_indices(
+            pa.table({'isin': table[src.src_col_isin].cast(pa.string()),
+                      'date': table[src.src_col_date]}),
+            sort_keys=[('isin', 'ascending'), ('date', 'ascending')])).combine_chunks()
+        codes = table[src.src_col_isin].combine_chunks().indices.to_numpy()
+        close = table[trg.trg_col_close_price].to_numpy()
+        prev_close = np.full(len(close), np.nan)
+        prev_close[1:] = np.where(codes[1:] == codes[:-1], close[:-1], np.nan)
+        if self.trg_args.trg_last_close_state:
+            last = table.filter(np.append(codes[1:] != codes[:-1], True))
+            self._keep_last_close(pd.DataFrame({
+                src.src_col_isin: last[src.src_col_isin].cast(pa.string()).to_pandas(),
+                src.src_col_date: pc.strftime(last[src.src_col_date], '%Y-%m-%d').to_pandas(),
+                trg.trg_col_close_price: last[trg.trg_col_close_price].to_pandas()}))
+        report = pa.table({
+            trg.trg_col_isin: table[src.src_col_isin],
+            trg.trg_col_date: table[src.src_col_date],
+            **{col: np.round(table[col].to_numpy(), 2) for col in (
+                trg.trg_col_open_price, trg.trg_col_close_price, trg.trg_col_min_price,
+                trg.trg_col_max_price)},
+            trg.trg_col_daily_traded_vol: table[trg.trg_col_daily_traded_vol],
+            trg.trg_col_ch_prev_close: np.round((close - prev_close) / prev_close * 100, 2)})
+        return report.filter(pc.is_in(report[trg.trg_col_date], value_set=pa.array(
+            self.meta_update_list, pa.string()).cast(pa.date32())))
+
+    @METRICS.timed('etl.transform_report1_arrow')
+    def transform_report1_arrow(self, table: pa.Table):
+        """Applies the transformation of report 1 to a pyarrow Table of
+        self.extract_arrow() and returns the report as pyarrow Table
+
+        The values are the ones of self.transform_report1(), the ISIN stays
+        dictionary encoded and the date is a date32 column
+        """
+        if table.num_rows == 0:
+            self._logger.info('The table is empty. No transformations will be applied.')
+            return table
+        self._logger.info('Applying transformations to Xetra source data for report 1 started...')
+        table = self._finish_report1_arrow(self._aggregate_report1_arrow(table))
+        self._logger.info('Applying transformations to Xetra source data finished...')
+        return table
+
+    def load_arrow(self, table: pa.Table):
+        """Saves a pyarrow Table to the target and updates the meta file
+
+        A single object is written directly from Arrow, the partitioned target
+        takes the pandas dataframe of the report rows with the date as string
+        """
+        with METRICS.stage('etl.load') as record:
+            record.rows = table.num_rows
+            if self.trg_args.trg_partitioned:
+                if table.num_rows:
+                    table = table.set_column(
+                        table.schema.get_field_index(self.trg_args.trg_col_date),
+                        self.trg_args.trg_col_date,
+                        pc.strftime(table[self.trg_args.trg_col_date], '%Y-%m-%d'))
+                self._write_report1(table.to_pandas())
+            elif self._indexed():
+                key = self._report1_key()
+                if self.s3_bucket_trg.write_table_to_s3(table, key, self.trg_args.trg_format,
+                                                        self.trg_args.trg_row_group_size):
+                    self._write_index(
+                        key, table[self.trg_args.trg_col_isin].to_pandas(),
+                        pc.strftime(table[self.trg_args.trg_col_date], '%Y-%m-%d').to_pandas())
+            else:
+                self.s3_bucket_trg.write_table_to_s3(table, self._report1_key(),
+                                                     self.trg_args.trg_format)
+            self._logger.info('Xetra target data successfully written.')
+            self._update_meta_report1()
+        return True
+
+    @METRICS.timed('etl.etl_report1_arrow')
+    def etl_report1_arrow(self):
+        """Extract, transform and load to create report 1 on pyarrow Tables,
+        the source rows are never converted to pandas"""
+        self._check_no_rollups('etl_report1_arrow')
+        table = self.extract_arrow()
+        table = self.transform_report1_arrow(table)
+        self.load_arrow(table)
+        return True
+
+    @METRICS.timed('etl.etl_report1_parallel')
+    def etl_report1_parallel(self, workers: int):
+        """Extract, transform and load to create report 1 with the days of
+        extract_date_list extracted and aggregated in parallel worker processes
+
+        The per day aggregates are stitched together in this process, where the
+        change to the previous closing price across days is computed. With
+        trg_partitioned each day is written and checkpointed in the meta file
+        as its aggregate arrives in date order, so a rerun after a failure
+        resumes at the first day not written
+        """
+        self._check_no_rollups('etl_report1_parallel')
+        self._logger.info('Extracting and aggregating %s days in %s worker processes started...',
+                          len(self.extract_date_list), workers)
+        files = self._source_files(self.extract_date_list)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            aggregates = zip(files, self._merge_worker_results(executor.map(
+                functools.partial(_extract_aggregate_day, self.s3_bucket_src, self.s3_bucket_trg,
+                                  self.src_args, self.trg_args), files.values())))
+            if self.trg_args.trg_partitioned:
+                self._load_days_checkpointed(aggregates)
+                partials = []
+            else:
+                partials = [data_frame for _, data_frame in aggregates if not data_frame.empty]
+        self._logger.info('Extracting and aggregating finished.')
+        if self.trg_args.trg_partitioned:
+            self._update_meta_report1()
+            return True
+        if partials:
+            data_frame = self._finish_report1(
+                self._with_last_close(pd.concat(partials, ignore_index=True)))
+        else:
+            data_frame = pd.DataFrame()
+        self.load(data_frame)
+        return True
+
+    def _merge_worker_results(self, results):
+        """Yield the aggregates of the results of _extract_aggregate_day() and
+        add their quarantined files and stage totals to this process"""
+        for data_frame, quarantined, stages in results:
+            self.reader.quarantined.extend(quarantined)
+            METRICS.merge(stages)
+            yield data_frame
+
+    def _load_days_checkpointed(self, aggregates):
+        """Load step of self.etl_report1_parallel() with trg_partitioned,
+        finishes, writes and checkpoints the days of aggregates, pairs of date
+        and the rows of self._aggregate_report1() in date order"""
+        # days to checkpoint with the next written day, days without report
+        # rows go with it
+        meta_update, checkpoint_days = set(self.meta_update_list), []
+        carry = self.last_close
+        for date, data_frame in aggregates:
+            report, carry = self._finish_report1_day(date, data_frame, carry)
+            if date in meta_update:
+                checkpoint_days.append(date)
+            if report.empty:
+                continue
+            with METRICS.stage('etl.load') as record:
+                record.rows = len(report)
+                self._write_report1(report)
+                self._checkpoint_report1(checkpoint_days, carry)
+            checkpoint_days = []
+        if carry is not None:
+            self._keep_last_close(carry)
+
+    def _aggregate_report1_partial(self, frames: list):
+        """Transform step of self.etl_report1_pipelined(), aggregates a batch of
+        source files, a list of (file index, dataframe), per ISIN and day and
+        keeps the time and file of the opening and closing price for
+        self._combine_report1_partials()"""
+        src, trg = self.src_args, self.trg_args
+        data_frame = pd.concat([frame.assign(**{_PARTIAL_FILE: file_index})
+                                for file_index, frame in frames], ignore_index=True)
+        # ties in time keep the order of the files as in self._aggregate_report1()
+        data_frame = self._dropna_report1(data_frame).sort_values(
+            by=[src.src_col_time, _PARTIAL_FILE], kind='stable')
+        return data_frame.groupby([src.src_col_isin, src.src_col_date],
+                                  observed=True, sort=False).agg(**{
+            trg.trg_col_open_price: (src.src_col_start_price, 'first'),
+            trg.trg_col_close_price: (src.src_col_start_price, 'last'),
+            trg.trg_col_min_price: (src.src_col_min_price, 'min'),
+            trg.trg_col_max_price: (src.src_col_max_price, 'max'),
+            trg.trg_col_daily_traded_vol: (src.src_col_traded_vol, 'sum'),
+            _PARTIAL_OPEN_TIME: (src.src_col_time, 'first'),
+            _PARTIAL_CLOSE_TIME: (src.src_col_time, 'last'),
+            _PARTIAL_OPEN_FILE: (_PARTIAL_FILE, 'first'),
+            _PARTIAL_CLOSE_FILE: (_PARTIAL_FILE, 'last')
+        }).reset_index()
+
+    def _combine_report1_partials(self, partials: list):
+        """Combine the partial aggregates of the files of one day to the rows of
+        self._aggregate_report1()
+
+        The opening price is the one with the earliest time and the closing
+        price the one with the latest time, ties in the order of the files as
+        in the stable sort of self._aggregate_report1()
+        """
+        src, trg = self.src_args, self.trg_args
+        keys = [src.src_col_isin, src.src_col_date]
+        data_frame = pd.concat(partials, ignore_index=True)
+        combined = data_frame.groupby(keys, observed=True, sort=True).agg(**{
+            trg.trg_col_min_price: (trg.trg_col_min_price, 'min'),
+            trg.trg_col_max_price: (trg.trg_col_max_price, 'max'),
+            trg.trg_col_daily_traded_vol: (trg.trg_col_daily_traded_vol, 'sum')
+        })
+        combined[trg.trg_col_open_price] = data_frame.sort_values(
+            by=[_PARTIAL_OPEN_TIME, _PARTIAL_OPEN_FILE], kind='stable').groupby(
+                keys, observed=True)[trg.trg_col_open_price].first()
+        combined[trg.trg_col_close_price] = data_frame.sort_values(
+            by=[_PARTIAL_CLOSE_TIME, _PARTIAL_CLOSE_FILE], kind='stable').groupby(
+                keys, observed=True)[trg.trg_col_close_price].last()
+        return combined.reset_index()[
+            keys + [trg.trg_col_open_price, trg.trg_col_close_price, trg.trg_col_min_price,
+                    trg.trg_col_max_price, trg.trg_col_daily_traded_vol]]
+
+    def _finish_report1_day(self, date: str, data_frame: pd.DataFrame, carry: pd.DataFrame):
+        """Finish step of self.etl_report1_pipelined() and
+        self.etl_report1_parallel() for the rows of one day aggregated as by
+        self._aggregate_report1()
+
+        carry holds the last aggregated row of each ISIN on the days before,
+        the source of the previous closing price. Returns the report rows of
+        the day and the carry of the next day
+        """
+        if data_frame.empty:
+            return pd.DataFrame(), carry
+        if carry is not None:
+            data_frame = pd.concat([carry, data_frame], ignore_index=True)
+        report = self._finish_report1(data_frame)
+        report = report[report[self.trg_args.trg_col_date] == date].reset_index(drop=True)
+        carry = data_frame.drop_duplicates(subset=self.src_args.src_col_isin, keep='last')
+        return report, carry
+
+    @METRICS.timed('etl.etl_report1_pipelined')
+    def etl_report1_pipelined(self, download_workers: int = 8, queue_size: int = 16):
+        """Extract, transform and load to create report 1 with the stages
+        running concurrently
+
+        A lister thread lists the days of extract_date_list and queues their
+        files, download_workers threads read the files and queue one dataframe
+        per file, this thread aggregates the files as they arrive, in batches
+        of the queued files when it falls behind, and finishes the days in
+        date order, and with trg_partitioned a loader thread writes
+        each finished day and checkpoints it in the meta file, so a rerun after
+        a failure resumes at the first day not written. Every queue holds at
+        most queue_size items, so the source data in memory is bounded however
+        long the date range is. Queue depths and busy times of the stages are
+        kept in self.pipeline_stats
+        """
+        self._check_no_rollups('etl_report1_pipelined')
+        start = time.perf_counter()
+        # a failed stage stops the stages before the loader, the loader still
+        # writes and checkpoints the days finished, unless it fails itself
+        stop, load_stop = threading.Event(), threading.Event()
+        key_queue = BoundedQueue('keys', queue_size, stop)
+        frame_queue = BoundedQueue('frames', queue_size, stop)
+        load_queue = BoundedQueue('load', queue_size, load_stop)
+        timers = {name: StageTimer(name) for name in ('list', 'download', 'transform', 'load')}
+        errors = []
+
+        def stage_thread(func, stops=(stop,)):
+            def run():
+                try:
+                    func()
+                except PipelineStoppedException:
+                    pass
+                except Exception as error:  # pylint: disable=broad-except
+                    errors.append(error)
+                    for event in stops:
+                        event.set()
+            return threading.Thread(target=run, daemon=True)
+
+        def list_days():
+            planned = {}
+            if self.manifest is not None:
+                # one manifest refresh for all days instead of one per day
+                with timers['list'].time():
+                    planned = self.manifest.files(self.extract_date_list)
+            for date in self.extract_date_list:
+                with timers['list'].time():
+                    keys = planned[date] if planned else \
+                        self.s3_bucket_src.list_files_in_prefix(date)
+                # announced before its files, so the day is known when they arrive
+                frame_queue.put_item(('day', date, len(keys)))
+                for file_index, key in enumerate(keys):
+                    key_queue.put_item((date, file_index, key))
+            for _ in range(download_workers):
+                key_queue.put_item(None)
+
+        def download_files():
+            while (item := key_queue.get_item()) is not None:
+                date, file_index, key = item
+                with timers['download'].time():
+                    data_frame = self.reader.read_file(key)
+                # a quarantined file counts as a file of its day without rows
+                frame_queue.put_item(('file', date, file_index,
+                                      pd.DataFrame() if data_frame is None else data_frame))
+            frame_queue.put_item(None)
+
+        def load_days():
+            while (item := load_queue.get_item()) is not None:
+                data_frame, dates, day_carry = item
+                with timers['load'].time():
+                    self._write_report1(data_frame)
+                    self._checkpoint_report1(dates, day_carry)
+
+        threads = [stage_thread(list_days)]
+        threads += [stage_thread(download_files) for _ in range(download_workers)]
+        if self.trg_args.trg_partitioned:
+            threads.append(stage_thread(load_days, (stop, load_stop)))
+        self._logger.info('Pipelined extracting, transforming and loading of %s days started...',
+                          len(self.extract_date_list))
+        for thread in threads:
+            thread.start()
+        finished = []
+        try:
+            remaining, partials, days = {}, {}, collections.deque()
+            # days to checkpoint with the next written day, days without
+            # report rows go with it
+            meta_update, checkpoint_days = set(self.meta_update_list), []
+            carry, downloaders = self.last_close, download_workers
+            while downloaders:
+                files = []
+                for item in frame_queue.get_items(queue_size):
+                    if item is None:
+                        downloaders -= 1
+                    elif item[0] == 'day':
+                        _, date, file_count = item
+                        remaining[date], partials[date] = file_count, []
+                        days.append(date)
+                    else:
+                        files.append(item[1:])
+                frames = [(file_index, data_frame)
+                          for _, file_index, data_frame in files if not data_frame.empty]
+                if frames:
+                    with timers['transform'].time():
+                        partial = self._aggregate_report1_partial(frames)
+                        for date, day_partial in partial.groupby(self.src_args.src_col_date,
+                                                                 sort=False):
+                            partials.setdefault(date, []).append(day_partial)
+                for date, _, _ in files:
+                    remaining[date] -= 1
+                while days and remaining[days[0]] == 0:
+                    date = days.popleft()
+                    with timers['transform'].time():
+                        day_partials = partials.pop(date)
+                        report, carry = self._finish_report1_day(
+                            date, self._combine_report1_partials(day_partials)
+                            if day_partials else pd.DataFrame(), carry)
+                    if date in meta_update:
+                        checkpoint_days.append(date)
+                    if report.empty:
+                        continue
+                    if self.trg_args.trg_partitioned:
+                        load_queue.put_item((report, checkpoint_days, carry))
+                        checkpoint_days = []
+                    else:
+                        finished.append(report)
+        except PipelineStoppedException:
+            pass
+        except Exception:
+            stop.set()
+            load_stop.set()
+            raise
+        finally:
+            if self.trg_args.trg_partitioned:
+                with contextlib.suppress(PipelineStoppedException):
+                    load_queue.put_item(None)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+        if carry is not None:
+            self._keep_last_close(carry)
+        if not self.trg_args.trg_partitioned:
+            data_frame = pd.DataFrame()
+            if finished:
+                # the order of the sequential report, by ISIN and date
+                data_frame = pd.concat(finished).sort_values(
+                    by=[self.trg_args.trg_col_isin, self.trg_args.trg_col_date],
+                    kind='stable', ignore_index=True)
+            with timers['load'].time():
+                self._write_report1(data_frame)
+        self._logger.info('Xetra target data successfully written.')
+        self._update_meta_report1()
+        self.pipeline_stats = {
+            'wall_s': round(time.perf_counter() - start, 3),
+            'stages': {name: timer.stats() for name, timer in timers.items()},
+            'queues': {queue.name: queue.stats()
+                       for queue in (key_queue, frame_queue, load_queue)}
+        }
+        self._logger.info('Pipeline stages: %s', self.pipeline_stats['stages'])
+        self._logger.info('Pipeline queues: %s', self.pipeline_stats['queues'])
+        return True